@@ -0,0 +1,72 @@
+"""
+Import-time benchmark.
+
+Measures, in fresh interpreters, how long importing each entry point of the package
+takes, and optionally fails when one of them goes over its budget.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 10 --check
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Statement -> budget in milliseconds
+TARGETS: Dict[str, float] = {
+    "import aclimate_v3_orm_frontend": 50,
+    "from aclimate_v3_orm_frontend.enums import ProfileType": 50,
+    "from aclimate_v3_orm_frontend.schemas import AppRead, UserRead, WsInterestedRead": 400,
+    "from aclimate_v3_orm_frontend.models import App, User, WsInterested": 1000,
+    "from aclimate_v3_orm_frontend.services import AppService, UserService, WsInterestedService": 1500,
+}
+
+_TIMER = (
+    "import time; _start = time.perf_counter(); {statement}; "
+    "print((time.perf_counter() - _start) * 1000)"
+)
+
+
+def measure(statement: str, repeat: int) -> List[float]:
+    """Milliseconds taken by statement in repeat fresh interpreters"""
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL_FRONT"}
+    env["PYTHONPATH"] = os.path.abspath(SRC)
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(statement=statement)],
+            env=env, capture_output=True, text=True, check=True
+        )
+        timings.append(float(result.stdout.strip()))
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure package import times")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per statement")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a median exceeds its budget")
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'median ms':>10} {'max ms':>8} {'budget':>7}  statement")
+    for statement, budget in TARGETS.items():
+        timings = measure(statement, args.repeat)
+        median = statistics.median(timings)
+        flag = "" if median <= budget else "  <-- over budget"
+        print(f"{median:10.1f} {max(timings):8.1f} {budget:7.0f}  {statement}{flag}")
+        if median > budget:
+            over_budget.append(statement)
+
+    if args.check and over_budget:
+        print(f"❌ {len(over_budget)} import(s) over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
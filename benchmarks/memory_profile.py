@@ -0,0 +1,301 @@
+"""
+Memory profiling harness for service read methods.
+
+Seeds SQLite databases of increasing size and measures, with tracemalloc, the memory
+each read method allocates: peak bytes while the call runs and bytes retained by its
+result, both per row. Plain ORM queries are profiled next to the service methods so the
+cost of ORM objects can be told apart from the cost of the pydantic read models.
+Peak RSS is sampled as well when psutil is installed and --rss is given.
+
+Usage:
+    python benchmarks/memory_profile.py
+    python benchmarks/memory_profile.py --sizes 1000,10000,100000 --rss
+    python benchmarks/memory_profile.py --save-baseline
+    python benchmarks/memory_profile.py --check --tolerance 0.25
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pydantic  # noqa: E402
+import sqlalchemy  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from aclimate_v3_orm_frontend.database.base import Base  # noqa: E402
+from aclimate_v3_orm_frontend.enums import ProfileType  # noqa: E402
+from aclimate_v3_orm_frontend.models import App, User, WsInterested  # noqa: E402
+from aclimate_v3_orm_frontend.services import AppService, UserService, WsInterestedService  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "memory_profile.json")
+DEFAULT_SIZES = [1000, 10000, 50000]
+# Users per app in the seeded data, so get_by_app() always returns about this many rows
+USERS_PER_APP = 1000
+
+
+@dataclass
+class Measurement:
+    case: str
+    kind: str  # "orm", "read_model" or "stream"
+    size: int
+    rows: int
+    peak_bytes: int
+    retained_bytes: int
+    peak_bytes_per_row: float
+    retained_bytes_per_row: float
+    peak_rss_bytes: Optional[int] = None
+    seconds: float = 0.0
+
+
+def _drain(batches) -> Tuple[int, List[Dict[str, Any]]]:
+    # Consume a stream keeping only the last batch, as a streaming consumer would: (rows, last batch)
+    last: List[Dict[str, Any]] = []
+    rows = 0
+    for batch in batches:
+        rows += len(batch)
+        last = batch
+    return rows, last
+
+
+# Case name -> (kind, call). Calls receive an open session and return the result to keep alive
+CASES: Dict[str, Tuple[str, Callable[[Session], Any]]] = {
+    "orm:apps": ("orm", lambda db: db.query(App).all()),
+    "AppService.get_all": ("read_model", lambda db: AppService().get_all(db=db)),
+    "orm:users": ("orm", lambda db: db.query(User).all()),
+    "UserService.get_all": ("read_model", lambda db: UserService().get_all(db=db)),
+    "UserService.get_by_app": ("read_model", lambda db: UserService().get_by_app(1, db=db)),
+    "UserService.stream_rows": ("stream", lambda db: _drain(UserService().stream_rows(db=db))),
+    "orm:ws_interested": ("orm", lambda db: db.query(WsInterested).all()),
+    "WsInterestedService.get_all": ("read_model", lambda db: WsInterestedService().get_all(db=db)),
+    "WsInterestedService.get_by_ws_ext_id": (
+        "read_model", lambda db: WsInterestedService().get_by_ws_ext_id("ws-1", db=db)
+    ),
+    "WsInterestedService.stream_rows": (
+        "stream", lambda db: _drain(WsInterestedService().stream_rows(db=db))
+    ),
+}
+
+
+def seed(url: str, size: int):
+    """Create the tables and insert size users (one subscription each) spread over apps"""
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now(timezone.utc)
+    app_count = max(1, size // USERS_PER_APP)
+    with engine.begin() as conn:
+        conn.execute(insert(App.__table__), [
+            {"id": i, "name": f"App {i}", "country_ext_id": f"C{i % 20}", "enable": True, "register": now, "updated": now}
+            for i in range(1, app_count + 1)
+        ])
+        conn.execute(insert(User.__table__), [
+            {"id": i, "ext_key_clock_id": f"kc-{i:08d}", "app_id": (i - 1) % app_count + 1,
+             "profile": ProfileType.FARMER if i % 2 else ProfileType.TECHNICIAN,
+             "enable": True, "register": now, "updated": now}
+            for i in range(1, size + 1)
+        ])
+        conn.execute(insert(WsInterested.__table__), [
+            {"id": i, "user_id": i, "ws_ext_id": f"ws-{i % 500}",
+             "notification": {"daily": True, "alerts": ["rain", "frost"], "channel": "sms"}, "updated": now}
+            for i in range(1, size + 1)
+        ])
+    engine.dispose()
+
+
+def _row_count(case: str, result: Any) -> int:
+    if CASES[case][0] == "stream":
+        return result[0]
+    return len(result)
+
+
+class RssSampler:
+    """Samples the process RSS in a background thread and keeps the peak (requires psutil)"""
+
+    def __init__(self, interval: float = 0.005):
+        import psutil
+        self._process = psutil.Process()
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.start = self.peak = self._process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._process.memory_info().rss)
+
+
+def measure(case: str, session_factory: sessionmaker, size: int, rss: bool = False) -> Measurement:
+    """Profile one case against an already seeded database"""
+    kind, call = CASES[case]
+    session = session_factory()
+    try:
+        # Warm up mappers, compiled statement caches and pydantic validators outside the measurement
+        call(session)
+        session.expunge_all()
+        gc.collect()
+
+        sampler = RssSampler() if rss else None
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        if sampler:
+            with sampler:
+                result = call(session)
+        else:
+            result = call(session)
+        seconds = time.perf_counter() - started
+        gc.collect()
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rows = _row_count(case, result)
+        del result
+        per_row = max(rows, 1)
+        return Measurement(
+            case=case, kind=kind, size=size, rows=rows,
+            peak_bytes=peak - before, retained_bytes=after - before,
+            peak_bytes_per_row=round((peak - before) / per_row, 1),
+            retained_bytes_per_row=round((after - before) / per_row, 1),
+            peak_rss_bytes=(sampler.peak - sampler.start) if sampler else None,
+            seconds=round(seconds, 4),
+        )
+    finally:
+        session.close()
+
+
+def run(sizes: List[int], cases: List[str], rss: bool = False, workdir: Optional[str] = None) -> List[Measurement]:
+    """Seed one database per size and profile every case against it"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for size in sizes:
+            url = f"sqlite:///{os.path.join(tmp, f'profile_{size}.db')}"
+            seed(url, size)
+            engine = create_engine(url)
+            session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            for case in cases:
+                results.append(measure(case, session_factory, size, rss))
+            engine.dispose()
+    return results
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "pydantic": pydantic.VERSION,
+    }
+
+
+def save_baseline(results: List[Measurement], path: str = BASELINE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"environment": environment(), "results": [asdict(r) for r in results]}, fh, indent=2)
+        fh.write("\n")
+
+
+def compare(results: List[Measurement], path: str = BASELINE_PATH, tolerance: float = 0.2) -> List[str]:
+    """
+    Diff results against the stored baseline
+    :return: Descriptions of the measurements whose bytes per row grew beyond tolerance
+    """
+    with open(path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if baseline["environment"] != environment():
+        print(f"⚠️ Baseline recorded with {baseline['environment']}, running {environment()}")
+    previous = {(r["case"], r["size"]): r for r in baseline["results"]}
+
+    regressions = []
+    print(f"\n{'case':<40} {'size':>7} {'peak B/row':>22} {'retained B/row':>22}")
+    for r in results:
+        old = previous.get((r.case, r.size))
+        if old is None:
+            print(f"{r.case:<40} {r.size:>7} {'(not in baseline)':>22}")
+            continue
+        cells = []
+        for metric in ("peak_bytes_per_row", "retained_bytes_per_row"):
+            new_value, old_value = getattr(r, metric), old[metric]
+            change = (new_value - old_value) / old_value if old_value > 0 else 0.0
+            cells.append(f"{old_value:>9.0f} -> {new_value:>6.0f} {change:+5.0%}")
+            if change > tolerance and new_value - old_value > 64:
+                regressions.append(f"{r.case} @ {r.size}: {metric} {old_value:.0f} -> {new_value:.0f} ({change:+.0%})")
+        print(f"{r.case:<40} {r.size:>7} {cells[0]:>22} {cells[1]:>22}")
+    return regressions
+
+
+def report(results: List[Measurement]):
+    print(f"{'case':<40} {'size':>7} {'rows':>7} {'peak MiB':>9} {'peak B/row':>11} "
+          f"{'retained B/row':>15} {'RSS MiB':>8} {'seconds':>8}")
+    for r in results:
+        rss = f"{r.peak_rss_bytes / 2**20:8.1f}" if r.peak_rss_bytes is not None else f"{'-':>8}"
+        print(f"{r.case:<40} {r.size:>7} {r.rows:>7} {r.peak_bytes / 2**20:9.1f} {r.peak_bytes_per_row:11.0f} "
+              f"{r.retained_bytes_per_row:15.0f} {rss} {r.seconds:8.3f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile memory of service read methods")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma separated number of users (and subscriptions) per seeded database")
+    parser.add_argument("--cases", default=None, help=f"Comma separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--rss", action="store_true", help="Also sample peak RSS (requires psutil)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed bytes-per-row growth, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    cases = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+    if args.rss:
+        try:
+            import psutil  # noqa: F401
+        except ImportError:
+            print("⚠️ psutil is not installed, RSS sampling disabled")
+            args.rss = False
+
+    results = run(sizes, cases, args.rss)
+    report(results)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Memory regressions:\n  " + "\n  ".join(regressions))
+            if args.check:
+                return 1
+    elif args.check:
+        print(f"❌ No baseline at {args.baseline}, run with --save-baseline first")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+AClimate V3 ORM Frontend.
+
+Subpackages and public names are imported on first access (PEP 562), so importing
+the package, its schemas or its enums is cheap and does not touch the database.
+"""
+from typing import TYPE_CHECKING
+from ._lazy import lazy_exports
+
+_EXPORTS = {
+    # Subpackages
+    "cache": ".cache",
+    "database": ".database",
+    "enums": ".enums",
+    "models": ".models",
+    "schemas": ".schemas",
+    "services": ".services",
+    "transfer": ".transfer",
+    "validations": ".validations",
+    # Models
+    "App": ".models",
+    "User": ".models",
+    "WsInterested": ".models",
+    "Counter": ".models",
+    "OutboxEvent": ".models",
+    "Tombstone": ".models",
+    # Services
+    "AppService": ".services",
+    "UserService": ".services",
+    "WsInterestedService": ".services",
+    "CounterService": ".services",
+    "OutboxService": ".services",
+    # Schemas
+    "AppCreate": ".schemas", "AppRead": ".schemas", "AppUpdate": ".schemas",
+    "UserCreate": ".schemas", "UserRead": ".schemas", "UserUpdate": ".schemas",
+    "WsInterestedCreate": ".schemas", "WsInterestedRead": ".schemas", "WsInterestedUpdate": ".schemas",
+    "CounterRead": ".schemas", "OutboxEventRead": ".schemas", "TombstoneRead": ".schemas",
+    "QuerySpec": ".schemas", "FieldFilter": ".schemas",
+    # Enums
+    "ProfileType": ".enums",
+}
+
+__all__ = [name for name, target in _EXPORTS.items() if target.lstrip(".") != name]
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .models import App, User, WsInterested, Counter, OutboxEvent, Tombstone
+    from .services import AppService, UserService, WsInterestedService, CounterService, OutboxService
+    from .schemas import (
+        AppCreate, AppRead, AppUpdate,
+        UserCreate, UserRead, UserUpdate,
+        WsInterestedCreate, WsInterestedRead, WsInterestedUpdate,
+        CounterRead, OutboxEventRead, TombstoneRead, QuerySpec, FieldFilter
+    )
+    from .enums import ProfileType
@@ -1,12 +1,101 @@
-from .database.base import Base, create_tables
-from .database import engine, get_db
-from .models import *
-from .services import *
-from .schemas import *
+import argparse
+
+# Commands import what they need when they run, so the CLI starts fast and
+# only needs DATABASE_URL_FRONT for commands that use the database
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="aclimate_v3_orm_frontend", description="AClimate frontend ORM tools")
+    commands = parser.add_subparsers(dest="command")
+
+    export = commands.add_parser("export", help="Stream a table to a Parquet, Arrow or NDJSON file")
+    export.add_argument("table", choices=["apps", "users", "ws_interested"])
+    export.add_argument("output", help="Output file path")
+    export.add_argument("--format", choices=["ndjson", "parquet", "arrow"], default="ndjson")
+    export.add_argument("--batch-size", type=int, default=10000)
+    export.add_argument("--flatten-notification", action="store_true",
+                        help="Expand the notification JSON column into notification.<key> columns")
+    export.add_argument("--filter", action="append", default=[], metavar="COLUMN=VALUE",
+                        help="Equality filter, can be repeated")
+    export.add_argument("--spec", metavar="JSON",
+                        help='QuerySpec as JSON, e.g. \'{"filters": [{"field": "register", "op": "gte", "value": "2024-01-01"}]}\'')
+
+    load = commands.add_parser("import", help="Bulk load a CSV or NDJSON file into a table")
+    load.add_argument("table", choices=["apps", "users", "ws_interested"])
+    load.add_argument("input", help="CSV or NDJSON file path")
+    load.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    load.add_argument("--chunk-size", type=int, default=5000)
+    load.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint and start from the beginning")
+    load.add_argument("--checkpoint", help="Checkpoint file, defaults to <input>.checkpoint.json")
+    load.add_argument("--rejects", help="Rejected rows file, defaults to <input>.rejects.ndjson")
+
+    counters = commands.add_parser("counters", help="Manage the precomputed subscriber and user counters")
+    counters.add_argument("action", choices=["rebuild"], help="rebuild: recompute every counter from scratch")
+
+    commands.add_parser("search-index", help="Create the indexed app name search (FTS5 on SQLite, pg_trgm on PostgreSQL)")
+    return parser
+
+
+def _parse_filters(items):
+    filters = {}
+    for item in items:
+        column, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"Invalid filter '{item}', expected COLUMN=VALUE")
+        filters[column] = {"true": True, "false": False}.get(value.lower(), value)
+    return filters
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "export":
+        from .schemas.query_spec import QuerySpec
+        from .transfer.exporter import export_table
+        stats = export_table(
+            args.table,
+            args.output,
+            format=args.format,
+            filters=_parse_filters(args.filter),
+            spec=QuerySpec.model_validate_json(args.spec) if args.spec else None,
+            batch_size=args.batch_size,
+            flatten_notification=args.flatten_notification,
+            progress=lambda s: print(f"\r{s}", end="", flush=True),
+        )
+        print(f"\r✅ Exported {stats}")
+        return
+
+    if args.command == "import":
+        from .transfer.importer import import_file
+        stats = import_file(
+            args.table,
+            args.input,
+            format=args.format,
+            chunk_size=args.chunk_size,
+            resume=not args.no_resume,
+            checkpoint_path=args.checkpoint,
+            rejects_path=args.rejects,
+            progress=lambda s: print(f"\r{s}", end="", flush=True),
+        )
+        print(f"\r✅ Imported {stats}")
+        return
+
+    if args.command == "counters":
+        from .services.counter_service import CounterService
+        written = CounterService().rebuild()
+        print("✅ Rebuilt counters: " + ", ".join(f"{name}={count}" for name, count in written.items()))
+        return
+
+    if args.command == "search-index":
+        from .database import SessionLocal, get_engine
+        from .database.search import create_search_index
+        shard_map = SessionLocal.kw.get("shard_map")
+        engines = shard_map.engines.values() if shard_map is not None else [get_engine()]
+        if all([create_search_index(engine) for engine in engines]):
+            print("✅ Name search index created")
+        return
 
-def main():
     print("ORM Installed")
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,28 @@
+import importlib
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Build the module-level __getattr__ and __dir__ (PEP 562) of a package whose public
+    names are imported on first access instead of when the package is imported.
+    :param package: Package __name__
+    :param exports: Public name -> relative module that defines it. A name mapped to
+                    itself (e.g. "services": ".services") exposes the submodule
+    :return: (__getattr__, __dir__)
+    """
+    module_globals = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str) -> Any:
+        target = exports.get(name)
+        if target is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = importlib.import_module(target, package)
+        value = module if target.lstrip(".") == name else getattr(module, name)
+        module_globals[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(module_globals) | set(exports))
+
+    return __getattr__, __dir__
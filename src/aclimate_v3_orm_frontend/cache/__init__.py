@@ -0,0 +1,11 @@
+from .identity_cache import IdentityCache
+from .query_cache import QueryCache, TableVersions, table_versions
+from .subscriber_index import SubscriberIndex
+
+__all__ = [
+    "IdentityCache",
+    "QueryCache",
+    "SubscriberIndex",
+    "TableVersions",
+    "table_versions"
+]
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+_MISSING = object()
+# Session.info key holding the identity cache invalidations of the session's current transaction
+_PENDING_INVALIDATIONS = "aclimate_identity_invalidations"
+
+
+class IdentityCache:
+    """
+    Bounded, thread-safe LRU cache used to resolve Keycloak identities.
+
+    Entries map a key (usually ``(ext_key_clock_id, app_id)``) to a read schema.
+    A value of ``None`` is a negative entry: the subject is known not to exist
+    (or to be disabled) and is kept for ``negative_ttl`` seconds so repeated
+    requests for unknown subjects do not hit the database.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = 300.0, negative_ttl: Optional[float] = 30.0):
+        """
+        :param maxsize: Maximum number of entries (positive and negative) kept in memory
+        :param ttl: Seconds a positive entry stays valid, None for no expiration
+        :param negative_ttl: Seconds a negative entry stays valid, None for no expiration
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._keys_by_id: Dict[int, Hashable] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a key.
+        :param key: Cache key
+        :return: Tuple (found, value). value is None for negative entries
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return False, None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            if value is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, value
+
+    def generation(self) -> int:
+        """
+        Current invalidation generation. Take it before loading a value from the
+        database and pass it to put() so a concurrent invalidation is not overwritten.
+        """
+        with self._lock:
+            return self._generation
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Store a value (or a negative entry when value is None).
+        :param key: Cache key
+        :param value: Read schema with an ``id`` attribute, or None
+        :param generation: Generation returned by generation() before loading the value
+        :return: True if the value was stored
+        """
+        ttl = self.ttl if value is not None else self.negative_ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._remove(key)
+            self._entries[key] = (value, expires_at)
+            if value is not None:
+                self._keys_by_id[value.id] = key
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+            return True
+
+    def invalidate(self, key: Hashable):
+        """Drop a single key, positive or negative"""
+        with self._lock:
+            self._generation += 1
+            self._remove(key)
+
+    def invalidate_id(self, id: int):
+        """Drop the entry holding the record with the given primary key, if any"""
+        with self._lock:
+            self._generation += 1
+            key = self._keys_by_id.get(id)
+            if key is not None:
+                self._remove(key)
+
+    def invalidate_for_transaction(self, session: Optional[Session], keys: Iterable[Hashable] = (),
+                                   ids: Iterable[int] = ()):
+        """
+        Invalidate keys and record IDs written in the session's transaction. They are dropped
+        now (so the writer never reads its own stale entry) and again when the transaction
+        ends, committed or not, so entries other sessions loaded from the old row in between
+        are discarded too.
+        :param session: Session of the write. None drops the entries only once
+        :param keys: Cache keys to drop
+        :param ids: Primary keys of the records whose entries must be dropped
+        """
+        keys, ids = tuple(keys), tuple(ids)
+        self._invalidate_all(keys, ids)
+        if session is not None:
+            session.info.setdefault(_PENDING_INVALIDATIONS, []).append((self, keys, ids))
+
+    def clear(self):
+        """Drop every entry and reset statistics"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_id.clear()
+            self.hits = self.negative_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _invalidate_all(self, keys: Tuple[Hashable, ...], ids: Tuple[int, ...]):
+        for id in ids:
+            self.invalidate_id(id)
+        for key in keys:
+            self.invalidate(key)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, _MISSING)
+        if entry is not _MISSING and entry[0] is not None:
+            self._keys_by_id.pop(entry[0].id, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_written_identities(session: Session, transaction: SessionTransaction):
+    if transaction.parent is not None:
+        return
+    for cache, keys, ids in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        cache._invalidate_all(keys, ids)
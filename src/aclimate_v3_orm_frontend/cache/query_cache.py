@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, SessionTransaction
+
+_MISSING = object()
+# Session.info key holding the tables written in the session's current transaction
+_WRITTEN_TABLES = "aclimate_written_tables"
+
+Versions = Tuple[Tuple[str, int], ...]
+
+
+class TableVersions:
+    """
+    Process-wide version counter per table. Every write through the services bumps the
+    counter of its table, so results cached with an older version are known to be stale.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self, tables: Iterable[str]) -> Versions:
+        """Current versions of the given tables"""
+        with self._lock:
+            return tuple((table, self._versions.get(table, 0)) for table in tables)
+
+    def bump(self, *tables: str):
+        """Mark the given tables as changed"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def is_current(self, versions: Versions) -> bool:
+        with self._lock:
+            return all(self._versions.get(table, 0) == version for table, version in versions)
+
+
+table_versions = TableVersions()
+
+
+def track_write(session: Session, table: str):
+    """
+    Record a write to a table made in the session's transaction. The table version is bumped
+    now (so the writer never reads a cached result from before its own write) and again when
+    the transaction ends, committed or not, so results other sessions cached in between are
+    discarded too.
+    """
+    table_versions.bump(table)
+    session.info.setdefault(_WRITTEN_TABLES, set()).add(table)
+
+
+def has_pending_writes(session: Session, tables: Optional[Iterable[str]] = None) -> bool:
+    """
+    Whether the session's current transaction wrote (through the services or ORM flushes)
+    to any table, or to one of the given tables
+    """
+    written = session.info.get(_WRITTEN_TABLES)
+    if not written:
+        return False
+    return tables is None or not written.isdisjoint(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_tables(session: Session, flush_context):
+    # ORM objects written outside the services (session.add() + flush) count as writes too
+    for table in {inspect(obj).mapper.local_table.name for obj in (*session.new, *session.dirty, *session.deleted)}:
+        track_write(session, table)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _bump_written_tables(session: Session, transaction: SessionTransaction):
+    if transaction.parent is not None:
+        return
+    tables = session.info.pop(_WRITTEN_TABLES, None)
+    if tables:
+        table_versions.bump(*tables)
+
+
+class QueryCache:
+    """
+    Bounded, thread-safe LRU cache of service query results (lists of read schemas).
+
+    Each entry remembers the versions of the tables it was read from; it is served only
+    while none of those tables has been written since, so cached lists are never stale
+    for writes made through the services of this process. Writes made in other processes
+    or with raw SQL are not seen: use ``ttl`` to bound how long such changes can be missed.
+    """
+
+    def __init__(self, maxsize: int = 1000, max_rows: int = 100000, ttl: Optional[float] = None):
+        """
+        :param maxsize: Maximum number of cached results
+        :param max_rows: Maximum number of rows kept across all cached results. Results larger
+                         than this are not cached
+        :param ttl: Seconds an entry stays valid, None for no expiration
+        """
+        if maxsize <= 0 or max_rows <= 0:
+            raise ValueError("maxsize and max_rows must be positive integers")
+        self.maxsize = maxsize
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[List[Any], Versions, Optional[float]]]" = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Optional[List[Any]]]:
+        """
+        Look up a key.
+        :param key: Cache key
+        :return: Tuple (found, value). Stale or expired entries count as misses
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return False, None
+            value, versions, expires_at = entry
+            if not table_versions.is_current(versions) or (expires_at is not None and expires_at <= time.monotonic()):
+                self._remove(key)
+                self.stale += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: Hashable, value: List[Any], versions: Versions) -> bool:
+        """
+        Store a result.
+        :param key: Cache key
+        :param value: List of read schemas
+        :param versions: table_versions.snapshot() taken before the result was loaded
+        :return: True if the value was stored
+        """
+        if len(value) > self.max_rows or not table_versions.is_current(versions):
+            return False
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, versions, expires_at)
+            self._rows += len(value)
+            while len(self._entries) > self.maxsize or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        """Drop every entry and reset statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+            self.hits = self.misses = self.stale = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, hit rate and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "rows": self._rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, _MISSING)
+        if entry is not _MISSING:
+            self._rows -= len(entry[0])
@@ -0,0 +1,264 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+# Session.info key holding the index changes staged by the session's current transaction
+_STAGED_CHANGES = "aclimate_subscriber_index_changes"
+# Typecode of the id arrays: 4-byte signed integers, like the Integer primary keys
+_TYPECODE = "i"
+_EMPTY = -1
+# Above this many users, enable changes are applied in one Python pass over the subscriptions
+_SCAN_USERS = 32
+
+
+class SubscriberIndex:
+    """
+    Compact in-memory index of the enabled users following each weather station, to answer
+    "who follows station X" without touching the database.
+
+    Station ids are interned to small integers; each station keeps the ids of its enabled
+    subscribers in a sorted array('i'). Two arrays indexed by subscription id remember the
+    user and station of every subscription, so updates and deletes need no lookup. About
+    12 bytes per subscription plus the station names.
+
+    Load it with WsInterestedService.load_subscriber_index(). Once set as
+    WsInterestedService.subscriber_index, the write paths of WsInterestedService and
+    UserService keep it up to date when their transactions commit; changes made elsewhere
+    can be picked up with WsInterestedService.poll_subscriber_index().
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._station_ids: Dict[str, int] = {}
+        self._station_names: List[str] = []
+        self._members: List[array] = []
+        self._sub_user = array(_TYPECODE)
+        self._sub_station = array(_TYPECODE)
+        self._disabled: Set[int] = set()
+        # Changes applied while load() builds new structures, replayed on them afterwards
+        self._replay: Optional[List[Tuple[Callable[..., None], tuple]]] = None
+
+    # Queries
+
+    def subscribers(self, ws_ext_id: str) -> array:
+        """Sorted ids of the enabled users following a station (empty if unknown)"""
+        with self._lock:
+            station = self._station_ids.get(ws_ext_id)
+            return array(_TYPECODE, self._members[station]) if station is not None else array(_TYPECODE)
+
+    def subscribers_many(self, ws_ext_ids: Iterable[str]) -> Dict[str, array]:
+        """Sorted subscriber ids per station"""
+        with self._lock:
+            return {ws_ext_id: self.subscribers(ws_ext_id) for ws_ext_id in ws_ext_ids}
+
+    def subscribers_of_any(self, ws_ext_ids: Iterable[str]) -> array:
+        """Sorted ids, without duplicates, of the enabled users following any of the stations"""
+        with self._lock:
+            members = [self._members[self._station_ids[s]] for s in set(ws_ext_ids) if s in self._station_ids]
+            if len(members) == 1:
+                return array(_TYPECODE, members[0])
+            return array(_TYPECODE, sorted(set().union(*members)))
+
+    def count(self, ws_ext_id: str) -> int:
+        """Number of enabled users following a station"""
+        with self._lock:
+            station = self._station_ids.get(ws_ext_id)
+            return len(self._members[station]) if station is not None else 0
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Size of the index and bytes it takes (arrays, containers and station names)"""
+        with self._lock:
+            subscriptions = sum(1 for station in self._sub_station if station != _EMPTY)
+            size = (
+                sys.getsizeof(self._station_ids) + sys.getsizeof(self._station_names)
+                + sum(sys.getsizeof(name) for name in self._station_names)
+                + sys.getsizeof(self._members) + sum(sys.getsizeof(members) for members in self._members)
+                + sys.getsizeof(self._sub_user) + sys.getsizeof(self._sub_station)
+                + sys.getsizeof(self._disabled)
+            )
+            return {
+                "stations": len(self._station_names),
+                "subscriptions": subscriptions,
+                "disabled_users": len(self._disabled),
+                "bytes": size,
+                "bytes_per_subscription": round(size / subscriptions, 1) if subscriptions else 0.0,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._station_names)
+
+    # Bulk load
+
+    def load(self, rows: Iterable[Tuple[int, Optional[int], str, Optional[bool]]], disabled_users: Iterable[int] = ()):
+        """
+        Replace the content of the index. Changes applied while the rows are read are kept.
+        :param rows: (subscription id, user_id, ws_ext_id, user enabled) for every subscription
+        :param disabled_users: IDs of every disabled user, including those without subscriptions,
+                               so the subscriptions they make later are not indexed as enabled
+        """
+        with self._lock:
+            self._replay = []
+        try:
+            fresh = SubscriberIndex()
+            fresh._disabled.update(disabled_users)
+            lists: List[array] = []
+            for sub_id, user_id, ws_ext_id, enabled in rows:
+                if user_id is None:
+                    continue
+                station = fresh._intern(ws_ext_id, lists)
+                fresh._ensure_capacity(sub_id)
+                fresh._sub_user[sub_id] = user_id
+                fresh._sub_station[sub_id] = station
+                if enabled is False:
+                    fresh._disabled.add(user_id)
+                else:
+                    lists[station].append(user_id)
+            fresh._members = [array(_TYPECODE, sorted(users)) for users in lists]
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+
+        with self._lock:
+            replay, self._replay = self._replay, None
+            self._station_ids, self._station_names = fresh._station_ids, fresh._station_names
+            self._members, self._disabled = fresh._members, fresh._disabled
+            self._sub_user, self._sub_station = fresh._sub_user, fresh._sub_station
+            for method, args in replay:
+                method(self, *args)
+
+    # Incremental changes (applied directly; the services stage them until commit with stage())
+
+    def put_subscription(self, sub_id: int, user_id: Optional[int] = None, ws_ext_id: Optional[str] = None):
+        """
+        Add or change a subscription. Missing user_id or ws_ext_id keep their indexed value;
+        subscriptions not in the index are only added when both are given
+        """
+        with self._lock:
+            self._log(SubscriberIndex.put_subscription, (sub_id, user_id, ws_ext_id))
+            old_user, old_station = self._subscription(sub_id)
+            if user_id is None:
+                user_id = old_user
+            station = self._intern(ws_ext_id) if ws_ext_id is not None else old_station
+            if user_id == _EMPTY or station == _EMPTY:
+                return
+            self._drop(sub_id)
+            self._ensure_capacity(sub_id)
+            self._sub_user[sub_id] = user_id
+            self._sub_station[sub_id] = station
+            if user_id not in self._disabled:
+                insort(self._members[station], user_id)
+
+    def remove_subscription(self, sub_id: int):
+        """Remove a deleted subscription"""
+        with self._lock:
+            self._log(SubscriberIndex.remove_subscription, (sub_id,))
+            self._drop(sub_id)
+
+    def set_users_enabled(self, users: Dict[int, bool]):
+        """
+        Apply enable/disable changes of users: their subscriptions are added to or removed
+        from their stations. One pass over the subscriptions for the whole batch
+        """
+        with self._lock:
+            self._log(SubscriberIndex.set_users_enabled, (dict(users),))
+            changed = {user_id: enabled for user_id, enabled in users.items()
+                       if enabled == (user_id in self._disabled)}
+            if not changed:
+                return
+            for sub_id, user_id in self._subscriptions_of(changed):
+                members = self._members[self._sub_station[sub_id]]
+                if changed[user_id]:
+                    insort(members, user_id)
+                else:
+                    _remove_sorted(members, user_id)
+            for user_id, enabled in changed.items():
+                if enabled:
+                    self._disabled.discard(user_id)
+                else:
+                    self._disabled.add(user_id)
+
+    def stage(self, session: Session, method: Callable[..., None], *args):
+        """
+        Apply a change when the session's transaction commits (it is discarded on rollback)
+        :param session: Session of the write
+        :param method: SubscriberIndex method, e.g. SubscriberIndex.remove_subscription
+        :param args: Arguments of the method
+        """
+        session.info.setdefault(_STAGED_CHANGES, []).append((self, method, args))
+
+    # Internals
+
+    def _intern(self, ws_ext_id: str, lists: Optional[List[array]] = None) -> int:
+        station = self._station_ids.get(ws_ext_id)
+        if station is None:
+            station = self._station_ids[ws_ext_id] = len(self._station_names)
+            self._station_names.append(ws_ext_id)
+            (self._members if lists is None else lists).append(array(_TYPECODE))
+        return station
+
+    def _subscription(self, sub_id: int) -> Tuple[int, int]:
+        if 0 <= sub_id < len(self._sub_user):
+            return self._sub_user[sub_id], self._sub_station[sub_id]
+        return _EMPTY, _EMPTY
+
+    def _subscriptions_of(self, users: Dict[int, bool]) -> Iterator[Tuple[int, int]]:
+        """(subscription id, user_id) of the subscriptions of the given users"""
+        if len(users) > _SCAN_USERS:
+            return ((sub_id, user_id) for sub_id, user_id in enumerate(self._sub_user) if user_id in users)
+        # array.index() scans in C: one scan per user beats a Python loop for a few users
+        found = []
+        for user_id in users:
+            position = -1
+            while True:
+                try:
+                    position = self._sub_user.index(user_id, position + 1)
+                except ValueError:
+                    break
+                found.append((position, user_id))
+        return iter(found)
+
+    def _drop(self, sub_id: int):
+        user_id, station = self._subscription(sub_id)
+        if station == _EMPTY:
+            return
+        if user_id not in self._disabled:
+            _remove_sorted(self._members[station], user_id)
+        self._sub_user[sub_id] = _EMPTY
+        self._sub_station[sub_id] = _EMPTY
+
+    def _ensure_capacity(self, sub_id: int):
+        missing = sub_id + 1 - len(self._sub_user)
+        if missing > 0:
+            # Grow geometrically so consecutive inserts do not copy the arrays each time
+            missing = max(missing, len(self._sub_user) // 2)
+            self._sub_user.extend(array(_TYPECODE, [_EMPTY]) * missing)
+            self._sub_station.extend(array(_TYPECODE, [_EMPTY]) * missing)
+
+    def _log(self, method: Callable[..., None], args: tuple):
+        if self._replay is not None:
+            self._replay.append((method, args))
+
+
+def _remove_sorted(members: array, user_id: int):
+    position = bisect_left(members, user_id)
+    if position < len(members) and members[position] == user_id:
+        del members[position]
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged_changes(session: Session):
+    for index, method, args in session.info.pop(_STAGED_CHANGES, ()):
+        method(index, *args)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged_changes(session: Session, transaction: SessionTransaction):
+    # After a commit nothing is left; otherwise the transaction was rolled back or closed
+    if transaction.parent is None:
+        session.info.pop(_STAGED_CHANGES, None)
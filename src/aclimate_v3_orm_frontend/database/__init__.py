@@ -1,24 +1,77 @@
 import os
+import threading
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, scoped_session, Session
 from dotenv import load_dotenv
-from typing import Generator
+from typing import Any, Generator, Optional
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
 
-# Load environment variables
-load_dotenv()
+# The engine is created on first use, so importing models, schemas or services
+# does not need DATABASE_URL_FRONT nor open anything
+_engine: Optional[Engine] = None
+_engine_lock = threading.RLock()
 
-# Database configuration
-DATABASE_URL_FRONT = os.getenv("DATABASE_URL_FRONT")
-if not DATABASE_URL_FRONT:
-    raise ValueError("DATABASE_URL_FRONT not found in environment variables")
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL_FRONT)
+class _LazySessionMaker(sessionmaker):
+    """sessionmaker that configures the database the first time a session is created"""
 
-# Configure local session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def __call__(self, **local_kw) -> Session:
+        # Sharded sessions (see sharding.configure_sharding) bring their own engines
+        if self.kw.get("bind") is None and local_kw.get("bind") is None and "shard_map" not in self.kw:
+            get_engine()
+        return super().__call__(**local_kw)
+
+
+# Configure local session factory (bound to the engine on first use)
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False)
+
+# Optional thread-local session registry: ScopedSession() returns the same session
+# for every call made from the same thread until remove_scoped_db() is called
+ScopedSession = scoped_session(SessionLocal)
+
+
+def configure(url: Optional[str] = None, **engine_kwargs: Any) -> Engine:
+    """
+    Create the SQLAlchemy engine and bind SessionLocal to it.
+    Called automatically on first use; call it explicitly to use another URL or engine options.
+    :param url: Database URL. Defaults to DATABASE_URL_FRONT from the environment or a .env file
+    :param engine_kwargs: Extra create_engine() arguments, e.g. pool_size
+    :return: The engine
+    :raises ValueError: If no URL is given and DATABASE_URL_FRONT is not set
+    """
+    global _engine
+    with _engine_lock:
+        if url is None:
+            # Load environment variables
+            load_dotenv()
+            url = os.getenv("DATABASE_URL_FRONT")
+        if not url:
+            raise ValueError("DATABASE_URL_FRONT not found in environment variables")
+        if _engine is not None:
+            _engine.dispose()
+        _engine = create_engine(url, **engine_kwargs)
+        SessionLocal.configure(bind=_engine)
+        return _engine
+
+
+def get_engine() -> Engine:
+    """Return the SQLAlchemy engine, creating it from DATABASE_URL_FRONT on first use"""
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                configure()
+    return _engine
+
+
+def __getattr__(name: str):
+    # Backwards compatible lazy module attributes (PEP 562)
+    if name == "engine":
+        return get_engine()
+    if name == "DATABASE_URL_FRONT":
+        return get_engine().url.render_as_string(hide_password=False)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 @contextmanager
 def get_db() -> Generator[Session, None, None]:
@@ -45,4 +98,35 @@ def get_db() -> Generator[Session, None, None]:
         print(f"Unexpected error: {str(e)}")
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def get_scoped_db() -> Generator[Session, None, None]:
+    """
+    Transaction on the current thread's session from the ScopedSession registry:
+    1. Reuses the same session for every block in the same thread
+    2. Commits on success and rolls back on error
+    3. Does NOT close the session: call remove_scoped_db() when the thread's
+       unit of work ends (e.g. at the end of each worker task)
+
+    Usage:
+        with get_scoped_db() as db:
+            # Your database operations
+    """
+    db = ScopedSession()
+    try:
+        yield db
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error: {str(e)}")
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"Unexpected error: {str(e)}")
+        raise
+
+
+def remove_scoped_db():
+    """Close the current thread's scoped session and return its connection to the pool"""
+    ScopedSession.remove()
@@ -1,18 +1,26 @@
 from sqlalchemy.orm import declarative_base
-from . import engine
+from . import SessionLocal, get_engine
 
 Base = declarative_base()
 
 
-def create_tables():
+def create_tables(search_index: bool = False):
     """
-    Creates all tables defined in SQLAlchemy models.
+    Creates all tables defined in SQLAlchemy models, in every shard when sharding is configured.
+    With search_index=True also creates the indexed name search of AppService.search_by_name
+    (see database.search.create_search_index).
     
     Raises:
         Exception: If table creation fails, the original exception is re-raised.
     """
     try:
-        Base.metadata.create_all(bind=engine)
+        shard_map = SessionLocal.kw.get("shard_map")
+        engines = shard_map.engines.values() if shard_map is not None else [get_engine()]
+        for engine in engines:
+            Base.metadata.create_all(bind=engine)
+            if search_index:
+                from .search import create_search_index
+                create_search_index(engine)
         print("✅ Tables created successfully.")
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
@@ -0,0 +1,91 @@
+import csv
+import enum
+import io
+import json
+import sqlite3
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from sqlalchemy import JSON, Boolean, Table, insert
+from sqlalchemy.orm import Session
+from .sharding import bind_arguments, dialect_name
+
+# Maximum number of bound parameters per statement for each dialect
+_MAX_BIND_PARAMS = {
+    "sqlite": 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999,
+    "postgresql": 32767,
+    "mysql": 65535,
+    "mssql": 2100,
+    "oracle": 1000,
+}
+
+
+def max_bind_params(session: Session) -> int:
+    """Maximum number of bound parameters a single statement can carry on the session's dialect"""
+    return _MAX_BIND_PARAMS.get(dialect_name(session), 999)
+
+
+def chunked(values: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Split a sequence in consecutive slices of at most size items"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def bulk_insert(session: Session, table: Table, rows: List[Dict[str, Any]], shard_id: Optional[str] = None) -> int:
+    """
+    Insert many rows in a single round trip, without loading ORM objects.
+    Uses COPY on PostgreSQL (psycopg2) and executemany on every other dialect.
+    The caller owns the transaction: nothing is committed here.
+    :param session: SQLAlchemy session
+    :param table: Target table
+    :param rows: Dictionaries column -> value, all with the same keys
+    :param shard_id: Target shard when the session is sharded
+    :return: Number of rows inserted
+    """
+    if not rows:
+        return 0
+    if dialect_name(session, shard_id) == "postgresql":
+        return _copy_insert(session, table, rows, shard_id)
+    session.execute(insert(table), rows, bind_arguments=bind_arguments(shard_id))
+    return len(rows)
+
+
+def _copy_insert(session: Session, table: Table, rows: List[Dict[str, Any]], shard_id: Optional[str] = None) -> int:
+    # COPY bypasses SQLAlchemy, so Python-side column defaults are applied here
+    defaults = {
+        column.name: column.default
+        for column in table.columns
+        if column.default is not None and column.name not in rows[0]
+    }
+    columns = list(rows[0]) + list(defaults)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = [row[name] for name in rows[0]]
+        values.extend(default.arg(None) if default.is_callable else default.arg for default in defaults.values())
+        writer.writerow(_copy_value(table.c[name], value) for name, value in zip(columns, values))
+    buffer.seek(0)
+
+    column_list = ", ".join(f'"{name}"' for name in columns)
+    sql = f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'
+    cursor = session.connection(bind_arguments=bind_arguments(shard_id)).connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def _copy_value(column, value: Any) -> Any:
+    if value is None:
+        return "\\N"
+    if isinstance(column.type, JSON):
+        return json.dumps(value)
+    if isinstance(value, enum.Enum):
+        # SQLAlchemy Enum columns persist the member name
+        return value.name
+    if isinstance(column.type, Boolean):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+from sqlalchemy.orm import Session, sessionmaker
+from . import SessionLocal, get_engine
+
+
+def run_concurrent_reads(
+    calls: Sequence[Callable[..., Any]],
+    max_workers: Optional[int] = None,
+    return_exceptions: bool = False,
+    session_factory: sessionmaker = SessionLocal,
+) -> List[Any]:
+    """
+    Run independent read calls concurrently on a bounded thread pool and gather the results.
+    Each call receives its own session (and pooled connection) through the ``db`` keyword.
+
+    Usage:
+        results = run_concurrent_reads([
+            partial(user_service.get_by_app, app_id) for app_id in app_ids
+        ])
+
+    :param calls: Callables accepting a ``db`` keyword argument, e.g. bound service methods
+                  wrapped with functools.partial
+    :param max_workers: Maximum threads. Defaults to the connection pool size so
+                        workers never wait for (or open overflow) connections
+    :param return_exceptions: Return raised exceptions in place of results instead of raising
+                              the first one
+    :param session_factory: Session factory used by the workers
+    :return: Results in the same order as calls
+    """
+    if not calls:
+        return []
+    workers = min(len(calls), max_workers or _pool_size(session_factory))
+
+    def run(call: Callable[..., Any]) -> Any:
+        session: Session = session_factory()
+        try:
+            return call(db=session)
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="orm-read") as executor:
+        futures = [executor.submit(run, call) for call in calls]
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else future.result())
+        return results
+
+
+def _pool_size(session_factory: sessionmaker) -> int:
+    bind = session_factory.kw.get("bind")
+    shard_map = session_factory.kw.get("shard_map")
+    if bind is None and shard_map is not None:
+        # Sharded sessions take one connection per shard they read
+        bind = next(iter(shard_map.engines.values()))
+    elif bind is None and session_factory is SessionLocal:
+        bind = get_engine()
+    pool = getattr(bind, "pool", None)
+    return max(1, pool.size()) if hasattr(pool, "size") else 5
@@ -0,0 +1,57 @@
+import enum
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from .sharding import bind_arguments
+from ..models.outbox_event import OutboxEvent
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+# (shard_id, aggregate_id, event_type, payload). shard_id is None when the session is not sharded
+Event = Tuple[Optional[str], Optional[int], str, Dict[str, Any]]
+
+
+def jsonable(value: Any) -> Any:
+    """Convert a column value to something the JSON payload can hold"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    return value
+
+
+def row_snapshot(obj: Any) -> Dict[str, Any]:
+    """Every column of an ORM object, ready for an event payload"""
+    return {column.name: jsonable(getattr(obj, column.key)) for column in obj.__table__.columns}
+
+
+def record_events(session: Session, aggregate: str, events: List[Event]):
+    """
+    Write change events to the outbox inside the caller's transaction, with one
+    INSERT per shard, so they are committed (or rolled back) with the change itself
+    :param session: SQLAlchemy session of the write
+    :param aggregate: Table name of the changed rows
+    :param events: (shard_id, aggregate_id, event_type, payload) per change
+    """
+    now = datetime.now(timezone.utc)
+    by_shard: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    for shard_id, aggregate_id, event_type, payload in events:
+        by_shard[shard_id].append({
+            "aggregate": aggregate,
+            "aggregate_id": aggregate_id,
+            "event_type": event_type,
+            "payload": payload,
+            "created": now,
+            "available_at": now,
+            "attempts": 0,
+        })
+    for shard_id, rows in by_shard.items():
+        session.execute(insert(OutboxEvent.__table__), rows, bind_arguments=bind_arguments(shard_id))
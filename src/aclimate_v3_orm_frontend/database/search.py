@@ -0,0 +1,93 @@
+import weakref
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from .sharding import bind_arguments, session_shards
+
+# SQLite: FTS5 external content table over apps.name with the trigram tokenizer
+FTS_TABLE = "apps_name_fts"
+# PostgreSQL: pg_trgm GIN index on apps.name
+TRGM_INDEX = "ix_apps_name_trgm"
+# The trigram tokenizer cannot match terms shorter than one trigram
+MIN_TRIGRAM_TERM = 3
+
+FTS5 = "fts5"
+TRGM = "trgm"
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, content='apps', content_rowid='id', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON apps BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON apps BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name ON apps BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END""",
+    # Index the rows that existed before the triggers
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON apps USING gin (name gin_trgm_ops)",
+]
+
+# Engine -> search mode found on it (FTS5, TRGM or None), so it is only looked up once
+_modes: "weakref.WeakKeyDictionary[Engine, Optional[str]]" = weakref.WeakKeyDictionary()
+
+
+def create_search_index(engine: Engine) -> bool:
+    """
+    Create the indexed name search used by AppService.search_by_name: an FTS5 trigram table
+    kept in sync with apps by triggers on SQLite (3.34+), a pg_trgm GIN index on PostgreSQL
+    (the pg_trgm extension is created if missing, which needs the privilege to do so).
+    The apps table must exist.
+    :param engine: Engine of the database (or shard)
+    :return: True if the index exists afterwards, False on other dialects or on failure
+    """
+    statements = {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRES_DDL}.get(engine.dialect.name)
+    if statements is None:
+        print(f"⚠️ Indexed name search is not available on {engine.dialect.name}, search_by_name will use ILIKE")
+        return False
+    try:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    except SQLAlchemyError as e:
+        print(f"⚠️ Could not create the name search index: {str(e)}")
+        return False
+    _modes.pop(engine, None)
+    return True
+
+
+def search_mode(session: Session) -> Optional[str]:
+    """
+    Indexed name search available to the session: FTS5, TRGM or None (ILIKE fallback).
+    Sharded sessions only use it when every shard has the same one
+    """
+    modes = {_shard_mode(session, shard_id) for shard_id in session_shards(session)}
+    return modes.pop() if len(modes) == 1 else None
+
+
+def _shard_mode(session: Session, shard_id: Optional[str]) -> Optional[str]:
+    options = bind_arguments(shard_id)
+    engine = session.get_bind(**options)
+    if engine in _modes:
+        return _modes[engine]
+    queries = {
+        "sqlite": (FTS5, "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name", FTS_TABLE),
+        "postgresql": (TRGM, "SELECT 1 FROM pg_indexes WHERE indexname = :name", TRGM_INDEX),
+    }
+    mode = None
+    if engine.dialect.name in queries:
+        candidate, query, name = queries[engine.dialect.name]
+        # Looked up through the session so it runs on the session's own connection
+        if session.execute(text(query), {"name": name}, bind_arguments=options).first() is not None:
+            mode = candidate
+    _modes[engine] = mode
+    return mode
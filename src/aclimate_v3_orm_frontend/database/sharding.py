@@ -0,0 +1,383 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from sqlalchemy import Sequence, Table, create_engine, event, func, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.schema import CreateSequence
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ColumnClause
+from . import SessionLocal
+
+# Maximum number of shards. Ids are spread over this many residue classes, so it can only
+# be raised before any data is written
+DEFAULT_ID_STRIDE = 64
+
+# Column deciding the shard of each table's rows: apps by country, users and
+# subscriptions by the id of their parent row (which lives in the same shard)
+ROUTING_COLUMNS = {
+    "apps": "country_ext_id",
+    "users": "app_id",
+    "ws_interested": "user_id",
+}
+_COUNTRY_COLUMN = "country_ext_id"
+
+
+class ShardMap:
+    """
+    Maps each country_ext_id to the database holding its apps and, through them, their
+    users and subscriptions. Countries sharing a URL share a shard.
+
+    Primary keys are unique across shards: shard n allocates the ids n + 1, n + 1 + id_stride,
+    n + 1 + 2 * id_stride... so the shard of any row (and of the rows referencing it through
+    app_id or user_id) is known from its id alone.
+    """
+
+    def __init__(self, countries: Dict[str, Union[str, Engine]], default: Optional[Union[str, Engine]] = None,
+                 id_stride: int = DEFAULT_ID_STRIDE, **engine_kwargs: Any):
+        """
+        :param countries: country_ext_id -> database URL (or Engine)
+        :param default: Database URL (or Engine) for countries not listed, None to reject them
+        :param id_stride: Maximum number of shards, see DEFAULT_ID_STRIDE
+        :param engine_kwargs: Extra create_engine() arguments for the URLs
+        :raises ValueError: If no shard is given or there are more shards than id_stride
+        """
+        if not countries and default is None:
+            raise ValueError("At least one shard is required")
+        self.id_stride = id_stride
+        self.engines: Dict[str, Engine] = {}
+        self._shard_by_target: Dict[str, str] = {}
+        self._engine_kwargs = engine_kwargs
+        self._shard_by_country = {country: self._add_shard(target) for country, target in countries.items()}
+        self.default_shard = self._add_shard(default) if default is not None else None
+        if len(self.engines) > id_stride:
+            raise ValueError(f"Too many shards ({len(self.engines)}) for id_stride {id_stride}")
+        self._index = {shard_id: index for index, shard_id in enumerate(self.engines)}
+        self._shard_by_index = {index: shard_id for shard_id, index in self._index.items()}
+        self._sequences: Dict[Tuple[str, str], Sequence] = {}
+        self._sequences_lock = threading.Lock()
+
+    def _add_shard(self, target: Union[str, Engine]) -> str:
+        key = target.url.render_as_string(hide_password=False) if isinstance(target, Engine) else target
+        shard_id = self._shard_by_target.get(key)
+        if shard_id is None:
+            shard_id = f"shard_{len(self.engines)}"
+            self._shard_by_target[key] = shard_id
+            self.engines[shard_id] = target if isinstance(target, Engine) else create_engine(target, **self._engine_kwargs)
+        return shard_id
+
+    def shard_for_country(self, country_ext_id: str) -> str:
+        """
+        Shard holding the apps of a country
+        :raises ValueError: If the country is not mapped and there is no default shard
+        """
+        shard_id = self._shard_by_country.get(country_ext_id, self.default_shard)
+        if shard_id is None:
+            raise ValueError(f"No shard configured for country_ext_id: {country_ext_id}")
+        return shard_id
+
+    def shard_for_id(self, id: int) -> Optional[str]:
+        """Shard holding the row with the given primary key (or the rows referencing it)"""
+        return self._shard_by_index.get((int(id) - 1) % self.id_stride)
+
+    def shard_for_row(self, table: str, get_value: Callable[[str], Any]) -> str:
+        """
+        Shard a new row of a table belongs to
+        :param table: Table name
+        :param get_value: Returns the row's value for a column name
+        :raises ValueError: If the routing value is missing or unknown
+        """
+        column = ROUTING_COLUMNS.get(table)
+        if column is None:
+            raise ValueError(f"Table {table} is not sharded")
+        value = get_value(column)
+        if value is None:
+            raise ValueError(f"Cannot route a {table} row without {column}")
+        if column == _COUNTRY_COLUMN:
+            return self.shard_for_country(value)
+        shard_id = self.shard_for_id(value)
+        if shard_id is None:
+            raise ValueError(f"No shard holds {column}={value}")
+        return shard_id
+
+    def next_id(self, shard_id: str, current_max: Optional[int]) -> int:
+        """Smallest id of the shard greater than current_max"""
+        base = current_max or 0
+        return base + 1 + (self._index[shard_id] - base) % self.id_stride
+
+    def id_sequence(self, shard_id: str, table: Table) -> Sequence:
+        """
+        PostgreSQL sequence allocating the ids of a table in a shard: INCREMENT BY id_stride,
+        starting at the shard's next id after its current maximum. Created on first use
+        (in its own autocommit connection, so every process shares it)
+        :param shard_id: Shard
+        :param table: Table
+        """
+        key = (shard_id, table.name)
+        with self._sequences_lock:
+            sequence = self._sequences.get(key)
+            if sequence is not None:
+                return sequence
+            pk = table.primary_key.columns[0]
+            with self.engines[shard_id].connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                start = self.next_id(shard_id, connection.execute(select(func.max(pk))).scalar())
+                sequence = self._id_sequence(shard_id, table, start)
+                try:
+                    connection.execute(CreateSequence(sequence, if_not_exists=True))
+                except DBAPIError:
+                    # Another process created it at the same time
+                    pass
+            self._sequences[key] = sequence
+            return sequence
+
+    def _id_sequence(self, shard_id: str, table: Table, start: int) -> Sequence:
+        return Sequence(f"{table.name}_shard_{self._index[shard_id]}_id_seq", start=start, increment=self.id_stride)
+
+    def dispose(self):
+        """Close every shard's connection pool"""
+        for engine in self.engines.values():
+            engine.dispose()
+
+
+class CountryShardedSession(ShardedSession):
+    """
+    Session spanning every shard of a ShardMap:
+    1. New rows go to the shard of their country, app or user, with a cross-shard unique id
+    2. Lookups by id read a single shard
+    3. Queries filtering on id, country_ext_id, app_id or user_id read only the matching shards,
+       every other query is sent to all shards and the results are concatenated (scatter-gather)
+
+    Each shard commits on its own: a transaction writing to several shards is not atomic.
+    """
+
+    def __init__(self, shard_map: ShardMap, **kwargs: Any):
+        self.shard_map = shard_map
+        super().__init__(
+            shards=shard_map.engines,
+            shard_chooser=self._choose_shard,
+            identity_chooser=self._choose_identity_shards,
+            execute_chooser=self._choose_execute_shards,
+            **kwargs,
+        )
+
+    def _choose_shard(self, mapper, instance, clause=None, **kw) -> str:
+        if instance is not None and mapper is not None:
+            return self.shard_map.shard_for_row(mapper.local_table.name, lambda column: getattr(instance, column))
+        # Statements without a target row (e.g. dialect checks) can use any shard
+        return next(iter(self.shard_map.engines))
+
+    def _choose_identity_shards(self, mapper, primary_key, *, lazy_loaded_from=None, **kw) -> List[str]:
+        if lazy_loaded_from is not None and lazy_loaded_from.identity_token is not None:
+            return [lazy_loaded_from.identity_token]
+        shard_id = self.shard_map.shard_for_id(primary_key[0])
+        return [shard_id] if shard_id is not None else []
+
+    def _choose_execute_shards(self, orm_context) -> List[str]:
+        shards = _shards_for_criteria(self.shard_map, getattr(orm_context.statement, "whereclause", None))
+        return list(shards) if shards else list(self.shard_map.engines)
+
+    def allocate_ids(self, table: Table, shard_id: str, count: int, last_ids: Optional[Dict] = None) -> List[int]:
+        """
+        Reserve ids for new rows of a table in a shard. PostgreSQL shards draw them from a
+        per-shard sequence (see ShardMap.id_sequence), safe for concurrent writers; other
+        databases continue from the shard's max(id), which only suits a single writer
+        such as SQLite
+        :param table: Table
+        :param shard_id: Shard
+        :param count: Number of ids
+        :param last_ids: Last id allocated per (shard_id, table) in the current flush
+        """
+        connection = self.connection(bind_arguments={"shard_id": shard_id})
+        if connection.dialect.name == "postgresql":
+            sequence = self.shard_map.id_sequence(shard_id, table)
+            query = select(sequence.next_value()).select_from(func.generate_series(1, count))
+            return list(connection.execute(query).scalars())
+
+        last_ids = {} if last_ids is None else last_ids
+        key = (shard_id, table.name)
+        if key not in last_ids:
+            pk = table.primary_key.columns[0]
+            last_ids[key] = connection.execute(select(func.max(pk))).scalar()
+        ids = []
+        for _ in range(count):
+            last_ids[key] = self.shard_map.next_id(shard_id, last_ids[key])
+            ids.append(last_ids[key])
+        return ids
+
+
+@event.listens_for(CountryShardedSession, "before_flush")
+def _assign_shard_ids(session: CountryShardedSession, flush_context, instances):
+    last_ids: Dict = {}
+    for obj in session.new:
+        table = inspect(obj).mapper.local_table
+        pk = table.primary_key.columns[0]
+        if getattr(obj, pk.key) is None and table.name in ROUTING_COLUMNS:
+            shard_id = session.shard_map.shard_for_row(table.name, lambda column: getattr(obj, column))
+            setattr(obj, pk.key, session.allocate_ids(table, shard_id, 1, last_ids)[0])
+
+
+def _shards_for_criteria(shard_map: ShardMap, whereclause) -> Optional[Set[str]]:
+    # Only top-level AND conditions can narrow the shards: col == value or col IN (values)
+    if whereclause is None:
+        return None
+    if isinstance(whereclause, BooleanClauseList) and whereclause.operator is operators.and_:
+        conditions = whereclause.clauses
+    else:
+        conditions = [whereclause]
+
+    shards: Optional[Set[str]] = None
+    for condition in conditions:
+        matched = _shards_for_condition(shard_map, condition)
+        if matched is not None:
+            shards = matched if shards is None else shards & matched
+    return shards
+
+
+def _shards_for_condition(shard_map: ShardMap, condition) -> Optional[Set[str]]:
+    if not isinstance(condition, BinaryExpression) or condition.operator not in (operators.eq, operators.in_op):
+        return None
+    column, value = condition.left, condition.right
+    if not isinstance(column, ColumnClause) or not isinstance(value, BindParameter) or column.table is None:
+        return None
+    values = value.effective_value
+    values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+
+    table = column.table.name
+    if table not in ROUTING_COLUMNS:
+        return None
+    if column.name == _COUNTRY_COLUMN and ROUTING_COLUMNS[table] == _COUNTRY_COLUMN:
+        shards = set()
+        for country in values:
+            try:
+                shards.add(shard_map.shard_for_country(country))
+            except ValueError:
+                continue
+        return shards or None
+    if column.primary_key or ROUTING_COLUMNS[table] == column.name:
+        shards = {shard_map.shard_for_id(id) for id in values if id is not None}
+        shards.discard(None)
+        return shards or None
+    return None
+
+
+def session_shards(session: Session) -> List[Optional[str]]:
+    """Shard ids a session can use, [None] for a regular (non sharded) session"""
+    if isinstance(session, CountryShardedSession):
+        return list(session.shard_map.engines)
+    return [None]
+
+
+def bind_arguments(shard_id: Optional[str]) -> Dict[str, Any]:
+    """Session.execute() bind arguments targeting a shard (none for regular sessions)"""
+    return {"shard_id": shard_id} if shard_id is not None else {}
+
+
+def dialect_name(session: Session, shard_id: Optional[str] = None) -> str:
+    """Dialect of the session's database, or of one of its shards"""
+    if shard_id is None:
+        shard_id = session_shards(session)[0]
+    return session.get_bind(**bind_arguments(shard_id)).dialect.name
+
+
+def row_shard(session: Session, table: str, row: Dict[str, Any]) -> Optional[str]:
+    """Shard of a row given as a dict column -> value, None for a regular session"""
+    if not isinstance(session, CountryShardedSession):
+        return None
+    return session.shard_map.shard_for_row(table, row.get)
+
+
+def id_shard(session: Session, id: int) -> Optional[str]:
+    """Shard holding a primary key (or the rows referencing it), None for a regular session"""
+    if not isinstance(session, CountryShardedSession):
+        return None
+    return session.shard_map.shard_for_id(id)
+
+
+def check_shard_key_update(session: Session, table: str, id: int, changes: Dict[str, Any]):
+    """
+    Reject a change of a row's routing column (country_ext_id, app_id or user_id) that would
+    belong to another shard: the id of a row encodes its shard, so rows cannot move
+    :raises ValueError: If the row would have to change shard
+    """
+    if not isinstance(session, CountryShardedSession):
+        return
+    column = ROUTING_COLUMNS.get(table)
+    if column is None or column not in changes:
+        return
+    if session.shard_map.shard_for_row(table, changes.get) != session.shard_map.shard_for_id(id):
+        raise ValueError(f"Cannot change {column} of {table} row {id} to {changes[column]}: "
+                         "it belongs to another shard and rows cannot move between shards")
+
+
+def split_rows_by_shard(session: Session, table: Table, rows: List[Dict[str, Any]]) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    """
+    Group new rows by shard and assign them cross-shard unique ids.
+    Regular sessions get every row, unchanged, under the None key
+    """
+    if not isinstance(session, CountryShardedSession):
+        return {None: rows}
+    shard_map = session.shard_map
+    pk = table.primary_key.columns[0].name
+    groups: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(shard_map.shard_for_row(table.name, row.get), []).append(row)
+    for shard_id, shard_rows in groups.items():
+        missing = [row for row in shard_rows if row.get(pk) is None]
+        for row, id in zip(missing, session.allocate_ids(table, shard_id, len(missing))):
+            row[pk] = id
+    return groups
+
+
+def split_ids_by_shard(session: Session, ids: Iterable[int]) -> Dict[Optional[str], List[int]]:
+    """Group primary keys by the shard holding them. Regular sessions get every id under None"""
+    if not isinstance(session, CountryShardedSession):
+        return {None: list(ids)}
+    groups: Dict[Optional[str], List[int]] = {}
+    for id in ids:
+        shard_id = session.shard_map.shard_for_id(id)
+        if shard_id is not None:
+            groups.setdefault(shard_id, []).append(id)
+    return groups
+
+
+def configure_sharding(countries: Dict[str, Union[str, Engine]], default: Optional[Union[str, Engine]] = None,
+                       id_stride: int = DEFAULT_ID_STRIDE, **engine_kwargs: Any) -> ShardMap:
+    """
+    Make SessionLocal (and so every service, get_db() and unit_of_work()) use
+    CountryShardedSession over the given shards instead of DATABASE_URL_FRONT.
+
+    Usage:
+        configure_sharding({
+            "CO": "postgresql://.../aclimate_co",
+            "PE": "postgresql://.../aclimate_andes",
+            "BO": "postgresql://.../aclimate_andes",
+        })
+        create_tables()
+
+    :return: The ShardMap in use
+    """
+    shard_map = ShardMap(countries, default=default, id_stride=id_stride, **engine_kwargs)
+    previous = SessionLocal.kw.get("shard_map")
+    SessionLocal.class_ = type(CountryShardedSession.__name__, (CountryShardedSession,), {})
+    SessionLocal.kw.pop("bind", None)
+    SessionLocal.configure(shard_map=shard_map)
+    if previous is not None:
+        previous.dispose()
+    return shard_map
+
+
+def disable_sharding():
+    """Go back to a single database (DATABASE_URL_FRONT or database.configure())"""
+    shard_map = SessionLocal.kw.pop("shard_map", None)
+    if shard_map is None:
+        return
+    from . import _engine
+    SessionLocal.class_ = type(Session.__name__, (Session,), {})
+    SessionLocal.kw["bind"] = _engine
+    shard_map.dispose()
+
+
+def get_shard_map() -> Optional[ShardMap]:
+    """ShardMap configured with configure_sharding(), None when not sharded"""
+    return SessionLocal.kw.get("shard_map")
@@ -0,0 +1,128 @@
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Generator, List, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from .sharding import bind_arguments, dialect_name, session_shards
+
+# Number of SQLite virtual machine instructions between deadline checks
+_SQLITE_PROGRESS_STEPS = 1000
+# PostgreSQL SQLSTATE for query_canceled (raised when statement_timeout expires)
+_PG_QUERY_CANCELED = "57014"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("aclimate_statement_deadline", default=None)
+
+
+class StatementTimeoutError(TimeoutError):
+    """Raised when a statement runs past its statement timeout or the caller's deadline"""
+
+
+@contextmanager
+def deadline(seconds: float) -> Generator[None, None, None]:
+    """
+    Per-call deadline for every service call made inside the block. Nested deadlines
+    can only shorten the outer one.
+
+    Usage:
+        with deadline(0.5):
+            app_service.search_by_name(term)
+    """
+    expires_at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(expires_at if outer is None else min(outer, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time(timeout: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds left for the current call: the smaller of ``timeout`` and the active deadline
+    :raises StatementTimeoutError: If the active deadline already expired
+    """
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return timeout
+    left = expires_at - time.monotonic()
+    if left <= 0:
+        raise StatementTimeoutError("Deadline exceeded before running the statement")
+    return left if timeout is None else min(timeout, left)
+
+
+def apply_statement_timeout(session: Session, seconds: Optional[float], reset: bool = False):
+    """
+    Limit how long statements run on the session's connection for the duration of the block:
+    SET LOCAL statement_timeout on PostgreSQL, a progress handler that interrupts the query
+    on SQLite. Nothing is done when seconds is None or on other dialects. Sharded sessions
+    apply it on every shard.
+    :param session: SQLAlchemy session
+    :param seconds: Timeout in seconds
+    :param reset: Restore the server default when the block ends (PostgreSQL only), needed when
+                  the transaction stays open afterwards, e.g. inside a unit of work
+    """
+    if seconds is None:
+        return nullcontext()
+    shards = session_shards(session)
+    if len(shards) == 1:
+        return _shard_timeout(session, seconds, reset, shards[0])
+    return _sharded_timeout(session, seconds, reset, shards)
+
+
+def _shard_timeout(session: Session, seconds: float, reset: bool, shard_id: Optional[str]):
+    dialect = dialect_name(session, shard_id)
+    if dialect == "postgresql":
+        return _postgresql_timeout(session, seconds, reset, shard_id)
+    if dialect == "sqlite":
+        return _sqlite_timeout(session, seconds, shard_id)
+    return nullcontext()
+
+
+@contextmanager
+def _sharded_timeout(session: Session, seconds: float, reset: bool, shards: List[Optional[str]]):
+    with ExitStack() as stack:
+        for shard_id in shards:
+            stack.enter_context(_shard_timeout(session, seconds, reset, shard_id))
+        yield
+
+
+@contextmanager
+def _postgresql_timeout(session: Session, seconds: float, reset: bool, shard_id: Optional[str] = None):
+    # SET LOCAL only lasts until the end of the transaction, so pooled connections are never left altered
+    connection = session.connection(bind_arguments=bind_arguments(shard_id))
+    connection.execute(text(f"SET LOCAL statement_timeout = {max(1, int(seconds * 1000))}"))
+    yield
+    if reset:
+        connection.execute(text("SET LOCAL statement_timeout = DEFAULT"))
+
+
+@contextmanager
+def _sqlite_timeout(session: Session, seconds: float, shard_id: Optional[str] = None):
+    expires_at = time.monotonic() + seconds
+    dbapi_connection = session.connection(bind_arguments=bind_arguments(shard_id)).connection.dbapi_connection
+    dbapi_connection.set_progress_handler(lambda: int(time.monotonic() > expires_at), _SQLITE_PROGRESS_STEPS)
+    try:
+        yield
+    finally:
+        dbapi_connection.set_progress_handler(None, 0)
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """Whether a database error was caused by a statement timeout or an interrupted query"""
+    if not isinstance(error, OperationalError):
+        return False
+    orig = error.orig
+    return getattr(orig, "pgcode", None) == _PG_QUERY_CANCELED or "interrupted" in str(orig)
+
+
+@contextmanager
+def translate_timeout_errors() -> Generator[None, None, None]:
+    """Re-raise statement timeout database errors as StatementTimeoutError"""
+    try:
+        yield
+    except SQLAlchemyError as e:
+        if is_timeout_error(e):
+            raise StatementTimeoutError(f"Statement timed out: {e.orig}") from e
+        raise
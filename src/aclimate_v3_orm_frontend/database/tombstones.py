@@ -0,0 +1,23 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from .sharding import bind_arguments
+from ..models.tombstone import Tombstone
+
+
+def record_deletions(session: Session, table: str, deletions: List[Tuple[Optional[str], int]]):
+    """
+    Record hard-deleted rows inside the caller's transaction, with one INSERT per shard,
+    so change feed consumers can learn about deletions (see BaseService.get_deleted_since)
+    :param session: SQLAlchemy session of the delete
+    :param table: Table name of the deleted rows
+    :param deletions: (shard_id, row id) per deleted row. shard_id is None when the session is not sharded
+    """
+    now = datetime.now(timezone.utc)
+    by_shard: Dict[Optional[str], List[Dict]] = defaultdict(list)
+    for shard_id, row_id in deletions:
+        by_shard[shard_id].append({"table_name": table, "row_id": row_id, "deleted": now})
+    for shard_id, rows in by_shard.items():
+        session.execute(insert(Tombstone.__table__), rows, bind_arguments=bind_arguments(shard_id))
@@ -0,0 +1,131 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Generator, Optional
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+from . import SessionLocal
+
+_current_session: ContextVar[Optional[Session]] = ContextVar("aclimate_unit_of_work", default=None)
+# Session.info key holding the error that rolled back the unit of work
+_ABORTED = "aclimate_unit_of_work_error"
+
+
+class UnitOfWorkAbortedError(RuntimeError):
+    """Raised by service calls made in a unit of work already rolled back by an earlier error"""
+
+
+def current_session() -> Optional[Session]:
+    """Session of the unit of work active in the current context, if any"""
+    return _current_session.get()
+
+
+@contextmanager
+def unit_of_work(session_factory: Optional[sessionmaker] = None) -> Generator[Session, None, None]:
+    """
+    Share one session (one connection, one transaction and one identity map) among
+    every service call made inside the block without an explicit ``db``:
+    1. Services flush their changes but do not commit
+    2. Commits once when the block ends, rolls back everything on error
+    3. Nested blocks join the outer unit of work
+    4. A failing service call rolls back the whole unit of work right away: later service
+       calls in the block raise UnitOfWorkAbortedError instead of writing a partial result
+
+    Usage:
+        with unit_of_work():
+            app = app_service.create(new_app)
+            user_service.create(UserCreate(..., app_id=app.id))
+    """
+    outer = _current_session.get()
+    if outer is not None:
+        yield outer
+        return
+
+    session = (session_factory or SessionLocal)()
+    token = _current_session.set(session)
+    try:
+        yield session
+        if _ABORTED not in session.info:
+            session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        print(f"Database error: {str(e)}")
+        raise
+    except Exception as e:
+        session.rollback()
+        print(f"Unexpected error: {str(e)}")
+        raise
+    finally:
+        _current_session.reset(token)
+        session.close()
+
+
+def abort_unit_of_work(session: Session, error: BaseException):
+    """Roll back the unit of work after a failed service call and refuse the following ones"""
+    session.rollback()
+    session.info[_ABORTED] = error
+
+
+def ensure_active(session: Session):
+    """
+    Check that the unit of work was not rolled back by an earlier error
+    :raises UnitOfWorkAbortedError: If it was
+    """
+    error = session.info.get(_ABORTED)
+    if error is not None:
+        raise UnitOfWorkAbortedError(f"The unit of work was rolled back by an earlier error: {error}") from error
+
+
+async def unit_of_work_dependency() -> AsyncGenerator[Session, None]:
+    """
+    FastAPI/Starlette dependency opening a unit of work per request.
+    It is async on purpose: async dependencies run in the request's context, so
+    the unit of work is visible to the endpoint and to the services it calls.
+
+    Usage:
+        @app.post("/apps", dependencies=[Depends(unit_of_work_dependency)])
+        def create_app(...): ...
+    """
+    with unit_of_work() as session:
+        yield session
+
+
+class UnitOfWorkMiddleware:
+    """
+    Pure ASGI middleware opening a unit of work around every HTTP request.
+    The unit of work is committed before the response starts, so a failed commit is
+    answered with a 500 instead of a success status for writes that were lost.
+
+    Usage:
+        app.add_middleware(UnitOfWorkMiddleware)
+    """
+
+    def __init__(self, app, session_factory: Optional[sessionmaker] = None):
+        self.app = app
+        self.session_factory = session_factory
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with unit_of_work(self.session_factory) as session:
+            commit_failed = False
+
+            async def send_after_commit(message):
+                nonlocal commit_failed
+                if commit_failed:
+                    # The 500 is already sent: drop the rest of the application's response
+                    return
+                if message["type"] == "http.response.start" and _ABORTED not in session.info:
+                    try:
+                        session.commit()
+                    except Exception as e:
+                        abort_unit_of_work(session, e)
+                        print(f"Commit error: {str(e)}")
+                        commit_failed = True
+                        await send({"type": "http.response.start", "status": 500,
+                                    "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+                        await send({"type": "http.response.body", "body": b"Internal Server Error"})
+                        return
+                await send(message)
+
+            await self.app(scope, receive, send_after_commit)
@@ -1,9 +1,17 @@
+# Imported eagerly: relationships between models are resolved by class name
+# when the mappers are configured, so every model must be registered together
 from .user import User
 from .app import App
 from .ws_interested import WsInterested
+from .counter import Counter
+from .outbox_event import OutboxEvent
+from .tombstone import Tombstone
 
 __all__ = [
     "User",
     "App",
-    "WsInterested"
+    "WsInterested",
+    "Counter",
+    "OutboxEvent",
+    "Tombstone"
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from ..database.base import Base
 from datetime import datetime, timezone
@@ -14,3 +14,9 @@ class App(Base):
     updated = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
     users = relationship("User", back_populates="app")
+
+    __table_args__ = (
+        Index("ix_apps_updated_id", "updated", "id"),
+        Index("ix_apps_country_ext_id_enable", "country_ext_id", "enable"),
+        Index("ix_apps_name", "name"),
+    )
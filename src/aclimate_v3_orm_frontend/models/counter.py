@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, BigInteger
+from ..database.base import Base
+
+class Counter(Base):
+    __tablename__ = 'counters'
+
+    name = Column(String(50), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, BigInteger, String, JSON, DateTime, Index
+from ..database.base import Base
+from datetime import datetime, timezone
+
+class OutboxEvent(Base):
+    __tablename__ = 'outbox_events'
+
+    # BIGINT on PostgreSQL; SQLite only autoincrements INTEGER primary keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    aggregate = Column(String(50), nullable=False)
+    aggregate_id = Column(Integer, nullable=True)
+    event_type = Column(String(20), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    available_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    claimed_by = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_events_available_at_id", "available_at", "id"),
+    )
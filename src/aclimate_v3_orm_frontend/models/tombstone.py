@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index
+from ..database.base import Base
+from datetime import datetime, timezone
+
+class Tombstone(Base):
+    __tablename__ = 'tombstones'
+
+    # BIGINT on PostgreSQL; SQLite only autoincrements INTEGER primary keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstones_table_name_deleted_row_id", "table_name", "deleted", "row_id"),
+    )
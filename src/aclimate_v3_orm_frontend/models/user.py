@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database.base import Base
 from ..enums.profile_type import ProfileType
@@ -17,3 +17,9 @@ class User(Base):
 
     app = relationship("App", back_populates="users")
     ws_interested = relationship("WsInterested", back_populates="user")
+
+    __table_args__ = (
+        Index("ix_users_ext_key_clock_id_app_id", "ext_key_clock_id", "app_id"),
+        Index("ix_users_updated_id", "updated", "id"),
+        Index("ix_users_app_id_profile", "app_id", "profile"),
+    )
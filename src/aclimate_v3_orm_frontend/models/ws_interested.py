@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime, Index
 from sqlalchemy.orm import relationship
 from ..database.base import Base
+from datetime import datetime, timezone
 
 class WsInterested(Base):
     __tablename__ = 'ws_interested'
@@ -9,5 +10,12 @@ class WsInterested(Base):
     user_id = Column(Integer, ForeignKey('users.id'))
     ws_ext_id = Column(String(50), nullable=False)
     notification = Column(JSON, nullable=False)
+    updated = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
     user = relationship("User", back_populates="ws_interested")
+
+    __table_args__ = (
+        Index("ix_ws_interested_updated_id", "updated", "id"),
+        Index("ix_ws_interested_user_id", "user_id"),
+        Index("ix_ws_interested_ws_ext_id", "ws_ext_id"),
+    )
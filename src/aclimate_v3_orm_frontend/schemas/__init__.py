@@ -1,9 +1,37 @@
-from .app_schema import AppCreate, AppRead, AppUpdate
-from .user_schema import UserCreate, UserRead, UserUpdate
-from .ws_interested_schema import WsInterestedCreate, WsInterestedRead, WsInterestedUpdate
+from typing import TYPE_CHECKING
+from .._lazy import lazy_exports
+
+# Schemas are imported on first access (PEP 562)
+_EXPORTS = {
+    "AppCreate": ".app_schema", "AppRead": ".app_schema", "AppUpdate": ".app_schema",
+    "UserCreate": ".user_schema", "UserRead": ".user_schema", "UserUpdate": ".user_schema",
+    "WsInterestedCreate": ".ws_interested_schema", "WsInterestedRead": ".ws_interested_schema",
+    "WsInterestedUpdate": ".ws_interested_schema",
+    "CounterRead": ".counter_schema",
+    "OutboxEventRead": ".outbox_event_schema",
+    "TombstoneRead": ".tombstone_schema",
+    "QuerySpec": ".query_spec",
+    "FieldFilter": ".query_spec",
+}
 
 __all__ = [
     "AppCreate", "AppRead", "AppUpdate",
     "UserCreate", "UserRead", "UserUpdate",
-    "WsInterestedCreate", "WsInterestedRead", "WsInterestedUpdate"
+    "WsInterestedCreate", "WsInterestedRead", "WsInterestedUpdate",
+    "CounterRead",
+    "OutboxEventRead",
+    "TombstoneRead",
+    "QuerySpec",
+    "FieldFilter"
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .app_schema import AppCreate, AppRead, AppUpdate
+    from .user_schema import UserCreate, UserRead, UserUpdate
+    from .ws_interested_schema import WsInterestedCreate, WsInterestedRead, WsInterestedUpdate
+    from .counter_schema import CounterRead
+    from .outbox_event_schema import OutboxEventRead
+    from .tombstone_schema import TombstoneRead
+    from .query_spec import QuerySpec, FieldFilter
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field, ConfigDict
+
+class CounterRead(BaseModel):
+    name: str = Field(..., max_length=50, description="Counter name, e.g. ws_subscribers")
+    key: str = Field(..., max_length=255, description="Counted entity, e.g. the ws_ext_id")
+    value: int = Field(..., description="Current count")
+    model_config = ConfigDict(from_attributes=True)
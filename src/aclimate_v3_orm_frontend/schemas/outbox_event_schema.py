@@ -0,0 +1,14 @@
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
+
+class OutboxEventRead(BaseModel):
+    id: int
+    aggregate: str = Field(..., max_length=50, description="Table the change was made on, e.g. users")
+    aggregate_id: Optional[int] = Field(None, description="ID of the changed row, None for bulk inserts without known IDs")
+    event_type: str = Field(..., description="created, updated or deleted")
+    payload: Dict[str, Any] = Field(..., description="Row snapshot, or changes and previous values for updates")
+    created_at: Optional[datetime] = Field(None, alias="created", description="Timestamp of the change")
+    attempts: int = Field(0, description="Number of times the event has been claimed")
+    shard: Optional[str] = Field(None, description="Shard holding the event when sharding is configured")
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
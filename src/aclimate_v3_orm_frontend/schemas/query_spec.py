@@ -0,0 +1,46 @@
+from typing import Any, List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+
+FilterOp = Literal["eq", "ne", "in", "not_in", "lt", "lte", "gt", "gte", "between", "is_null", "ilike"]
+
+
+class FieldFilter(BaseModel):
+    field: str = Field(..., description="Column name, e.g. country_ext_id")
+    op: FilterOp = Field("eq", description="Comparison operator")
+    value: Any = Field(None, description="List for in/not_in, [low, high] for between, bool for is_null, pattern for ilike")
+
+    @model_validator(mode="after")
+    def check_value(self):
+        if self.op in ("in", "not_in") and not isinstance(self.value, (list, tuple, set, frozenset)):
+            raise ValueError(f"{self.op} needs a list of values")
+        if self.op == "between" and (not isinstance(self.value, (list, tuple)) or len(self.value) != 2):
+            raise ValueError("between needs a [low, high] pair")
+        if self.op == "is_null" and not isinstance(self.value, bool):
+            raise ValueError("is_null needs true or false")
+        if self.op == "ilike" and not isinstance(self.value, str):
+            raise ValueError("ilike needs a string pattern")
+        if self.op in ("eq", "ne", "lt", "lte", "gt", "gte") and self.value is None:
+            raise ValueError(f"{self.op} needs a value, use is_null to match nulls")
+        return self
+
+
+class QuerySpec(BaseModel):
+    """
+    Declarative filter, sort and limit for the service queries (get_all, stream_rows, count).
+    Filters are combined with AND; order_by takes column names, prefixed with "-" for descending.
+
+        QuerySpec(
+            filters=[{"field": "country_ext_id", "op": "in", "value": ["CO", "PE"]},
+                     {"field": "register", "op": "gte", "value": "2024-01-01T00:00:00"}],
+            order_by=["-register"],
+            limit=50,
+        )
+    """
+    filters: List[FieldFilter] = Field(default_factory=list)
+    order_by: List[str] = Field(default_factory=list, description="Columns to sort by, \"-name\" for descending")
+    limit: Optional[int] = Field(None, gt=0, description="Maximum rows to return")
+    offset: int = Field(0, ge=0, description="Rows to skip, applied after order_by")
+
+    def cache_key(self) -> str:
+        """Hashable representation used by the query cache"""
+        return self.model_dump_json()
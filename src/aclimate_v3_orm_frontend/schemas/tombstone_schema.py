@@ -0,0 +1,9 @@
+from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
+
+class TombstoneRead(BaseModel):
+    table_name: str = Field(..., max_length=50, description="Table the row was deleted from, e.g. ws_interested")
+    row_id: int = Field(..., description="ID of the deleted row")
+    deleted_at: Optional[datetime] = Field(None, alias="deleted", description="Deletion timestamp")
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
@@ -6,6 +6,7 @@ class WsInterestedBase(BaseModel):
     user_id: int = Field(..., gt=0, description="Associated User ID")
     ws_ext_id: str = Field(..., max_length=50, description="External weather station ID")
     notification: dict = Field(..., description="Notification settings as JSON")
+    updated_at: Optional[datetime] = Field(None, alias="updated", description="Last update timestamp")
 
 class WsInterestedCreate(BaseModel):
     user_id: int = Field(..., gt=0, description="Associated User ID")
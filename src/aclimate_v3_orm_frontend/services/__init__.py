@@ -1,9 +1,28 @@
-from .app_service import AppService
-from .user_service import UserService
-from .ws_interested_service import WsInterestedService
+from typing import TYPE_CHECKING
+from .._lazy import lazy_exports
+
+# Services are imported on first access (PEP 562)
+_EXPORTS = {
+    "AppService": ".app_service",
+    "UserService": ".user_service",
+    "WsInterestedService": ".ws_interested_service",
+    "CounterService": ".counter_service",
+    "OutboxService": ".outbox_service",
+}
 
 __all__ = [
     "AppService",
     "UserService",
-    "WsInterestedService"
+    "WsInterestedService",
+    "CounterService",
+    "OutboxService"
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .app_service import AppService
+    from .user_service import UserService
+    from .ws_interested_service import WsInterestedService
+    from .counter_service import CounterService
+    from .outbox_service import OutboxService
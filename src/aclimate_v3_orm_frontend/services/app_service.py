@@ -1,11 +1,15 @@
 from typing import List, Optional
+from sqlalchemy import case, column, func, literal, literal_column, select, table
 from sqlalchemy.orm import Session
 from .base_service import BaseService
+from ..database.search import FTS5, FTS_TABLE, MIN_TRIGRAM_TERM, TRGM, search_mode
 from ..models.app import App
 from ..schemas.app_schema import AppCreate, AppUpdate, AppRead
+from ..schemas.query_spec import QuerySpec
 from ..validations.app_validator import AppValidator
 
 class AppService(BaseService[App, AppCreate, AppRead, AppUpdate]):
+    query_fields = ("id", "name", "country_ext_id", "enable", "register", "updated")
 
     def __init__(self):
         super().__init__(App, AppCreate, AppRead, AppUpdate)
@@ -18,10 +22,12 @@ class AppService(BaseService[App, AppCreate, AppRead, AppUpdate]):
         :param db: Optional SQLAlchemy session
         :return: List of AppRead schemas
         """
-        with self._session_scope(db) as session:
+        def load(session: Session) -> List[AppRead]:
             objs = session.query(self.model).filter(self.model.country_ext_id == country_ext_id, self.model.enable == enabled).all()
             return [AppRead.model_validate(obj) for obj in objs]
 
+        return self._cached_query("get_by_country_ext_id", (country_ext_id, enabled), load, db)
+
     def get_by_name(self, name: str, enabled: bool = True, db: Optional[Session] = None) -> List[AppRead]:
         """
         Get apps by exact name and enabled status
@@ -30,33 +36,72 @@ class AppService(BaseService[App, AppCreate, AppRead, AppUpdate]):
         :param db: Optional SQLAlchemy session
         :return: List of AppRead schemas
         """
-        with self._session_scope(db) as session:
+        def load(session: Session) -> List[AppRead]:
             objs = session.query(self.model).filter(self.model.name == name, self.model.enable == enabled).all()
             return [AppRead.model_validate(obj) for obj in objs]
 
-    def search_by_name(self, name: str, enabled: bool = True, db: Optional[Session] = None) -> List[AppRead]:
+        return self._cached_query("get_by_name", (name, enabled), load, db)
+
+    def search_by_name(self, name: str, enabled: bool = True, db: Optional[Session] = None,
+                       limit: Optional[int] = None) -> List[AppRead]:
         """
-        Search apps by partial name match and enabled status
+        Search apps by partial name match and enabled status, best matches first: names starting
+        with the term, then the search index rank (FTS5 bm25 on SQLite, trigram similarity on
+        PostgreSQL), then name. Uses the index created by create_search_index() when it exists and
+        falls back to name ILIKE '%name%' otherwise (or for terms shorter than 3 characters on SQLite)
         :param name: Partial app name
         :param enabled: Filter by enabled status
         :param db: Optional SQLAlchemy session
+        :param limit: Maximum number of results, None for every match
         :return: List of AppRead schemas
         """
-        with self._session_scope(db) as session:
-            objs = session.query(self.model).filter(self.model.name.ilike(f"%{name}%"), self.model.enable == enabled).all()
-            return [AppRead.model_validate(obj) for obj in objs]
+        def load(session: Session) -> List[AppRead]:
+            prefix = case((self.model.name.ilike(f"{name}%"), 0), else_=1)
+            mode = search_mode(session)
+            if mode == FTS5 and len(name) >= MIN_TRIGRAM_TERM:
+                fts = table(FTS_TABLE, column("rowid"), column("rank"))
+                # A quoted FTS5 string is a phrase: with the trigram tokenizer it matches any substring
+                stmt = select(self.model, prefix, fts.c.rank).join(fts, fts.c.rowid == self.model.id).where(
+                    literal_column(FTS_TABLE).op("MATCH")('"' + name.replace('"', '""') + '"')
+                ).order_by(prefix, fts.c.rank, self.model.name)
+            elif mode == TRGM:
+                # ILIKE '%term%' is served by the gin_trgm_ops index
+                similarity = -func.similarity(self.model.name, name)
+                stmt = select(self.model, prefix, similarity).where(self.model.name.ilike(f"%{name}%")).order_by(
+                    prefix, similarity, self.model.name
+                )
+            else:
+                stmt = select(self.model, prefix, literal(0)).where(self.model.name.ilike(f"%{name}%")).order_by(
+                    prefix, self.model.name
+                )
+            stmt = stmt.where(self.model.enable == enabled)
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            # Sharded sessions return one ranked list per shard: merge them
+            rows = sorted(session.execute(stmt).all(), key=lambda row: (row[1], row[2], row[0].name))
+            return [AppRead.model_validate(row[0]) for row in rows[:limit]]
 
-    def get_all(self, enabled: bool = True, db: Optional[Session] = None) -> List[AppRead]:
+        return self._cached_query("search_by_name", (name, enabled, limit), load, db)
+
+    def get_all(self, enabled: bool = True, db: Optional[Session] = None, spec: Optional[QuerySpec] = None) -> List[AppRead]:
         """
         Get all apps filtered by enabled status
         :param enabled: Filter by enabled status
         :param db: Optional SQLAlchemy session
+        :param spec: Optional QuerySpec with additional filters, order_by and limit
         :return: List of AppRead schemas
         """
-        with self._session_scope(db) as session:
-            objs = session.query(self.model).filter(self.model.enable == enabled).all()
+        def load(session: Session) -> List[AppRead]:
+            objs = self._fetch(session.query(self.model).filter(self.model.enable == enabled), spec, session)
             return [AppRead.model_validate(obj) for obj in objs]
 
+        return self._cached_query("get_all", (enabled, self._spec_key(spec)), load, db)
+
+    def validate_create_batch(self, objs_in: List[AppCreate], db: Optional[Session] = None) -> List[Optional[str]]:
+        """Batch validation used by bulk imports before bulk_create()"""
+        with self._session_scope(db) as session:
+            return AppValidator.create_validate_batch(session, objs_in)
+
     def _validate_create(self, obj_in: AppCreate, db: Optional[Session] = None):
         """Validation hook called automatically from BaseService.create()"""
         AppValidator.create_validate(db, obj_in)
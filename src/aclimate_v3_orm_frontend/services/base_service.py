@@ -1,16 +1,70 @@
-from typing import TypeVar, Generic, Type, Optional, Any, Dict, List
+import enum
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TypeVar, Generic, Type, Optional, Any, Callable, Dict, Iterable, Iterator, List, Tuple
 from pydantic import BaseModel
+from sqlalchemy import JSON, and_, bindparam, delete, func, inspect, not_, or_, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
+from ..cache.query_cache import QueryCache, has_pending_writes, table_versions, track_write
 from ..database import get_db
+from ..database.bulk import bulk_insert, chunked, max_bind_params
+from ..database.outbox import CREATED, DELETED, UPDATED, jsonable, record_events, row_snapshot
+from ..database.sharding import bind_arguments, check_shard_key_update, id_shard, row_shard, session_shards, split_ids_by_shard, split_rows_by_shard
+from ..database.unit_of_work import abort_unit_of_work, current_session, ensure_active
+from ..database.timeouts import apply_statement_timeout, remaining_time, translate_timeout_errors
+from ..database.tombstones import record_deletions
+from ..models.tombstone import Tombstone
+from ..schemas.tombstone_schema import TombstoneRead
+from ..schemas.query_spec import FieldFilter, QuerySpec
 
 T = TypeVar("T")  # Modelo SQLAlchemy
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 ReadSchemaType = TypeVar("ReadSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+V = TypeVar("V")  # Valor de LookupResult
+
+# Parámetros reservados para filtros adicionales en las consultas IN por lotes
+_RESERVED_BIND_PARAMS = 16
+DEFAULT_LOOKUP_CHUNK_SIZE = 1000
+
+
+@dataclass
+class LookupResult(Generic[V]):
+    """Resultado de una búsqueda por múltiples claves"""
+    found: Dict[Any, V] = field(default_factory=dict)
+    missing: List[Any] = field(default_factory=list)
+
+
+def _coerce(column, value: Any) -> Any:
+    """Convierte valores de un QuerySpec leídos de JSON (fechas ISO, nombres de enums) al tipo de la columna"""
+    if not isinstance(value, str):
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if issubclass(python_type, datetime):
+        return datetime.fromisoformat(value)
+    if issubclass(python_type, enum.Enum):
+        return python_type(value)
+    return value
+
 
 class BaseService(Generic[T, CreateSchemaType, ReadSchemaType, UpdateSchemaType]):
+    # Tiempo máximo en segundos de cada sentencia (None = sin límite). Se puede definir por
+    # clase o por instancia; deadline() lo acorta para llamadas puntuales
+    statement_timeout: Optional[float] = None
+    # Caché de resultados de las consultas de listas (None = desactivada). Se activa por clase,
+    # e.g. AppService.query_cache = QueryCache(maxsize=500)
+    query_cache: Optional[QueryCache] = None
+    # Escribe un evento en outbox_events por cada alta, cambio o baja, en la misma transacción.
+    # Se activa por clase (UserService.emit_events = True) o para todas (BaseService.emit_events = True)
+    emit_events: bool = False
+    # Columnas que se pueden usar en filtros y orden de un QuerySpec (None = todas salvo las JSON)
+    query_fields: Optional[Tuple[str, ...]] = None
+
     def __init__(self, 
                 model: Type[T],
                 create_schema: Type[CreateSchemaType],
@@ -25,24 +79,43 @@ class BaseService(Generic[T, CreateSchemaType, ReadSchemaType, UpdateSchemaType]
     def _session_scope(self, db: Optional[Session] = None):
         """
         Safely manages session lifecycle.
+        Inside a unit_of_work() block, reuses its session and leaves the commit to it.
         For internal sessions, delegates ALL handling to get_db().
+        Applies the statement timeout (service setting and/or active deadline) and raises
+        StatementTimeoutError when it is exceeded.
         """
-        if db:
-            try:
-                yield db
-                db.commit()
-            except SQLAlchemyError as e:
-                db.rollback()
-                print(f"⚠️ Database error: {str(e)}")
-                raise
-            except Exception as e:
-                db.rollback()
-                print(f"⚠️ Unexpected error: {str(e)}")
-                raise
-        else:
-            
-            with get_db() as session:
-                yield session
+        timeout = remaining_time(self.statement_timeout)
+        with translate_timeout_errors():
+            if db:
+                try:
+                    with apply_statement_timeout(db, timeout):
+                        yield db
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    print(f"⚠️ Database error: {str(e)}")
+                    raise
+                except Exception as e:
+                    db.rollback()
+                    print(f"⚠️ Unexpected error: {str(e)}")
+                    raise
+            elif current_session() is not None:
+                # Unit of work activo: la transacción la confirma unit_of_work() al terminar
+                session = current_session()
+                ensure_active(session)
+                try:
+                    with apply_statement_timeout(session, timeout, reset=True):
+                        yield session
+                except Exception as e:
+                    # Se deshace todo el unit of work: las llamadas siguientes fallan en vez de confirmar a medias
+                    abort_unit_of_work(session, e)
+                    print(f"⚠️ Unit of work rolled back: {str(e)}")
+                    raise
+            else:
+                
+                with get_db() as session:
+                    with apply_statement_timeout(session, timeout):
+                        yield session
                 
     def get_by_id(self, id: int, db: Optional[Session] = None) -> Optional[ReadSchemaType]:
         """Obtiene un registro por ID y lo devuelve directamente como ReadSchema"""
@@ -50,13 +123,312 @@ class BaseService(Generic[T, CreateSchemaType, ReadSchemaType, UpdateSchemaType]
             obj = session.query(self.model).get(id)
             return self.read_schema.model_validate(obj) if obj else None
 
-    def get_all(self, db: Optional[Session] = None, filters: Optional[Dict[str, Any]] = None) -> List[ReadSchemaType]:
-        """Obtiene todos los registros ya convertidos a ReadSchemas"""
+    def get_by_ids(self, ids: Iterable[int], db: Optional[Session] = None, chunk_size: Optional[int] = None) -> LookupResult[ReadSchemaType]:
+        """
+        Obtiene muchos registros por ID con consultas IN por lotes
+        :param ids: IDs a buscar (los duplicados se ignoran)
+        :param db: Optional SQLAlchemy session
+        :param chunk_size: IDs por consulta. Por defecto 1000, limitado por el máximo de parámetros del dialecto
+        :return: LookupResult con found {id: ReadSchema} y missing [ids no encontrados]
+        """
+        result = self._lookup_many(self.model.__table__.primary_key.columns[0].name, ids, None, db, chunk_size)
+        result.found = {key: values[0] for key, values in result.found.items()}
+        return result
+
+    def get_many_by(self, field: str, values: Iterable[Any], db: Optional[Session] = None,
+                    filters: Optional[Dict[str, Any]] = None, chunk_size: Optional[int] = None) -> LookupResult[List[ReadSchemaType]]:
+        """
+        Obtiene los registros cuyo campo coincide con alguno de los valores, con consultas IN por lotes
+        :param field: Nombre de la columna, e.g. "app_id" o "ext_key_clock_id"
+        :param values: Valores a buscar (los duplicados se ignoran)
+        :param db: Optional SQLAlchemy session
+        :param filters: Filtros de igualdad adicionales, e.g. {"enable": True}
+        :param chunk_size: Valores por consulta. Por defecto 1000, limitado por el máximo de parámetros del dialecto
+        :return: LookupResult con found {valor: [ReadSchemas]} y missing [valores sin registros]
+        :raises ValueError: Si field no es una columna del modelo
+        """
+        return self._lookup_many(field, values, filters, db, chunk_size)
+
+    def _lookup_many(self, field: str, values: Iterable[Any], filters: Optional[Dict[str, Any]],
+                     db: Optional[Session], chunk_size: Optional[int]) -> LookupResult:
+        if field not in self.model.__table__.c:
+            raise ValueError(f"Invalid field: {field}. Valid options are: {list(self.model.__table__.c.keys())}")
+        column = getattr(self.model, field)
+        keys = list(dict.fromkeys(values))
+        result = LookupResult()
+
         with self._session_scope(db) as session:
+            size = min(chunk_size or DEFAULT_LOOKUP_CHUNK_SIZE, max_bind_params(session) - _RESERVED_BIND_PARAMS)
+            for chunk in chunked(keys, size):
+                query = session.query(self.model).filter(column.in_(chunk))
+                if filters:
+                    query = query.filter_by(**filters)
+                for obj in query.all():
+                    result.found.setdefault(getattr(obj, field), []).append(self.read_schema.model_validate(obj))
+
+        result.missing = [key for key in keys if key not in result.found]
+        return result
+
+    def get_all(self, db: Optional[Session] = None, filters: Optional[Dict[str, Any]] = None,
+                spec: Optional[QuerySpec] = None) -> List[ReadSchemaType]:
+        """
+        Obtiene todos los registros ya convertidos a ReadSchemas
+        :param db: Optional SQLAlchemy session
+        :param filters: Filtros de igualdad, e.g. {"enable": True}
+        :param spec: QuerySpec con filtros, orden y límite sobre las columnas de query_fields
+        :return: Lista de ReadSchemas
+        """
+        def load(session: Session) -> List[ReadSchemaType]:
             query = session.query(self.model)
             if filters:
                 query = query.filter_by(**filters)
-            return [self.read_schema.model_validate(obj) for obj in query.all()]
+            return [self.read_schema.model_validate(obj) for obj in self._fetch(query, spec, session)]
+
+        return self._cached_query("get_all", (tuple(sorted((filters or {}).items())), self._spec_key(spec)), load, db)
+
+    def count(self, filters: Optional[Dict[str, Any]] = None, spec: Optional[QuerySpec] = None,
+              db: Optional[Session] = None) -> int:
+        """
+        Cuenta los registros que cumplen los filtros con un COUNT en la base de datos
+        :param filters: Filtros de igualdad, igual que en get_all()
+        :param spec: QuerySpec; sólo se usan sus filtros (el orden, limit y offset se ignoran)
+        :param db: Optional SQLAlchemy session
+        :return: Número de registros
+        """
+        stmt = select(func.count()).select_from(self.model.__table__)
+        if filters:
+            stmt = stmt.filter_by(**filters)
+        stmt = stmt.where(*self._spec_conditions(spec))
+        with self._session_scope(db) as session:
+            # Con shards cada uno devuelve su propio conteo
+            return sum(count for (count,) in session.execute(stmt).all())
+
+    def _spec_key(self, spec: Optional[QuerySpec]) -> Optional[str]:
+        return spec.cache_key() if spec is not None else None
+
+    def _spec_column(self, name: str):
+        allowed = self.query_fields or tuple(
+            column.key for column in self.model.__table__.columns if not isinstance(column.type, JSON)
+        )
+        if name not in allowed:
+            raise ValueError(f"Invalid field: {name}. Valid options are: {list(allowed)}")
+        return self.model.__table__.c[name]
+
+    def _spec_conditions(self, spec: Optional[QuerySpec]) -> List[Any]:
+        """Condiciones SQL de los filtros de un QuerySpec"""
+        if spec is None:
+            return []
+        return [self._spec_condition(f) for f in spec.filters]
+
+    def _spec_condition(self, f: FieldFilter):
+        column = self._spec_column(f.field)
+        if f.op == "is_null":
+            return column.is_(None) if f.value else column.isnot(None)
+        if f.op == "ilike":
+            return column.ilike(f.value)
+        if f.op in ("in", "not_in"):
+            values = [_coerce(column, value) for value in f.value]
+            return column.in_(values) if f.op == "in" else not_(column.in_(values))
+        if f.op == "between":
+            return column.between(_coerce(column, f.value[0]), _coerce(column, f.value[1]))
+        value = _coerce(column, f.value)
+        return {
+            "eq": column == value, "ne": column != value,
+            "lt": column < value, "lte": column <= value,
+            "gt": column > value, "gte": column >= value,
+        }[f.op]
+
+    def _spec_order(self, spec: QuerySpec) -> List[Tuple[str, bool]]:
+        """(columna, descendente) del orden del QuerySpec, con la clave primaria al final para que sea estable"""
+        order = []
+        for name in spec.order_by:
+            descending = name.startswith("-")
+            order.append((self._spec_column(name.lstrip("-")).key, descending))
+        pk = self.model.__table__.primary_key.columns[0].key
+        if pk not in {name for name, _ in order}:
+            order.append((pk, False))
+        return order
+
+    def _apply_spec(self, stmt, spec: Optional[QuerySpec], session: Session):
+        """
+        Aplica filtros, orden, limit y offset de un QuerySpec a un Query o Select.
+        Con shards cada uno devuelve sus offset + limit primeras filas: _merge_spec() las mezcla y recorta
+        """
+        if spec is None:
+            return stmt
+        stmt = stmt.filter(*self._spec_conditions(spec))
+        if not spec.order_by and spec.limit is None and not spec.offset:
+            return stmt
+        table = self.model.__table__
+        stmt = stmt.order_by(*[table.c[name].desc() if desc else table.c[name] for name, desc in self._spec_order(spec)])
+        if session_shards(session) != [None]:
+            return stmt.limit(spec.offset + spec.limit) if spec.limit is not None else stmt
+        if spec.limit is not None:
+            stmt = stmt.limit(spec.limit)
+        return stmt.offset(spec.offset) if spec.offset else stmt
+
+    def _merge_spec(self, items: List[Any], spec: Optional[QuerySpec], session: Session,
+                    get: Callable[[Any, str], Any] = getattr) -> List[Any]:
+        """Ordena y recorta los resultados de varios shards según el QuerySpec (sin shards no hace nada)"""
+        if spec is None or session_shards(session) == [None] or (not spec.order_by and spec.limit is None and not spec.offset):
+            return items
+        items = list(items)
+        for name, descending in reversed(self._spec_order(spec)):
+            items.sort(key=lambda item: (get(item, name) is None, get(item, name)), reverse=descending)
+        end = spec.offset + spec.limit if spec.limit is not None else None
+        return items[spec.offset:end]
+
+    def _fetch(self, query, spec: Optional[QuerySpec], session: Session) -> List[T]:
+        """Ejecuta un Query de ORM aplicando el QuerySpec"""
+        return self._merge_spec(self._apply_spec(query, spec, session).all(), spec, session)
+
+    def _cached_query(self, method: str, args: tuple, load: Callable[[Session], List[ReadSchemaType]],
+                      db: Optional[Session] = None) -> List[ReadSchemaType]:
+        """
+        Ejecuta load(session) a través de query_cache, si está activada. La clave es la clase,
+        el método y sus argumentos; el resultado se invalida al escribir en la tabla del modelo.
+        No se guardan resultados leídos por una sesión con escrituras sin confirmar
+        :param method: Nombre del método
+        :param args: Argumentos del método (hashables), sin db
+        :param load: Función que ejecuta la consulta con la sesión
+        :param db: Optional SQLAlchemy session
+        :return: Nueva lista de ReadSchemas compartidos con la caché (de solo lectura)
+        """
+        cache = self.query_cache
+        if cache is None:
+            with self._session_scope(db) as session:
+                return load(session)
+
+        key = (type(self).__name__, method, args)
+        found, value = cache.lookup(key)
+        if found:
+            return list(value)
+
+        versions = table_versions.snapshot((self.model.__tablename__,))
+        with self._session_scope(db) as session:
+            value = load(session)
+            cacheable = not has_pending_writes(session)
+        if cacheable:
+            cache.put(key, value, versions)
+        return list(value)
+
+    def stream_rows(self, filters: Optional[Dict[str, Any]] = None, batch_size: int = 1000, db: Optional[Session] = None,
+                    spec: Optional[QuerySpec] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Recorre la tabla en lotes de diccionarios leídos directamente del cursor,
+        sin construir objetos ORM ni ReadSchemas (memoria constante)
+        :param filters: Filtros de igualdad, igual que en get_all()
+        :param batch_size: Número de filas por lote
+        :param db: Optional SQLAlchemy session
+        :param spec: QuerySpec con filtros, orden y límite. Con shards el orden se respeta dentro
+                     de cada shard y el límite sobre el total recorrido
+        :return: Iterador de listas de diccionarios columna -> valor
+        """
+        table = self.model.__table__
+        stmt = select(table)
+        if filters:
+            stmt = stmt.filter_by(**filters)
+        with self._session_scope(db) as session:
+            stmt = self._apply_spec(stmt, spec, session)
+            if spec is None or (not spec.order_by and spec.limit is None and not spec.offset):
+                stmt = stmt.order_by(*table.primary_key.columns)
+            skip, remaining = 0, None
+            if spec is not None and session_shards(session) != [None]:
+                skip, remaining = spec.offset, spec.limit
+            result = session.execute(stmt.execution_options(yield_per=batch_size))
+            for partition in result.mappings().partitions(batch_size):
+                batch = [dict(row) for row in partition]
+                if skip:
+                    batch, skip = batch[skip:], max(0, skip - len(batch))
+                if remaining is not None:
+                    batch, remaining = batch[:remaining], remaining - len(batch[:remaining])
+                if batch:
+                    yield batch
+                if remaining == 0:
+                    return
+
+    def get_changed_since(self, since: datetime, cursor: Optional[int] = None, batch_size: int = 500,
+                          db: Optional[Session] = None) -> Iterator[ReadSchemaType]:
+        """
+        Recorre los registros modificados desde `since` en orden (updated, id), incluidos los
+        desactivados, paginando por keyset sobre el índice (updated, id).
+        Los registros borrados físicamente (p. ej. WsInterested) no aparecen: se leen con
+        get_deleted_since() o, con emit_events activo, de los eventos deleted del outbox.
+        Para continuar una sincronización se pasa el updated_at y el id del último registro recibido:
+            get_changed_since(last.updated_at, cursor=last.id)
+        Los timestamps los asigna cada proceso al escribir: conviene solapar unos segundos al
+        reanudar si hay escritores concurrentes con relojes distintos o transacciones largas.
+        :param since: Timestamp desde el cual buscar cambios (inclusivo si cursor es None)
+        :param cursor: ID del último registro recibido con updated == since
+        :param batch_size: Filas por consulta
+        :param db: Optional SQLAlchemy session
+        :return: Iterador de ReadSchemas
+        """
+        if "updated" not in self.model.__table__.c:
+            raise ValueError(f"{self.model.__name__} does not track updated timestamps")
+        updated, id_column = self.model.updated, self.model.__table__.primary_key.columns[0]
+
+        with self._session_scope(db) as session:
+            last_updated, last_id = since, cursor
+            while True:
+                query = session.query(self.model)
+                if last_id is None:
+                    query = query.filter(updated >= last_updated)
+                else:
+                    # El rango redundante sobre updated permite buscar en el índice en vez de recorrerlo con el OR
+                    query = query.filter(updated >= last_updated,
+                                         or_(updated > last_updated, and_(updated == last_updated, id_column > last_id)))
+                # Con shards cada uno devuelve su propio lote ordenado: se mezclan y se recortan
+                objs = query.order_by(updated, id_column).limit(batch_size).all()
+                objs = sorted(objs, key=lambda obj: (obj.updated, obj.id))[:batch_size]
+                for obj in objs:
+                    yield self.read_schema.model_validate(obj)
+                if len(objs) < batch_size:
+                    return
+                last_updated, last_id = objs[-1].updated, objs[-1].id
+
+    def get_deleted_since(self, since: datetime, cursor: Optional[int] = None, batch_size: int = 500,
+                          db: Optional[Session] = None) -> Iterator[TombstoneRead]:
+        """
+        Recorre los registros borrados físicamente desde `since` en orden (deleted, row_id), para
+        que quien sincroniza con get_changed_since() también elimine los que ya no existen.
+        Para continuar se pasa el deleted_at y el row_id de la última lápida recibida:
+            get_deleted_since(last.deleted_at, cursor=last.row_id)
+        :param since: Timestamp desde el cual buscar borrados (inclusivo si cursor es None)
+        :param cursor: row_id de la última lápida recibida con deleted == since
+        :param batch_size: Filas por consulta
+        :param db: Optional SQLAlchemy session
+        :return: Iterador de TombstoneRead
+        """
+        deleted, row_id = Tombstone.deleted, Tombstone.row_id
+        with self._session_scope(db) as session:
+            last_deleted, last_id = since, cursor
+            while True:
+                query = session.query(Tombstone).filter(Tombstone.table_name == self.model.__tablename__,
+                                                        deleted >= last_deleted)
+                if last_id is not None:
+                    query = query.filter(or_(deleted > last_deleted, and_(deleted == last_deleted, row_id > last_id)))
+                # Con shards cada uno devuelve su propio lote ordenado: se mezclan y se recortan
+                objs = query.order_by(deleted, row_id).limit(batch_size).all()
+                objs = sorted(objs, key=lambda obj: (obj.deleted, obj.row_id))[:batch_size]
+                for obj in objs:
+                    yield TombstoneRead.model_validate(obj)
+                if len(objs) < batch_size:
+                    return
+                last_deleted, last_id = objs[-1].deleted, objs[-1].row_id
+
+    def purge_deleted(self, before: datetime, db: Optional[Session] = None) -> int:
+        """
+        Elimina las lápidas de esta tabla anteriores a `before`, una vez que todos los
+        consumidores del feed las leyeron
+        :param before: Timestamp límite (exclusivo)
+        :param db: Optional SQLAlchemy session
+        :return: Número de lápidas eliminadas
+        """
+        stmt = delete(Tombstone).where(Tombstone.table_name == self.model.__tablename__, Tombstone.deleted < before)
+        with self._session_scope(db) as session:
+            return sum(session.execute(stmt, bind_arguments=bind_arguments(shard_id)).rowcount
+                       for shard_id in session_shards(session))
 
     def create(self, obj_in: CreateSchemaType, db: Optional[Session] = None) -> ReadSchemaType:
         """Crea un nuevo registro desde un CreateSchema y devuelve ReadSchema"""
@@ -65,10 +437,41 @@ class BaseService(Generic[T, CreateSchemaType, ReadSchemaType, UpdateSchemaType]
             obj_data = obj_in.model_dump()
             db_obj = self.model(**obj_data)
             session.add(db_obj)
-            session.commit()
+            session.flush()
+            track_write(session, self.model.__tablename__)
             session.refresh(db_obj)
+            self._after_create(db_obj, session)
+            self._emit(session, CREATED, [(db_obj.id, row_snapshot(db_obj))])
             return self.read_schema.model_validate(db_obj)
 
+    def bulk_create(self, objs_in: List[CreateSchemaType], db: Optional[Session] = None) -> int:
+        """
+        Inserta muchos registros en un solo viaje (COPY en PostgreSQL, executemany en el resto),
+        sin validaciones por fila ni refresh. Validar antes con validate_create_batch()
+        :param objs_in: Lista de CreateSchemas
+        :param db: Optional SQLAlchemy session
+        :return: Número de registros insertados
+        """
+        rows = [obj_in.model_dump() for obj_in in objs_in]
+        with self._session_scope(db) as session:
+            inserted = 0
+            for shard_id, shard_rows in split_rows_by_shard(session, self.model.__table__, rows).items():
+                inserted += bulk_insert(session, self.model.__table__, shard_rows, shard_id)
+            track_write(session, self.model.__tablename__)
+            self._after_bulk_create(rows, session)
+            # Sin shards los IDs generados no se conocen tras un executemany/COPY: aggregate_id queda en None
+            pk = self.model.__table__.primary_key.columns[0].name
+            self._emit(session, CREATED, [(row.get(pk), jsonable(row)) for row in rows],
+                       shard=lambda row_id, payload: row_shard(session, self.model.__tablename__, payload))
+            return inserted
+
+    def validate_create_batch(self, objs_in: List[CreateSchemaType], db: Optional[Session] = None) -> List[Optional[str]]:
+        """
+        Valida un lote de CreateSchemas con consultas agrupadas
+        :return: Un mensaje de error por objeto (None si es válido)
+        """
+        return [None] * len(objs_in)
+
     def update(self, id: int, obj_in: UpdateSchemaType | Dict[str, Any], db: Optional[Session] = None) -> Optional[ReadSchemaType]:
         """Actualiza un registro y devuelve el ReadSchema actualizado"""
         with self._session_scope(db) as session:
@@ -77,14 +480,56 @@ class BaseService(Generic[T, CreateSchemaType, ReadSchemaType, UpdateSchemaType]
                 return None
 
             update_data = obj_in.model_dump(exclude_unset=True) if isinstance(obj_in, BaseModel) else obj_in
+            # Con shards, la columna de enrutamiento sólo puede cambiar a un valor del mismo shard
+            check_shard_key_update(session, self.model.__tablename__, id, update_data)
+            previous = {field: getattr(db_obj, field) for field in update_data}
             for field, value in update_data.items():
                 setattr(db_obj, field, value)
                 
             session.flush()
+            track_write(session, self.model.__tablename__)
 
             session.refresh(db_obj)
+            self._after_update(db_obj, previous, session)
+            self._emit(session, UPDATED, [(db_obj.id, {"changes": jsonable(update_data), "previous": jsonable(previous)})])
             return self.read_schema.model_validate(db_obj)
 
+    def bulk_update(self, changes: Dict[int, Dict[str, Any]], db: Optional[Session] = None) -> int:
+        """
+        Actualiza muchos registros por ID con sentencias UPDATE agrupadas (executemany), una por
+        cada combinación de campos modificados, sin cargar objetos ORM ni validar
+        :param changes: {id: {campo: valor}}
+        :param db: Optional SQLAlchemy session
+        :return: Número de registros enviados a actualizar
+        :raises ValueError: Con shards, si un cambio de la columna de enrutamiento movería la fila a otro shard
+        """
+        table = self.model.__table__
+        id_column = table.primary_key.columns[0]
+
+        with self._session_scope(db) as session:
+            for id, values in changes.items():
+                check_shard_key_update(session, table.name, id, values)
+            self._before_bulk_update(changes, session)
+            # Una sentencia por shard (sólo None si la sesión no está particionada) y campos modificados
+            groups: Dict[tuple, List[Dict[str, Any]]] = {}
+            for shard_id, ids in split_ids_by_shard(session, changes).items():
+                for id in ids:
+                    values = changes[id]
+                    # Los nombres de columna están reservados por SQLAlchemy para el SET, por eso el prefijo
+                    groups.setdefault((shard_id, tuple(sorted(values))), []).append(
+                        {"_id": id, **{f"_{name}": value for name, value in values.items()}}
+                    )
+            for (shard_id, fields), params in groups.items():
+                stmt = update(table).where(id_column == bindparam("_id")).values(
+                    {name: bindparam(f"_{name}") for name in fields}
+                )
+                session.execute(stmt, params, bind_arguments=bind_arguments(shard_id))
+            track_write(session, self.model.__tablename__)
+            rows = [{id_column.name: id, **values} for id, values in changes.items()]
+            self._after_bulk_update(rows, session)
+            self._emit(session, UPDATED, [(id, {"changes": jsonable(values)}) for id, values in changes.items()])
+        return len(changes)
+
     def delete(self, id: int, db: Optional[Session] = None) -> bool:
         """Elimina o desactiva un registro (sin schema)"""
         with self._session_scope(db) as session:
@@ -98,9 +543,55 @@ class BaseService(Generic[T, CreateSchemaType, ReadSchemaType, UpdateSchemaType]
             else:
                 session.delete(db_obj)
                 session.flush()
+                if "updated" in self.model.__table__.c:
+                    # El borrado físico no deja rastro en get_changed_since: se deja una lápida
+                    record_deletions(session, self.model.__tablename__, [(inspect(db_obj).identity_token, id)])
 
+            track_write(session, self.model.__tablename__)
+            self._after_delete(db_obj, session)
+            self._emit(session, DELETED, [(id, row_snapshot(db_obj))])
             return True
 
+    def _emit(self, session: Session, event_type: str, events: List[tuple],
+              shard: Optional[Callable[[Optional[int], Dict[str, Any]], Optional[str]]] = None):
+        """
+        Escribe los eventos en el outbox, dentro de la transacción del cambio, si emit_events está activo
+        :param session: Sesión de la escritura
+        :param event_type: created, updated o deleted
+        :param events: Lista de (id, payload)
+        :param shard: Función (id, payload) -> shard del evento. Por defecto el shard del id
+        """
+        if not self.emit_events or not events:
+            return
+        locate = shard or (lambda row_id, payload: id_shard(session, row_id))
+        record_events(session, self.model.__tablename__, [
+            (locate(row_id, payload), row_id, event_type, payload) for row_id, payload in events
+        ])
+
     def _validate_create(self, obj_in: CreateSchemaType, db: Optional[Session] = None):
         """Hook para validaciones adicionales al crear"""
-        pass
\ No newline at end of file
+        pass
+
+    def _after_create(self, db_obj: T, db: Optional[Session] = None):
+        """Hook llamado después de crear un registro, dentro de la misma sesión"""
+        pass
+
+    def _after_bulk_create(self, rows: List[Dict[str, Any]], db: Optional[Session] = None):
+        """Hook llamado después de una inserción masiva, dentro de la misma sesión"""
+        pass
+
+    def _before_bulk_update(self, changes: Dict[int, Dict[str, Any]], db: Optional[Session] = None):
+        """Hook llamado antes de una actualización masiva, dentro de la misma sesión"""
+        pass
+
+    def _after_bulk_update(self, rows: List[Dict[str, Any]], db: Optional[Session] = None):
+        """Hook llamado después de una actualización masiva; cada fila trae el id y los campos modificados"""
+        pass
+
+    def _after_update(self, db_obj: T, previous: Dict[str, Any], db: Optional[Session] = None):
+        """Hook llamado después de actualizar un registro; previous contiene los valores anteriores de los campos modificados"""
+        pass
+
+    def _after_delete(self, db_obj: T, db: Optional[Session] = None):
+        """Hook llamado después de eliminar o desactivar un registro"""
+        pass
@@ -0,0 +1,274 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from .base_service import BaseService
+from ..database.bulk import chunked
+from ..database.sharding import bind_arguments, dialect_name, session_shards
+from ..enums.profile_type import ProfileType
+from ..models.counter import Counter
+from ..models.user import User
+from ..models.ws_interested import WsInterested
+from ..schemas.counter_schema import CounterRead
+
+# Subscriptions of enabled users per weather station, key = ws_ext_id
+WS_SUBSCRIBERS = "ws_subscribers"
+# Enabled users per app and profile, key = "<app_id>:<profile>"
+APP_PROFILE_USERS = "app_profile_users"
+
+# (shard_id, name, key) -> delta. shard_id is None when the session is not sharded
+Deltas = Dict[Tuple[Optional[str], str, str], int]
+
+
+def app_profile_key(app_id: int, profile) -> str:
+    """Counter key of an app and profile"""
+    return f"{app_id}:{ProfileType(profile).value}"
+
+
+# Columns whose changes move users and subscriptions between counters
+USER_COUNTED_FIELDS = frozenset({"app_id", "profile", "enable"})
+SUBSCRIPTION_COUNTED_FIELDS = frozenset({"user_id", "ws_ext_id"})
+
+# Values per lookup query when loading the state of many rows
+_CHUNK_SIZE = 500
+
+
+def user_state(obj: Any) -> Dict[str, Any]:
+    """Counted fields of a user (ORM object)"""
+    return {field: getattr(obj, field) for field in USER_COUNTED_FIELDS}
+
+
+def count_user_changes(session: Session, changes: List[Tuple[Optional[str], Optional[int], Optional[Dict], Optional[Dict]]]) -> Deltas:
+    """
+    Counter deltas of user writes
+    :param session: SQLAlchemy session of the write
+    :param changes: (shard_id, user_id, old state, new state) per user. States hold app_id, profile
+                    and enable, None for a user that did not exist before or after the write
+    :return: Deltas for CounterService.apply()
+    """
+    deltas: Deltas = defaultdict(int)
+    toggled: Dict[int, Tuple[Optional[str], int]] = {}
+    for shard_id, user_id, old, new in changes:
+        was_counted = bool(old and old["enable"] and old["app_id"] is not None)
+        is_counted = bool(new and new["enable"] and new["app_id"] is not None)
+        if was_counted:
+            deltas[(shard_id, APP_PROFILE_USERS, app_profile_key(old["app_id"], old["profile"]))] -= 1
+        if is_counted:
+            deltas[(shard_id, APP_PROFILE_USERS, app_profile_key(new["app_id"], new["profile"]))] += 1
+        # Enabling or disabling a user adds or removes all of its subscriptions
+        if bool(old and old["enable"]) != bool(new and new["enable"]) and user_id is not None:
+            toggled[user_id] = (shard_id, 1 if new and new["enable"] else -1)
+
+    for chunk in chunked(list(toggled), _CHUNK_SIZE):
+        subscriptions = session.query(WsInterested.user_id, WsInterested.ws_ext_id, func.count()).filter(
+            WsInterested.user_id.in_(chunk)
+        ).group_by(WsInterested.user_id, WsInterested.ws_ext_id)
+        for user_id, ws_ext_id, count in subscriptions:
+            shard_id, sign = toggled[user_id]
+            deltas[(shard_id, WS_SUBSCRIBERS, ws_ext_id)] += sign * count
+    return deltas
+
+
+def count_subscription_changes(session: Session, changes: List[Tuple[Optional[str], Optional[Tuple], Optional[Tuple]]]) -> Deltas:
+    """
+    Counter deltas of subscription writes. Only subscriptions of enabled users are counted
+    :param session: SQLAlchemy session of the write
+    :param changes: (shard_id, old, new) per subscription, old and new being (user_id, ws_ext_id)
+                    or None for a subscription that did not exist before or after the write
+    :return: Deltas for CounterService.apply()
+    """
+    user_ids = {state[0] for _, old, new in changes for state in (old, new) if state and state[0] is not None}
+    enabled = set()
+    for chunk in chunked(list(user_ids), _CHUNK_SIZE):
+        enabled.update(id for (id,) in session.query(User.id).filter(User.id.in_(chunk), User.enable == True))
+
+    deltas: Deltas = defaultdict(int)
+    for shard_id, old, new in changes:
+        if old and old[0] in enabled:
+            deltas[(shard_id, WS_SUBSCRIBERS, old[1])] -= 1
+        if new and new[0] in enabled:
+            deltas[(shard_id, WS_SUBSCRIBERS, new[1])] += 1
+    return deltas
+
+
+class CounterService(BaseService[Counter, CounterRead, CounterRead, CounterRead]):
+    """
+    Precomputed counters kept in the counters table. When enabled, UserService and
+    WsInterestedService update them in the same transaction as their writes (create,
+    update, delete and the bulk paths), so reads are a primary key lookup instead of
+    a scan of users or ws_interested.
+
+    Counters only track writes made through the services: run rebuild() after enabling
+    them on existing data, and whenever they may have drifted.
+
+    Counters have a composite (name, key) primary key and are only written by apply() and
+    rebuild(): the id-based lookups and the generic write methods raise ValueError.
+    """
+    # Maintenance is off by default; enable it once for the whole process
+    enabled: bool = False
+    # Counter writes are derived data: they never produce outbox events
+    emit_events = False
+
+    def __init__(self):
+        super().__init__(Counter, CounterRead, CounterRead, CounterRead)
+
+    @classmethod
+    def enable(cls, enabled: bool = True):
+        """Turn counter maintenance on (or off) for every service write in the process"""
+        cls.enabled = enabled
+
+    def _unsupported(self, method: str):
+        """Reject the inherited id-based and generic write methods"""
+        raise ValueError(f"CounterService does not support {method}(): counters are keyed by (name, key) "
+                         "and written with apply() and rebuild()")
+
+    def get_by_id(self, id: int, db: Optional[Session] = None):
+        self._unsupported("get_by_id")
+
+    def get_by_ids(self, ids: Iterable[int], db: Optional[Session] = None, chunk_size: Optional[int] = None):
+        self._unsupported("get_by_ids")
+
+    def get_changed_since(self, *args, **kwargs):
+        self._unsupported("get_changed_since")
+
+    def get_deleted_since(self, *args, **kwargs):
+        self._unsupported("get_deleted_since")
+
+    def purge_deleted(self, *args, **kwargs):
+        self._unsupported("purge_deleted")
+
+    def create(self, obj_in: CounterRead, db: Optional[Session] = None):
+        self._unsupported("create")
+
+    def bulk_create(self, objs_in: List[CounterRead], db: Optional[Session] = None):
+        self._unsupported("bulk_create")
+
+    def update(self, id: int, obj_in: Any, db: Optional[Session] = None):
+        self._unsupported("update")
+
+    def bulk_update(self, changes: Dict[int, Dict[str, Any]], db: Optional[Session] = None):
+        self._unsupported("bulk_update")
+
+    def delete(self, id: int, db: Optional[Session] = None):
+        self._unsupported("delete")
+
+    def get_value(self, name: str, key: str, db: Optional[Session] = None) -> int:
+        """
+        Get the value of a counter
+        :param name: Counter name, e.g. WS_SUBSCRIBERS
+        :param key: Counter key
+        :param db: Optional SQLAlchemy session
+        :return: Current value, 0 if the counter does not exist
+        """
+        with self._session_scope(db) as session:
+            # Sharded sessions return one partial sum per shard
+            partials = session.query(func.sum(self.model.value)).filter(self.model.name == name, self.model.key == key).all()
+            return sum(value or 0 for (value,) in partials)
+
+    def get_values(self, name: str, keys: Iterable[str], db: Optional[Session] = None) -> Dict[str, int]:
+        """
+        Get several counters of the same name at once
+        :param name: Counter name
+        :param keys: Counter keys
+        :param db: Optional SQLAlchemy session
+        :return: Dictionary key -> value, 0 for keys without counter
+        """
+        result = dict.fromkeys(keys, 0)
+        found = self.get_many_by("key", list(result), db=db, filters={"name": name})
+        for key, counters in found.found.items():
+            result[key] = sum(counter.value for counter in counters)
+        return result
+
+    def ws_subscribers(self, ws_ext_id: str, db: Optional[Session] = None) -> int:
+        """Number of subscriptions of enabled users to a weather station"""
+        return self.get_value(WS_SUBSCRIBERS, ws_ext_id, db=db)
+
+    def app_profile_users(self, app_id: int, profile: Optional[str] = None, db: Optional[Session] = None) -> int:
+        """
+        Number of enabled users of an app
+        :param app_id: App ID
+        :param profile: Only users with this profile. Every profile when None
+        :param db: Optional SQLAlchemy session
+        :raises ValueError: If profile is not a valid ProfileType
+        """
+        if profile is not None:
+            try:
+                return self.get_value(APP_PROFILE_USERS, app_profile_key(app_id, profile), db=db)
+            except ValueError:
+                raise ValueError(f"Invalid profile type: {profile}. Valid options are: {[p.value for p in ProfileType]}")
+        keys = [app_profile_key(app_id, p) for p in ProfileType]
+        return sum(self.get_values(APP_PROFILE_USERS, keys, db=db).values())
+
+    def rebuild(self, db: Optional[Session] = None) -> Dict[str, int]:
+        """
+        Recompute every counter from users and ws_interested, in one transaction per call
+        (each shard recounts its own rows when the session is sharded)
+        :param db: Optional SQLAlchemy session
+        :return: Number of counters written per name
+        """
+        written = {WS_SUBSCRIBERS: 0, APP_PROFILE_USERS: 0}
+        with self._session_scope(db) as session:
+            for shard_id in session_shards(session):
+                options = bind_arguments(shard_id)
+                session.execute(delete(Counter.__table__).where(Counter.name.in_(list(written))), bind_arguments=options)
+                subscribers = session.execute(
+                    select(WsInterested.ws_ext_id, func.count())
+                    .join(User, WsInterested.user_id == User.id)
+                    .where(User.enable == True)
+                    .group_by(WsInterested.ws_ext_id),
+                    bind_arguments=options,
+                )
+                users = session.execute(
+                    select(User.app_id, User.profile, func.count())
+                    .where(User.enable == True, User.app_id.isnot(None))
+                    .group_by(User.app_id, User.profile),
+                    bind_arguments=options,
+                )
+                rows = [{"name": WS_SUBSCRIBERS, "key": ws_ext_id, "value": count} for ws_ext_id, count in subscribers]
+                rows += [
+                    {"name": APP_PROFILE_USERS, "key": app_profile_key(app_id, profile), "value": count}
+                    for app_id, profile, count in users
+                ]
+                if rows:
+                    session.execute(insert(self.model.__table__), rows, bind_arguments=options)
+                for row in rows:
+                    written[row["name"]] += 1
+        return written
+
+    @classmethod
+    def apply(cls, session: Session, deltas: Deltas):
+        """
+        Add the deltas to their counters with one upsert per shard, inside the caller's transaction
+        :param session: SQLAlchemy session of the write being counted
+        :param deltas: (shard_id, name, key) -> delta
+        """
+        by_shard: Dict[Optional[str], List[Dict]] = defaultdict(list)
+        for (shard_id, name, key), delta in deltas.items():
+            if delta:
+                by_shard[shard_id].append({"name": name, "key": key, "value": delta})
+        for shard_id, params in by_shard.items():
+            cls._upsert(session, shard_id, params)
+
+    @staticmethod
+    def _upsert(session: Session, shard_id: Optional[str], params: List[Dict]):
+        table = Counter.__table__
+        options = bind_arguments(shard_id)
+        dialect = dialect_name(session, shard_id)
+        if dialect in ("postgresql", "sqlite"):
+            stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.name, table.c.key],
+                set_={"value": table.c.value + stmt.excluded.value},
+            )
+            session.execute(stmt, params, bind_arguments=options)
+            return
+        for row in params:
+            result = session.execute(
+                update(table)
+                .where(table.c.name == row["name"], table.c.key == row["key"])
+                .values(value=table.c.value + row["value"]),
+                bind_arguments=options,
+            )
+            if result.rowcount == 0:
+                session.execute(insert(table), [row], bind_arguments=options)
@@ -0,0 +1,173 @@
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from .base_service import BaseService
+from ..database.bulk import chunked, max_bind_params
+from ..database.sharding import bind_arguments, dialect_name, session_shards
+from ..models.outbox_event import OutboxEvent
+from ..schemas.outbox_event_schema import OutboxEventRead
+
+
+class OutboxService(BaseService[OutboxEvent, OutboxEventRead, OutboxEventRead, OutboxEventRead]):
+    """
+    Drainer of the transactional outbox. Services with emit_events enabled write one
+    outbox_events row per change in the same transaction as the change; consumers
+    claim them in batches, handle them and ack() them, which deletes them.
+
+    Delivery is at least once: a claimed event that is neither acked nor released
+    becomes available again when its lease expires. Events of one database (or shard)
+    are claimed in id order.
+    """
+    # The outbox never records events about itself
+    emit_events = False
+
+    def __init__(self):
+        super().__init__(OutboxEvent, OutboxEventRead, OutboxEventRead, OutboxEventRead)
+
+    def claim(self, batch_size: int = 100, lease: float = 30.0, consumer: str = "consumer",
+              aggregates: Optional[Iterable[str]] = None, db: Optional[Session] = None) -> List[OutboxEventRead]:
+        """
+        Claim the events that have been available the longest, oldest id first on ties. On PostgreSQL the candidates are locked with
+        FOR UPDATE SKIP LOCKED so concurrent drainers take disjoint batches without waiting;
+        on other dialects the claim is a conditional UPDATE that only takes still available rows.
+        The claim is committed before returning unless it runs inside a unit of work.
+        :param batch_size: Maximum events to claim (per shard when sharding is configured)
+        :param lease: Seconds before unacked events become available again
+        :param consumer: Name of the consumer, stored with a unique suffix in claimed_by
+        :param aggregates: Only claim events of these tables, e.g. ["users"]
+        :param db: Optional SQLAlchemy session
+        :return: Claimed events in id order
+        """
+        if batch_size <= 0 or lease <= 0:
+            raise ValueError("batch_size and lease must be positive")
+        table = self.model.__table__
+        now = datetime.now(timezone.utc)
+        token = f"{consumer[:40]}:{uuid.uuid4().hex}"
+        events: List[OutboxEventRead] = []
+
+        with self._session_scope(db) as session:
+            for shard_id in session_shards(session):
+                options = bind_arguments(shard_id)
+                due = select(table.c.id).where(table.c.available_at <= now)
+                if aggregates is not None:
+                    due = due.where(table.c.aggregate.in_(list(aggregates)))
+                # Same order as the (available_at, id) index: the scan stops after batch_size rows
+                due = due.order_by(table.c.available_at, table.c.id).limit(batch_size)
+                if dialect_name(session, shard_id) == "postgresql":
+                    due = due.with_for_update(skip_locked=True)
+                ids = session.execute(due, bind_arguments=options).scalars().all()
+                if not ids:
+                    continue
+                session.execute(
+                    update(table)
+                    .where(table.c.id.in_(ids), table.c.available_at <= now)
+                    .values(available_at=now + timedelta(seconds=lease), claimed_by=token, attempts=table.c.attempts + 1),
+                    bind_arguments=options,
+                )
+                claimed = session.execute(
+                    select(table).where(table.c.id.in_(ids), table.c.claimed_by == token).order_by(table.c.id),
+                    bind_arguments=options,
+                ).mappings()
+                events.extend(self.read_schema.model_validate({**row, "shard": shard_id}) for row in claimed)
+        return events
+
+    def ack(self, events: Iterable[OutboxEventRead], db: Optional[Session] = None) -> int:
+        """
+        Mark events as handled by deleting them
+        :param events: Events returned by claim()
+        :param db: Optional SQLAlchemy session
+        :return: Number of events deleted
+        """
+        table = self.model.__table__
+        deleted = 0
+        with self._session_scope(db) as session:
+            for shard_id, ids in self._ids_by_shard(events).items():
+                for chunk in chunked(ids, max_bind_params(session) - 1):
+                    result = session.execute(delete(table).where(table.c.id.in_(chunk)), bind_arguments=bind_arguments(shard_id))
+                    deleted += result.rowcount
+        return deleted
+
+    def release(self, events: Iterable[OutboxEventRead], delay: float = 0.0, db: Optional[Session] = None) -> int:
+        """
+        Give claimed events back, e.g. after the handler failed
+        :param events: Events returned by claim()
+        :param delay: Seconds before the events can be claimed again
+        :param db: Optional SQLAlchemy session
+        :return: Number of events released
+        """
+        table = self.model.__table__
+        available_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        released = 0
+        with self._session_scope(db) as session:
+            for shard_id, ids in self._ids_by_shard(events).items():
+                for chunk in chunked(ids, max_bind_params(session) - 2):
+                    result = session.execute(
+                        update(table).where(table.c.id.in_(chunk)).values(available_at=available_at, claimed_by=None),
+                        bind_arguments=bind_arguments(shard_id),
+                    )
+                    released += result.rowcount
+        return released
+
+    def pending_count(self, db: Optional[Session] = None) -> int:
+        """Number of events not yet acked, claimed or not"""
+        with self._session_scope(db) as session:
+            # Sharded sessions return one partial count per shard
+            return sum(count for (count,) in session.query(func.count(self.model.id)).all())
+
+    def drain(self, handler: Callable[[List[OutboxEventRead]], None], batch_size: int = 100, lease: float = 30.0,
+              poll_interval: float = 0.5, retry_delay: float = 5.0, consumer: str = "consumer",
+              aggregates: Optional[Iterable[str]] = None, stop: Optional[threading.Event] = None,
+              until_empty: bool = False, session_factory: Optional[sessionmaker] = None) -> int:
+        """
+        Claim, handle and ack events in a loop. Full batches are followed by the next claim
+        right away; the loop only sleeps poll_interval seconds when the outbox is empty.
+        A batch whose handler raises is released and retried after retry_delay seconds.
+        :param handler: Function receiving each claimed batch
+        :param batch_size: Maximum events per batch
+        :param lease: Seconds the handler has before the batch can be claimed by another drainer
+        :param poll_interval: Seconds to wait when there are no available events
+        :param retry_delay: Seconds before a failed batch is available again
+        :param consumer: Name of the consumer
+        :param aggregates: Only drain events of these tables
+        :param stop: Event that ends the loop when set
+        :param until_empty: Return as soon as no event is available
+        :param session_factory: Session factory for each claim, ack and release. Defaults to the
+                                service's own session handling
+        :return: Number of events handled
+        """
+        def call(method, *args, **kwargs):
+            if session_factory is None:
+                return method(*args, **kwargs)
+            with session_factory() as session:
+                return method(*args, db=session, **kwargs)
+
+        stop = stop or threading.Event()
+        aggregates = list(aggregates) if aggregates is not None else None
+        handled = 0
+        while not stop.is_set():
+            events = call(self.claim, batch_size, lease, consumer, aggregates)
+            if not events:
+                if until_empty:
+                    break
+                stop.wait(poll_interval)
+                continue
+            try:
+                handler(events)
+            except Exception as e:
+                print(f"⚠️ Outbox handler error: {str(e)}")
+                call(self.release, events, delay=retry_delay)
+                continue
+            call(self.ack, events)
+            handled += len(events)
+        return handled
+
+    @staticmethod
+    def _ids_by_shard(events: Iterable[OutboxEventRead]) -> Dict[Optional[str], List[int]]:
+        groups: Dict[Optional[str], List[int]] = defaultdict(list)
+        for event in events:
+            groups[event.shard].append(event.id)
+        return groups
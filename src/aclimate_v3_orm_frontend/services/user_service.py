@@ -1,12 +1,25 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 from .base_service import BaseService
+from .counter_service import CounterService, USER_COUNTED_FIELDS, count_user_changes, user_state
+from .ws_interested_service import WsInterestedService
+from ..cache.identity_cache import IdentityCache
+from ..cache.query_cache import has_pending_writes
+from ..cache.subscriber_index import SubscriberIndex
+from ..database.bulk import chunked
+from ..database.sharding import id_shard, row_shard
 from ..models.user import User
+from ..schemas.query_spec import QuerySpec
 from ..schemas.user_schema import UserCreate, UserUpdate, UserRead
 from ..enums.profile_type import ProfileType
 from ..validations.user_validator import UserValidator
 
 class UserService(BaseService[User, UserCreate, UserRead, UserUpdate]):
+    # Shared by every UserService instance in the process
+    identity_cache = IdentityCache()
+    query_fields = ("id", "ext_key_clock_id", "app_id", "profile", "enable", "register", "updated")
+
     def __init__(self):
         super().__init__(User, UserCreate, UserRead, UserUpdate)
 
@@ -24,10 +37,12 @@ class UserService(BaseService[User, UserCreate, UserRead, UserUpdate]):
         except ValueError:
             raise ValueError(f"Invalid profile type: {profile}. Valid options are: {[p.value for p in ProfileType]}")
         
-        with self._session_scope(db) as session:
+        def load(session: Session) -> List[UserRead]:
             objs = session.query(self.model).filter(self.model.profile == profile_enum, self.model.enable == enabled).all()
             return [UserRead.model_validate(obj) for obj in objs]
 
+        return self._cached_query("get_by_profile", (profile_enum, enabled), load, db)
+
     def get_by_app(self, app_id: int, enabled: bool = True, db: Optional[Session] = None) -> List[UserRead]:
         """
         Get users by app_id and enabled status
@@ -36,10 +51,12 @@ class UserService(BaseService[User, UserCreate, UserRead, UserUpdate]):
         :param db: Optional SQLAlchemy session
         :return: List of UserRead schemas
         """
-        with self._session_scope(db) as session:
+        def load(session: Session) -> List[UserRead]:
             objs = session.query(self.model).filter(self.model.app_id == app_id, self.model.enable == enabled).all()
             return [UserRead.model_validate(obj) for obj in objs]
 
+        return self._cached_query("get_by_app", (app_id, enabled), load, db)
+
     def get_by_ext_key_clock_id(self, ext_key_clock_id: str, enabled: bool = True, db: Optional[Session] = None) -> List[UserRead]:
         """
         Get users by ext_key_clock_id and enabled status
@@ -48,21 +65,26 @@ class UserService(BaseService[User, UserCreate, UserRead, UserUpdate]):
         :param db: Optional SQLAlchemy session
         :return: List of UserRead schemas
         """
-        with self._session_scope(db) as session:
+        def load(session: Session) -> List[UserRead]:
             objs = session.query(self.model).filter(self.model.ext_key_clock_id == ext_key_clock_id, self.model.enable == enabled).all()
             return [UserRead.model_validate(obj) for obj in objs]
 
-    def get_all(self, enabled: bool = True, db: Optional[Session] = None) -> List[UserRead]:
+        return self._cached_query("get_by_ext_key_clock_id", (ext_key_clock_id, enabled), load, db)
+
+    def get_all(self, enabled: bool = True, db: Optional[Session] = None, spec: Optional[QuerySpec] = None) -> List[UserRead]:
         """
         Get all users filtered by enabled status
         :param enabled: Filter by enabled status
         :param db: Optional SQLAlchemy session
+        :param spec: Optional QuerySpec with additional filters, order_by and limit
         :return: List of UserRead schemas
         """
-        with self._session_scope(db) as session:
-            objs = session.query(self.model).filter(self.model.enable == enabled).all()
+        def load(session: Session) -> List[UserRead]:
+            objs = self._fetch(session.query(self.model).filter(self.model.enable == enabled), spec, session)
             return [UserRead.model_validate(obj) for obj in objs]
 
+        return self._cached_query("get_all", (enabled, self._spec_key(spec)), load, db)
+
     def get_by_profile_and_app(self, profile: str, app_id: int, enabled: bool = True, db: Optional[Session] = None) -> List[UserRead]:
         """
         Get users by profile, app_id and enabled status
@@ -78,7 +100,7 @@ class UserService(BaseService[User, UserCreate, UserRead, UserUpdate]):
         except ValueError:
             raise ValueError(f"Invalid profile type: {profile}. Valid options are: {[p.value for p in ProfileType]}")
         
-        with self._session_scope(db) as session:
+        def load(session: Session) -> List[UserRead]:
             objs = session.query(self.model).filter(
                 self.model.profile == profile_enum,
                 self.model.app_id == app_id,
@@ -86,6 +108,159 @@ class UserService(BaseService[User, UserCreate, UserRead, UserUpdate]):
             ).all()
             return [UserRead.model_validate(obj) for obj in objs]
 
+        return self._cached_query("get_by_profile_and_app", (profile_enum, app_id, enabled), load, db)
+
+    def resolve_identity(self, ext_key_clock_id: str, app_id: int, db: Optional[Session] = None) -> Optional[UserRead]:
+        """
+        Resolve a Keycloak subject to the enabled user of an app, using the identity cache
+        :param ext_key_clock_id: External Keycloak ID (token subject)
+        :param app_id: Associated App ID
+        :param db: Optional SQLAlchemy session
+        :return: UserRead schema shared with the cache (treat it as read-only) or None if
+                 the subject is unknown or disabled for the app. Results read by a session with
+                 uncommitted writes to users are not cached
+        """
+        key = (ext_key_clock_id, app_id)
+        found, user = self.identity_cache.lookup(key)
+        if found:
+            return user
+
+        generation = self.identity_cache.generation()
+        with self._session_scope(db) as session:
+            obj = session.query(self.model).filter(
+                self.model.ext_key_clock_id == ext_key_clock_id,
+                self.model.app_id == app_id,
+                self.model.enable == True
+            ).first()
+            user = UserRead.model_validate(obj) if obj else None
+            # A session with uncommitted writes to users may have read a row that is rolled back
+            cacheable = not has_pending_writes(session, (self.model.__tablename__,))
+
+        if cacheable:
+            self.identity_cache.put(key, user, generation=generation)
+        return user
+
+    def warm_identity_cache(self, app_id: Optional[int] = None, batch_size: int = 1000, db: Optional[Session] = None) -> int:
+        """
+        Bulk-load enabled users into the identity cache, typically at startup
+        :param app_id: Only load users of this app. All apps when None
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :param db: Optional SQLAlchemy session
+        :return: Number of users loaded (never more than the cache maxsize, 0 when the session
+                 has uncommitted writes to users)
+        """
+        loaded = 0
+        with self._session_scope(db) as session:
+            if has_pending_writes(session, (self.model.__tablename__,)):
+                return 0
+            query = session.query(self.model).filter(self.model.enable == True)
+            if app_id is not None:
+                query = query.filter(self.model.app_id == app_id)
+            for obj in query.yield_per(batch_size):
+                if loaded >= self.identity_cache.maxsize:
+                    break
+                user = UserRead.model_validate(obj)
+                self.identity_cache.put((user.ext_key_clock_id, user.app_id), user)
+                loaded += 1
+        return loaded
+
+    def _stage_enabled(self, db: Session, users: Dict[int, bool]):
+        """Apply enable status changes to the subscriber index, if loaded, when the transaction commits"""
+        index = WsInterestedService.subscriber_index
+        if index is not None and users:
+            index.stage(db, SubscriberIndex.set_users_enabled, users)
+
+    def _after_create(self, db_obj: User, db: Optional[Session] = None):
+        """Drop any negative entry cached for the new identity and count the user"""
+        self.identity_cache.invalidate_for_transaction(db, keys=[(db_obj.ext_key_clock_id, db_obj.app_id)])
+        if not db_obj.enable:
+            self._stage_enabled(db, {db_obj.id: False})
+        if CounterService.enabled:
+            token = inspect(db_obj).identity_token
+            CounterService.apply(db, count_user_changes(db, [(token, db_obj.id, None, user_state(db_obj))]))
+
+    def _after_bulk_create(self, rows: List[Dict[str, Any]], db: Optional[Session] = None):
+        """Drop any negative entries cached for the imported identities and count the users"""
+        self.identity_cache.invalidate_for_transaction(db, keys=[(row["ext_key_clock_id"], row["app_id"]) for row in rows])
+        if WsInterestedService.subscriber_index is not None:
+            self._stage_enabled(db, {id: False for id in self._disabled_ids(db, rows)})
+        if CounterService.enabled:
+            changes = [
+                (row_shard(db, "users", row), None, None,
+                 {"app_id": row.get("app_id"), "profile": row.get("profile"), "enable": row.get("enable", True)})
+                for row in rows
+            ]
+            CounterService.apply(db, count_user_changes(db, changes))
+
+    def _disabled_ids(self, db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+        """IDs of the disabled users among bulk-inserted rows, looked up by identity when not generated yet"""
+        ids = [row["id"] for row in rows if row.get("id") is not None and row.get("enable") is False]
+        keys = {(row["ext_key_clock_id"], row["app_id"]) for row in rows if row.get("id") is None and row.get("enable") is False}
+        for chunk in chunked(list(keys), 500):
+            query = db.query(self.model.id, self.model.ext_key_clock_id, self.model.app_id).filter(
+                self.model.ext_key_clock_id.in_({ext_key_clock_id for ext_key_clock_id, _ in chunk}),
+                self.model.app_id.in_({app_id for _, app_id in chunk}),
+                self.model.enable == False
+            )
+            ids.extend(id for id, ext_key_clock_id, app_id in query if (ext_key_clock_id, app_id) in keys)
+        return ids
+
+    def _after_update(self, db_obj: User, previous: Dict[str, Any], db: Optional[Session] = None):
+        """Drop the cached entries for both the old and the new identity and move the user's counts"""
+        old_key = (previous.get("ext_key_clock_id", db_obj.ext_key_clock_id), previous.get("app_id", db_obj.app_id))
+        self.identity_cache.invalidate_for_transaction(
+            db, keys=[old_key, (db_obj.ext_key_clock_id, db_obj.app_id)], ids=[db_obj.id]
+        )
+        if "enable" in previous:
+            self._stage_enabled(db, {db_obj.id: db_obj.enable})
+        if CounterService.enabled and USER_COUNTED_FIELDS & set(previous):
+            new = user_state(db_obj)
+            old = {**new, **{f: v for f, v in previous.items() if f in USER_COUNTED_FIELDS}}
+            token = inspect(db_obj).identity_token
+            CounterService.apply(db, count_user_changes(db, [(token, db_obj.id, old, new)]))
+
+    def _after_delete(self, db_obj: User, db: Optional[Session] = None):
+        """Drop the cached entry of a disabled user and stop counting it"""
+        self.identity_cache.invalidate_for_transaction(db, keys=[(db_obj.ext_key_clock_id, db_obj.app_id)], ids=[db_obj.id])
+        self._stage_enabled(db, {db_obj.id: False})
+        # The soft delete is not flushed yet: the attribute history tells whether the user was enabled
+        if CounterService.enabled and True in inspect(db_obj).attrs.enable.history.deleted:
+            new = user_state(db_obj)
+            token = inspect(db_obj).identity_token
+            CounterService.apply(db, count_user_changes(db, [(token, db_obj.id, {**new, "enable": True}, new)]))
+
+    def _before_bulk_update(self, changes: Dict[int, Dict[str, Any]], db: Optional[Session] = None):
+        """
+        Drop the cached entries for the old and new identities of the updated users and move
+        the counts of the users whose app, profile or enable status change
+        """
+        counting = CounterService.enabled
+        keys, counted = [], []
+        for chunk in chunked(list(changes), 500):
+            query = db.query(
+                self.model.id, self.model.ext_key_clock_id, self.model.app_id, self.model.profile, self.model.enable
+            ).filter(self.model.id.in_(chunk))
+            for id, ext_key_clock_id, app_id, profile, enable in query:
+                values = changes[id]
+                keys.append((ext_key_clock_id, app_id))
+                keys.append((values.get("ext_key_clock_id", ext_key_clock_id), values.get("app_id", app_id)))
+                if counting and USER_COUNTED_FIELDS & set(values):
+                    old = {"app_id": app_id, "profile": profile, "enable": enable}
+                    new = {**old, **{f: v for f, v in values.items() if f in USER_COUNTED_FIELDS}}
+                    counted.append((id_shard(db, id), id, old, new))
+        self.identity_cache.invalidate_for_transaction(db, keys=set(keys), ids=list(changes))
+        if counting:
+            CounterService.apply(db, count_user_changes(db, counted))
+
+    def _after_bulk_update(self, rows: List[Dict[str, Any]], db: Optional[Session] = None):
+        """Apply enable status changes to the subscriber index"""
+        self._stage_enabled(db, {row["id"]: row["enable"] for row in rows if "enable" in row})
+
+    def validate_create_batch(self, objs_in: List[UserCreate], db: Optional[Session] = None) -> List[Optional[str]]:
+        """Batch validation used by bulk imports before bulk_create()"""
+        with self._session_scope(db) as session:
+            return UserValidator.create_validate_batch(session, objs_in)
+
     def _validate_create(self, obj_in: UserCreate, db: Optional[Session] = None):
         """Validation hook called automatically from BaseService.create()"""
         UserValidator.create_validate(db, obj_in)
@@ -0,0 +1,163 @@
+import atexit
+import threading
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from sqlalchemy.orm import Session, sessionmaker
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces repeated updates to the same rows in memory and writes them later with
+    BaseService.bulk_update(), when max_pending rows are buffered, every flush_interval
+    seconds, on an explicit flush() and at interpreter shutdown.
+
+    Only the owning service instance sees the buffered values (read-your-writes): it
+    overlays them on the schemas it returns until they are flushed.
+
+    close() stops the timer and flushes; changes buffered after it restart the timer.
+    """
+
+    def __init__(self, service, max_pending: int = 500, flush_interval: Optional[float] = 1.0,
+                 session_factory: Optional[sessionmaker] = None):
+        """
+        :param service: Service whose bulk_update() writes the buffered changes
+        :param max_pending: Number of buffered rows that triggers a synchronous flush
+        :param flush_interval: Seconds between background flushes, None to disable the timer
+        :param session_factory: Session factory used by flushes without an explicit session.
+                                Defaults to the service's own session handling
+        """
+        if max_pending <= 0:
+            raise ValueError("max_pending must be a positive integer")
+        self.service = service
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._in_flight: Dict[int, Dict[str, Any]] = {}
+        self._snapshots: Dict[int, BaseModel] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def add(self, id: int, changes: Dict[str, Any], current: BaseModel) -> BaseModel:
+        """
+        Buffer changes for a row.
+        :param id: Row ID
+        :param changes: Field -> new value
+        :param current: Current ReadSchema of the row, used as base for read-your-writes
+        :return: ReadSchema with every buffered change applied
+        """
+        with self._lock:
+            if self._closed:
+                # Buffered again after close(): flush at shutdown and let the timer restart
+                self._closed = False
+                self._stop.clear()
+                atexit.register(self.close)
+            self._snapshots.setdefault(id, current)
+            self._pending.setdefault(id, {}).update(changes)
+            result = self._apply(self._snapshots[id])
+            should_flush = len(self._pending) >= self.max_pending
+        self._start_timer()
+        if should_flush:
+            self.flush()
+        return result
+
+    def snapshot(self, id: int) -> Optional[BaseModel]:
+        """ReadSchema of a buffered row with its pending changes applied, None if the row has none"""
+        with self._lock:
+            snapshot = self._snapshots.get(id)
+            return self._apply(snapshot) if snapshot is not None else None
+
+    def overlay(self, obj: Optional[BaseModel]) -> Optional[BaseModel]:
+        """Apply the buffered (pending or being flushed) changes of a row to a ReadSchema"""
+        if obj is None:
+            return None
+        with self._lock:
+            return self._apply(obj)
+
+    def overlay_all(self, objs: List[BaseModel]) -> List[BaseModel]:
+        """Apply the buffered changes to a list of ReadSchemas"""
+        with self._lock:
+            if not self._pending and not self._in_flight:
+                return objs
+            return [self._apply(obj) for obj in objs]
+
+    def discard(self, id: int):
+        """
+        Forget the buffered changes of a row, e.g. when it is deleted. Changes of a flush
+        in progress are no longer overlaid nor kept for a retry if that flush fails
+        """
+        with self._lock:
+            self._pending.pop(id, None)
+            self._in_flight.pop(id, None)
+            self._snapshots.pop(id, None)
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        Write every buffered change with batched UPDATE statements
+        :param db: Optional SQLAlchemy session
+        :return: Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                # A copy: discard() removes rows from it while bulk_update() reads the batch
+                self._in_flight = dict(batch)
+                self._snapshots = {}
+            if not batch:
+                return 0
+            try:
+                if db is None and self.session_factory is not None:
+                    with self.session_factory() as session:
+                        self.service.bulk_update(batch, db=session)
+                else:
+                    self.service.bulk_update(batch, db=db)
+            except Exception:
+                # Keep the changes for the next flush, without overwriting newer ones nor
+                # bringing back rows discarded meanwhile
+                with self._lock:
+                    for id, changes in batch.items():
+                        if id in self._in_flight:
+                            self._pending[id] = {**changes, **self._pending.get(id, {})}
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+            return len(batch)
+
+    def close(self):
+        """Stop the background timer and flush what is left"""
+        with self._lock:
+            self._closed = True
+            self._stop.set()
+            timer, self._timer = self._timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.join()
+        atexit.unregister(self.close)
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _apply(self, obj: BaseModel) -> BaseModel:
+        changes = {**self._in_flight.get(obj.id, {}), **self._pending.get(obj.id, {})}
+        return obj.model_copy(update=changes) if changes else obj
+
+    def _start_timer(self):
+        if self.flush_interval is None or self._timer is not None:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Thread(target=self._run_timer, name="write-behind-flush", daemon=True)
+            self._timer.start()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Write-behind flush error: {str(e)}")
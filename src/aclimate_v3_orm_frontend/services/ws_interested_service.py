@@ -1,13 +1,85 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, sessionmaker
 from .base_service import BaseService
+from .counter_service import CounterService, SUBSCRIPTION_COUNTED_FIELDS, count_subscription_changes
+from .write_behind import WriteBehindBuffer
+from ..cache.subscriber_index import SubscriberIndex
+from ..database.bulk import chunked
+from ..database.sharding import id_shard, row_shard
+from ..database.unit_of_work import current_session
+from ..models.user import User
 from ..models.ws_interested import WsInterested
+from ..schemas.query_spec import QuerySpec
 from ..schemas.ws_interested_schema import WsInterestedCreate, WsInterestedUpdate, WsInterestedRead
 from ..validations.ws_interested_validator import WsInterestedValidator
 
 class WsInterestedService(BaseService[WsInterested, WsInterestedCreate, WsInterestedRead, WsInterestedUpdate]):
+    # Fields whose updates can be coalesced by the write-behind buffer
+    WRITE_BEHIND_FIELDS = frozenset({"notification"})
+    query_fields = ("id", "user_id", "ws_ext_id", "updated")
+    # Installed by load_subscriber_index(); shared by every instance and kept current by the
+    # WsInterestedService and UserService write paths
+    subscriber_index: Optional[SubscriberIndex] = None
+
     def __init__(self):
         super().__init__(WsInterested, WsInterestedCreate, WsInterestedRead, WsInterestedUpdate)
+        self.write_behind: Optional[WriteBehindBuffer] = None
+
+    def enable_write_behind(self, max_pending: int = 500, flush_interval: Optional[float] = 1.0,
+                            session_factory: Optional[sessionmaker] = None) -> WriteBehindBuffer:
+        """
+        Buffer notification updates made through this instance and write them in batches
+        :param max_pending: Number of buffered rows that triggers a flush
+        :param flush_interval: Seconds between background flushes, None to flush only on demand
+        :param session_factory: Session factory used by background flushes
+        :return: The WriteBehindBuffer
+        """
+        if self.write_behind is None:
+            self.write_behind = WriteBehindBuffer(self, max_pending, flush_interval, session_factory)
+        return self.write_behind
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        Write the buffered notification updates, if write-behind is enabled
+        :param db: Optional SQLAlchemy session
+        :return: Number of rows written
+        """
+        return self.write_behind.flush(db=db) if self.write_behind else 0
+
+    def update(self, id: int, obj_in: WsInterestedUpdate | Dict[str, Any], db: Optional[Session] = None) -> Optional[WsInterestedRead]:
+        """
+        Update a weather station interest. With write-behind enabled, notification-only updates
+        made without an explicit session are buffered and coalesced instead of written right away
+        :param id: WsInterested ID
+        :param obj_in: WsInterestedUpdate schema or dict of fields
+        :param db: Optional SQLAlchemy session
+        :return: Updated WsInterestedRead schema, or None if it does not exist
+        """
+        update_data = obj_in.model_dump(exclude_unset=True) if isinstance(obj_in, BaseModel) else obj_in
+        if self.write_behind is None:
+            return super().update(id, obj_in, db=db)
+        if db is None and current_session() is None and update_data and set(update_data) <= self.WRITE_BEHIND_FIELDS:
+            current = self.write_behind.snapshot(id) or super().get_by_id(id)
+            if current is None:
+                return None
+            return self.write_behind.add(id, update_data, current)
+        # Not buffered: write what is pending first so updates keep their order
+        self.write_behind.flush()
+        return super().update(id, obj_in, db=db)
+
+    def delete(self, id: int, db: Optional[Session] = None) -> bool:
+        """Delete a weather station interest, dropping its buffered updates"""
+        if self.write_behind:
+            self.write_behind.discard(id)
+        return super().delete(id, db=db)
+
+    def get_by_id(self, id: int, db: Optional[Session] = None) -> Optional[WsInterestedRead]:
+        """Get a weather station interest by ID, including buffered updates"""
+        obj = super().get_by_id(id, db=db)
+        return self.write_behind.overlay(obj) if self.write_behind else obj
 
     def get_by_user(self, user_id: int, db: Optional[Session] = None) -> List[WsInterestedRead]:
         """
@@ -18,7 +90,7 @@ class WsInterestedService(BaseService[WsInterested, WsInterestedCreate, WsIntere
         """
         with self._session_scope(db) as session:
             objs = session.query(self.model).filter(self.model.user_id == user_id).all()
-            return [WsInterestedRead.model_validate(obj) for obj in objs]
+            return self._with_buffered([WsInterestedRead.model_validate(obj) for obj in objs])
 
     def get_by_ws_ext_id(self, ws_ext_id: str, db: Optional[Session] = None) -> List[WsInterestedRead]:
         """
@@ -29,17 +101,145 @@ class WsInterestedService(BaseService[WsInterested, WsInterestedCreate, WsIntere
         """
         with self._session_scope(db) as session:
             objs = session.query(self.model).filter(self.model.ws_ext_id == ws_ext_id).all()
-            return [WsInterestedRead.model_validate(obj) for obj in objs]
+            return self._with_buffered([WsInterestedRead.model_validate(obj) for obj in objs])
 
-    def get_all(self, db: Optional[Session] = None) -> List[WsInterestedRead]:
+    def get_all(self, db: Optional[Session] = None, spec: Optional[QuerySpec] = None) -> List[WsInterestedRead]:
         """
         Get all weather station interests
         :param db: Optional SQLAlchemy session
+        :param spec: Optional QuerySpec with filters, order_by and limit
         :return: List of WsInterestedRead schemas
         """
         with self._session_scope(db) as session:
-            objs = session.query(self.model).all()
-            return [WsInterestedRead.model_validate(obj) for obj in objs]
+            objs = self._fetch(session.query(self.model), spec, session)
+            return self._with_buffered([WsInterestedRead.model_validate(obj) for obj in objs])
+
+    def load_subscriber_index(self, batch_size: int = 10000, db: Optional[Session] = None) -> SubscriberIndex:
+        """
+        Bulk-load every subscription, with the enabled status of its user, and the IDs of the
+        disabled users into the station to subscriber index and install it as WsInterestedService.subscriber_index, typically at
+        startup. Calling it again rebuilds the installed index in place
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :param db: Optional SQLAlchemy session
+        :return: The SubscriberIndex
+        """
+        # Installed before reading so writes committed during the load are replayed on it
+        index = WsInterestedService.subscriber_index or SubscriberIndex()
+        WsInterestedService.subscriber_index = index
+        with self._session_scope(db) as session:
+            query = session.query(self.model.id, self.model.user_id, self.model.ws_ext_id, User.enable).outerjoin(
+                User, User.id == self.model.user_id
+            )
+            disabled = [id for (id,) in session.query(User.id).filter(User.enable == False).yield_per(batch_size)]
+            index.load(query.yield_per(batch_size), disabled)
+        return index
+
+    def poll_subscriber_index(self, since: datetime, batch_size: int = 10000, db: Optional[Session] = None) -> datetime:
+        """
+        Apply to the installed subscriber index the subscriptions and users changed, and the
+        subscriptions deleted (from their tombstones), since a timestamp, for writes made by
+        other processes
+        :param since: Timestamp of the previous poll (inclusive)
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :param db: Optional SQLAlchemy session
+        :return: Timestamp to pass to the next poll
+        """
+        index = WsInterestedService.subscriber_index
+        if index is None:
+            raise ValueError("The subscriber index is not loaded, call load_subscriber_index() first")
+        stamps = []
+        with self._session_scope(db) as session:
+            users = session.query(User.id, User.enable, User.updated).filter(User.updated >= since)
+            enabled = {}
+            for id, enable, updated in users.yield_per(batch_size):
+                enabled[id] = enable
+                stamps.append(updated)
+            subscriptions = session.query(self.model.id, self.model.user_id, self.model.ws_ext_id, self.model.updated).filter(
+                self.model.updated >= since
+            )
+            changed = list(subscriptions.yield_per(batch_size))
+        deleted = list(self.get_deleted_since(since, batch_size=batch_size, db=db))
+        # Deletions before the changes, in case a deleted id was given to a new subscription
+        for tombstone in deleted:
+            index.remove_subscription(tombstone.row_id)
+            stamps.append(tombstone.deleted_at)
+        # Users first, so subscriptions of newly disabled users are not indexed as enabled
+        index.set_users_enabled(enabled)
+        for id, user_id, ws_ext_id, updated in changed:
+            index.put_subscription(id, user_id, ws_ext_id)
+            stamps.append(updated)
+        return max((stamp for stamp in stamps if stamp is not None), default=since)
+
+    def validate_create_batch(self, objs_in: List[WsInterestedCreate], db: Optional[Session] = None) -> List[Optional[str]]:
+        """Batch validation used by bulk imports before bulk_create()"""
+        with self._session_scope(db) as session:
+            return WsInterestedValidator.create_validate_batch(session, objs_in)
+
+    def _with_buffered(self, objs: List[WsInterestedRead]) -> List[WsInterestedRead]:
+        """Apply the write-behind buffered updates, if any, to query results"""
+        return self.write_behind.overlay_all(objs) if self.write_behind else objs
+
+    def _stage_index(self, db: Session, method, *args):
+        """Apply a change to the subscriber index, if loaded, when the transaction commits"""
+        if self.subscriber_index is not None:
+            self.subscriber_index.stage(db, method, *args)
+
+    def _after_create(self, db_obj: WsInterested, db: Optional[Session] = None):
+        """Count and index the new subscription"""
+        self._stage_index(db, SubscriberIndex.put_subscription, db_obj.id, db_obj.user_id, db_obj.ws_ext_id)
+        if CounterService.enabled:
+            change = (inspect(db_obj).identity_token, None, (db_obj.user_id, db_obj.ws_ext_id))
+            CounterService.apply(db, count_subscription_changes(db, [change]))
+
+    def _after_bulk_create(self, rows: List[Dict[str, Any]], db: Optional[Session] = None):
+        """Count and index the imported subscriptions"""
+        if self.subscriber_index is not None:
+            # Generated IDs are not known after a bulk insert: index the imported users' subscriptions
+            user_ids = sorted({row["user_id"] for row in rows if row.get("user_id") is not None})
+            for chunk in chunked(user_ids, 500):
+                query = db.query(self.model.id, self.model.user_id, self.model.ws_ext_id).filter(self.model.user_id.in_(chunk))
+                for id, user_id, ws_ext_id in query:
+                    self._stage_index(db, SubscriberIndex.put_subscription, id, user_id, ws_ext_id)
+        if CounterService.enabled:
+            changes = [(row_shard(db, "ws_interested", row), None, (row.get("user_id"), row["ws_ext_id"])) for row in rows]
+            CounterService.apply(db, count_subscription_changes(db, changes))
+
+    def _after_update(self, db_obj: WsInterested, previous: Dict[str, Any], db: Optional[Session] = None):
+        """Move the count and index entry of a subscription that changed station or user"""
+        if SUBSCRIPTION_COUNTED_FIELDS & set(previous):
+            self._stage_index(db, SubscriberIndex.put_subscription, db_obj.id, db_obj.user_id, db_obj.ws_ext_id)
+        if CounterService.enabled and SUBSCRIPTION_COUNTED_FIELDS & set(previous):
+            new = (db_obj.user_id, db_obj.ws_ext_id)
+            old = (previous.get("user_id", db_obj.user_id), previous.get("ws_ext_id", db_obj.ws_ext_id))
+            change = (inspect(db_obj).identity_token, old, new)
+            CounterService.apply(db, count_subscription_changes(db, [change]))
+
+    def _after_delete(self, db_obj: WsInterested, db: Optional[Session] = None):
+        """Stop counting and indexing a deleted subscription"""
+        self._stage_index(db, SubscriberIndex.remove_subscription, db_obj.id)
+        if CounterService.enabled:
+            change = (inspect(db_obj).identity_token, (db_obj.user_id, db_obj.ws_ext_id), None)
+            CounterService.apply(db, count_subscription_changes(db, [change]))
+
+    def _before_bulk_update(self, changes: Dict[int, Dict[str, Any]], db: Optional[Session] = None):
+        """Move the counts of the subscriptions whose station or user change"""
+        if not CounterService.enabled:
+            return
+        ids = [id for id, values in changes.items() if SUBSCRIPTION_COUNTED_FIELDS & set(values)]
+        counted = []
+        for chunk in chunked(ids, 500):
+            query = db.query(self.model.id, self.model.user_id, self.model.ws_ext_id).filter(self.model.id.in_(chunk))
+            for id, user_id, ws_ext_id in query:
+                values = changes[id]
+                new = (values.get("user_id", user_id), values.get("ws_ext_id", ws_ext_id))
+                counted.append((id_shard(db, id), (user_id, ws_ext_id), new))
+        CounterService.apply(db, count_subscription_changes(db, counted))
+
+    def _after_bulk_update(self, rows: List[Dict[str, Any]], db: Optional[Session] = None):
+        """Move the index entries of the subscriptions whose station or user changed"""
+        for row in rows:
+            if SUBSCRIPTION_COUNTED_FIELDS & set(row):
+                self._stage_index(db, SubscriberIndex.put_subscription, row["id"], row.get("user_id"), row.get("ws_ext_id"))
 
     def _validate_create(self, obj_in: WsInterestedCreate, db: Optional[Session] = None):
         """Validation hook called automatically from BaseService.create()"""
@@ -0,0 +1,9 @@
+from .exporter import ExportStats, export_table
+from .importer import ImportStats, import_file
+
+__all__ = [
+    "ExportStats",
+    "export_table",
+    "ImportStats",
+    "import_file"
+]
@@ -0,0 +1,197 @@
+import enum
+import json
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from sqlalchemy import Boolean, DateTime, Integer
+from sqlalchemy.orm import Session
+from ..schemas.query_spec import QuerySpec
+from ..services.base_service import BaseService
+from .tables import get_service
+
+FORMATS = ("ndjson", "parquet", "arrow")
+NOTIFICATION_COLUMN = "notification"
+
+
+@dataclass
+class ExportStats:
+    """Progress and throughput of an export"""
+    table: str
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.table}: {self.rows} rows in {self.batches} batches, "
+                f"{self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s)")
+
+
+def export_table(
+    source: Union[str, BaseService],
+    path: str,
+    format: str = "ndjson",
+    filters: Optional[Dict[str, Any]] = None,
+    spec: Optional[QuerySpec] = None,
+    batch_size: int = 10000,
+    flatten_notification: bool = False,
+    notification_keys: Optional[List[str]] = None,
+    progress: Optional[Callable[[ExportStats], None]] = None,
+    db: Optional[Session] = None,
+) -> ExportStats:
+    """
+    Stream a table (or a filtered service query) to a file in fixed-size batches.
+    Rows go straight from the cursor to the writer, so memory stays constant.
+    :param source: Table name (apps, users, ws_interested) or a service instance
+    :param path: Output file path
+    :param format: ndjson, parquet or arrow (Arrow IPC file). parquet/arrow need pyarrow
+    :param filters: Equality filters, as in BaseService.get_all()
+    :param spec: QuerySpec with filters, order_by and limit, as in BaseService.stream_rows()
+    :param batch_size: Rows fetched and written per batch
+    :param flatten_notification: Expand the notification JSON column into notification.<key> columns
+    :param notification_keys: Keys to expand. When None they are discovered with an extra pass
+                              for parquet/arrow (columnar formats need a fixed schema)
+    :param progress: Callback receiving the ExportStats after each batch
+    :param db: Optional SQLAlchemy session
+    :return: ExportStats with rows written and rows per second
+    :raises ValueError: If the format or table is not valid
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Invalid format: {format}. Valid options are: {list(FORMATS)}")
+    service = get_service(source) if isinstance(source, str) else source
+    table = service.model.__table__
+    flatten = flatten_notification and NOTIFICATION_COLUMN in table.c
+
+    notification_types: Dict[str, type] = {}
+    if flatten and notification_keys is None and format != "ndjson":
+        notification_types = _discover_notification_keys(service, filters, spec, batch_size, db)
+        notification_keys = sorted(notification_types)
+
+    stats = ExportStats(table=table.name)
+    started = time.perf_counter()
+    writer = _NdjsonWriter(path) if format == "ndjson" else _ArrowWriter(
+        path, format, _arrow_schema(table, notification_keys if flatten else None, notification_types)
+    )
+    try:
+        for batch in service.stream_rows(filters=filters, batch_size=batch_size, db=db, spec=spec):
+            rows = [_prepare_row(row, flatten, notification_keys) for row in batch]
+            writer.write(rows)
+            stats.rows += len(rows)
+            stats.batches += 1
+            stats.seconds = time.perf_counter() - started
+            if progress:
+                progress(stats)
+    finally:
+        writer.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def _discover_notification_keys(service: BaseService, filters, spec, batch_size: int, db: Optional[Session]) -> Dict[str, type]:
+    """Collect the notification keys and the Python type of their values (object when mixed)"""
+    types: Dict[str, type] = {}
+    for batch in service.stream_rows(filters=filters, batch_size=batch_size, db=db, spec=spec):
+        for row in batch:
+            for key, value in (row.get(NOTIFICATION_COLUMN) or {}).items():
+                if value is None:
+                    types.setdefault(key, type(None))
+                elif types.get(key, type(None)) is type(None):
+                    types[key] = type(value)
+                elif types[key] is not type(value):
+                    types[key] = object
+    return types
+
+
+def _prepare_row(row: Dict[str, Any], flatten: bool, notification_keys: Optional[List[str]]) -> Dict[str, Any]:
+    for column, value in row.items():
+        if isinstance(value, enum.Enum):
+            row[column] = value.value
+    if flatten:
+        notification = row.pop(NOTIFICATION_COLUMN, None) or {}
+        keys = notification_keys if notification_keys is not None else sorted(notification)
+        for key in keys:
+            row[f"{NOTIFICATION_COLUMN}.{key}"] = notification.get(key)
+    return row
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _NdjsonWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: Iterable[Dict[str, Any]]):
+        self._file.writelines(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("pyarrow is required for parquet/arrow exports: pip install aclimate_v3_orm_frontend[export]")
+    return pyarrow
+
+
+def _arrow_schema(table, notification_keys: Optional[List[str]], notification_types: Dict[str, type]):
+    pa = _import_pyarrow()
+    scalar_types = {bool: pa.bool_(), int: pa.int64(), float: pa.float64(), str: pa.string()}
+    fields = []
+    for column in table.columns:
+        if column.name == NOTIFICATION_COLUMN and notification_keys is not None:
+            # Keys with mixed, nested or unknown value types are written as JSON text
+            fields.extend(
+                pa.field(f"{NOTIFICATION_COLUMN}.{key}", scalar_types.get(notification_types.get(key), pa.string()))
+                for key in notification_keys
+            )
+            continue
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+        else:
+            # String, Enum and JSON columns (JSON serialized as text)
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+class _ArrowWriter:
+    def __init__(self, path: str, format: str, schema):
+        pa = _import_pyarrow()
+        self._pa = pa
+        self._schema = schema
+        self._json_columns = [field.name for field in schema if field.type == pa.string() and (
+            field.name == NOTIFICATION_COLUMN or field.name.startswith(f"{NOTIFICATION_COLUMN}."))]
+        if format == "parquet":
+            self._writer = pa.parquet.ParquetWriter(path, schema)
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            for column in self._json_columns:
+                if row.get(column) is not None and not isinstance(row[column], str):
+                    row[column] = json.dumps(row[column], default=_json_default)
+        self._writer.write_batch(self._pa.RecordBatch.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+        if hasattr(self, "_sink"):
+            self._sink.close()
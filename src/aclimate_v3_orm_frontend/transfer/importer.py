@@ -0,0 +1,195 @@
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..services.base_service import BaseService
+from .tables import get_service
+
+FORMATS = ("csv", "ndjson")
+
+
+@dataclass
+class ImportStats:
+    """Progress and throughput of an import"""
+    table: str
+    resumed_from: int = 0
+    read: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def offset(self) -> int:
+        """Records of the source consumed so far, including the resumed ones"""
+        return self.resumed_from + self.read
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.table}: {self.inserted} inserted, {self.rejected} rejected in {self.chunks} chunks, "
+                f"offset {self.offset}, {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s)")
+
+
+def import_file(
+    target: Union[str, BaseService],
+    path: str,
+    format: Optional[str] = None,
+    chunk_size: int = 5000,
+    resume: bool = True,
+    checkpoint_path: Optional[str] = None,
+    rejects_path: Optional[str] = None,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+    db: Optional[Session] = None,
+) -> ImportStats:
+    """
+    Stream a CSV or NDJSON file into a table. Each chunk is parsed into the service
+    CreateSchema, validated with batched queries and loaded with bulk_create(), then
+    committed and checkpointed, so an interrupted import can resume where it stopped.
+    :param target: Table name (apps, users, ws_interested) or a service instance
+    :param path: Source file path
+    :param format: csv or ndjson. Inferred from the file extension when None
+    :param chunk_size: Records per chunk (and per transaction)
+    :param resume: Skip the records already committed according to the checkpoint file
+    :param checkpoint_path: Checkpoint file. Defaults to <path>.checkpoint.json
+    :param rejects_path: NDJSON side file for rejected records. Defaults to <path>.rejects.ndjson
+    :param progress: Callback receiving the ImportStats after each chunk
+    :param db: Optional SQLAlchemy session. It is committed after every chunk
+    :return: ImportStats
+    :raises ValueError: If the format or table is not valid
+    """
+    format = format or _infer_format(path)
+    if format not in FORMATS:
+        raise ValueError(f"Invalid format: {format}. Valid options are: {list(FORMATS)}")
+    service = get_service(target) if isinstance(target, str) else target
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+    rejects_path = rejects_path or f"{path}.rejects.ndjson"
+
+    start_offset = _read_checkpoint(checkpoint_path, path) if resume else 0
+    stats = ImportStats(table=service.model.__tablename__, resumed_from=start_offset)
+    started = time.perf_counter()
+
+    with open(path, newline="", encoding="utf-8") as source, \
+            open(rejects_path, "a" if resume else "w", encoding="utf-8") as rejects, \
+            _import_session(db) as session:
+        records = islice(_read_records(source, format), start_offset, None)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            _load_chunk(service, session, chunk, stats, rejects)
+            rejects.flush()
+            _write_checkpoint(checkpoint_path, path, stats.offset)
+            stats.seconds = time.perf_counter() - started
+            if progress:
+                progress(stats)
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def _load_chunk(service: BaseService, session: Session, chunk: List[Tuple[int, Any]], stats: ImportStats, rejects):
+    parsed: List[Tuple[int, Any, Any]] = []
+    for offset, record in chunk:
+        try:
+            parsed.append((offset, record, _parse_record(service, record)))
+        except (ValueError, ValidationError) as e:
+            _reject(rejects, stats, offset, record, e)
+    stats.read += len(chunk)
+    stats.chunks += 1
+
+    errors = service.validate_create_batch([obj for _, _, obj in parsed], db=session)
+    valid = []
+    for (offset, record, obj), error in zip(parsed, errors):
+        if error:
+            _reject(rejects, stats, offset, record, error)
+        else:
+            valid.append((offset, record, obj))
+
+    # bulk_create() commits the session, so every chunk is its own transaction
+    try:
+        stats.inserted += service.bulk_create([obj for _, _, obj in valid], db=session)
+    except SQLAlchemyError:
+        # Something the validators cannot see (e.g. a foreign key) failed: isolate it row by row
+        for offset, record, obj in valid:
+            try:
+                stats.inserted += service.bulk_create([obj], db=session)
+            except SQLAlchemyError as e:
+                _reject(rejects, stats, offset, record, getattr(e, "orig", None) or e)
+
+
+def _parse_record(service: BaseService, record: Any):
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a JSON object")
+    if isinstance(record.get("notification"), str):
+        record = {**record, "notification": json.loads(record["notification"])}
+    return service.create_schema.model_validate(record)
+
+
+def _reject(rejects, stats: ImportStats, offset: int, record: Any, error: Any):
+    stats.rejected += 1
+    rejects.write(json.dumps({"offset": offset, "record": record, "error": str(error)}, default=str) + "\n")
+
+
+def _read_records(source, format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (offset, record) where offset is the 0-based index of the record in the file.
+    NDJSON lines that are not valid JSON are yielded as the raw string and rejected later
+    """
+    if format == "csv":
+        for offset, row in enumerate(csv.DictReader(source)):
+            # Empty cells are treated as missing so schema defaults apply
+            yield offset, {key: value for key, value in row.items() if value not in ("", None)}
+        return
+    offset = 0
+    for line in source:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = line.rstrip("\n")
+        yield offset, record
+        offset += 1
+
+
+def _infer_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    return {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(extension, extension.lstrip("."))
+
+
+def _read_checkpoint(checkpoint_path: str, path: str) -> int:
+    if not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != os.path.abspath(path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('source')}, not {path}")
+    return int(checkpoint["offset"])
+
+
+def _write_checkpoint(checkpoint_path: str, path: str, offset: int):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(path), "offset": offset}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+@contextmanager
+def _import_session(db: Optional[Session]):
+    """Use the caller's session, or open one with get_db() for the whole import"""
+    if db is not None:
+        yield db
+    else:
+        with get_db() as session:
+            yield session
@@ -0,0 +1,23 @@
+from typing import Dict, Type
+from ..services.base_service import BaseService
+from ..services.app_service import AppService
+from ..services.user_service import UserService
+from ..services.ws_interested_service import WsInterestedService
+
+SERVICES_BY_TABLE: Dict[str, Type[BaseService]] = {
+    "apps": AppService,
+    "users": UserService,
+    "ws_interested": WsInterestedService,
+}
+
+
+def get_service(table: str) -> BaseService:
+    """
+    Return a service instance for a table name
+    :param table: Table name (apps, users or ws_interested)
+    :raises ValueError: If the table is not managed by this package
+    """
+    try:
+        return SERVICES_BY_TABLE[table]()
+    except KeyError:
+        raise ValueError(f"Invalid table: {table}. Valid options are: {list(SERVICES_BY_TABLE)}")
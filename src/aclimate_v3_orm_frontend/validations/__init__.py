@@ -1,9 +1,22 @@
-from .app_validator import AppValidator
-from .user_validator import UserValidator
-from .ws_interested_validator import WsInterestedValidator
+from typing import TYPE_CHECKING
+from .._lazy import lazy_exports
+
+# Validators are imported on first access (PEP 562)
+_EXPORTS = {
+    "AppValidator": ".app_validator",
+    "UserValidator": ".user_validator",
+    "WsInterestedValidator": ".ws_interested_validator",
+}
 
 __all__ = [
     "AppValidator",
     "UserValidator",
     "WsInterestedValidator"
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .app_validator import AppValidator
+    from .user_validator import UserValidator
+    from .ws_interested_validator import WsInterestedValidator
@@ -1,4 +1,6 @@
+from typing import List, Optional
 from sqlalchemy.orm import Session
+from .batch import existing_combinations
 from ..models.app import App
 from ..schemas.app_schema import AppCreate, AppUpdate
 
@@ -63,4 +65,26 @@ class AppValidator:
             if current_app:
                 AppValidator.validate_unique_name_country_combination(
                     db, current_app.name, obj_in.country_ext_id, exclude_id=app_id
-                )
\ No newline at end of file
+                )
+
+    @staticmethod
+    def create_validate_batch(db: Session, objs_in: List[AppCreate]) -> List[Optional[str]]:
+        """Validation for bulk app creation. Returns an error message per object (None when valid)"""
+        errors = []
+        seen = set()
+        for obj_in in objs_in:
+            try:
+                AppValidator.validate_name(obj_in.name)
+                AppValidator.validate_country_ext_id(obj_in.country_ext_id)
+                if (obj_in.name, obj_in.country_ext_id) in seen:
+                    raise ValueError(f"Duplicated app with name '{obj_in.name}' for country '{obj_in.country_ext_id}' in the same batch")
+                seen.add((obj_in.name, obj_in.country_ext_id))
+                errors.append(None)
+            except ValueError as e:
+                errors.append(str(e))
+
+        existing = existing_combinations(db, App.name, App.country_ext_id, seen)
+        for i, obj_in in enumerate(objs_in):
+            if errors[i] is None and (obj_in.name, obj_in.country_ext_id) in existing:
+                errors[i] = f"An app with name '{obj_in.name}' already exists for country '{obj_in.country_ext_id}'"
+        return errors
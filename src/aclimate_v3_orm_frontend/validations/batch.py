@@ -0,0 +1,19 @@
+from typing import Any, Iterable, Set, Tuple
+from sqlalchemy.orm import Session
+
+CHUNK_SIZE = 500
+
+
+def existing_combinations(db: Session, first_column, second_column, keys: Iterable[Tuple[Any, Any]]) -> Set[Tuple[Any, Any]]:
+    """
+    Return which (first, second) combinations already exist in the database,
+    querying by chunks of the first column to keep the number of bound parameters low
+    """
+    keys = set(keys)
+    firsts = sorted({first for first, _ in keys})
+    existing = set()
+    for start in range(0, len(firsts), CHUNK_SIZE):
+        chunk = firsts[start:start + CHUNK_SIZE]
+        rows = db.query(first_column, second_column).filter(first_column.in_(chunk)).all()
+        existing.update(key for key in ((row[0], row[1]) for row in rows) if key in keys)
+    return existing
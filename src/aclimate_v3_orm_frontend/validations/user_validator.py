@@ -1,4 +1,6 @@
+from typing import List, Optional
 from sqlalchemy.orm import Session
+from .batch import existing_combinations
 from ..models.user import User
 from ..schemas.user_schema import UserCreate, UserUpdate
 from ..enums.profile_type import ProfileType
@@ -72,4 +74,27 @@ class UserValidator:
             if current_user:
                 UserValidator.validate_unique_keycloak_app_combination(
                     db, current_user.ext_key_clock_id, obj_in.app_id, exclude_id=user_id
-                )
\ No newline at end of file
+                )
+
+    @staticmethod
+    def create_validate_batch(db: Session, objs_in: List[UserCreate]) -> List[Optional[str]]:
+        """Validation for bulk user creation. Returns an error message per object (None when valid)"""
+        errors = []
+        seen = set()
+        for obj_in in objs_in:
+            try:
+                UserValidator.validate_ext_key_clock_id(obj_in.ext_key_clock_id)
+                UserValidator.validate_profile(obj_in.profile)
+                UserValidator.validate_app_id(obj_in.app_id)
+                if (obj_in.ext_key_clock_id, obj_in.app_id) in seen:
+                    raise ValueError(f"Duplicated user with ext_key_clock_id '{obj_in.ext_key_clock_id}' for app '{obj_in.app_id}' in the same batch")
+                seen.add((obj_in.ext_key_clock_id, obj_in.app_id))
+                errors.append(None)
+            except ValueError as e:
+                errors.append(str(e))
+
+        existing = existing_combinations(db, User.ext_key_clock_id, User.app_id, seen)
+        for i, obj_in in enumerate(objs_in):
+            if errors[i] is None and (obj_in.ext_key_clock_id, obj_in.app_id) in existing:
+                errors[i] = f"A user with ext_key_clock_id '{obj_in.ext_key_clock_id}' already exists for app '{obj_in.app_id}'"
+        return errors
@@ -1,4 +1,6 @@
+from typing import List, Optional
 from sqlalchemy.orm import Session
+from .batch import existing_combinations
 from ..models.ws_interested import WsInterested
 from ..schemas.ws_interested_schema import WsInterestedCreate, WsInterestedUpdate
 
@@ -62,4 +64,27 @@ class WsInterestedValidator:
             hasattr(obj_in, 'ws_ext_id') and obj_in.ws_ext_id is not None):
             WsInterestedValidator.validate_unique_user_ws_combination(
                 db, obj_in.user_id, obj_in.ws_ext_id, exclude_id=ws_interested_id
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    def create_validate_batch(db: Session, objs_in: List[WsInterestedCreate]) -> List[Optional[str]]:
+        """Validation for bulk ws_interested creation. Returns an error message per object (None when valid)"""
+        errors = []
+        seen = set()
+        for obj_in in objs_in:
+            try:
+                WsInterestedValidator.validate_user_id(obj_in.user_id)
+                WsInterestedValidator.validate_ws_ext_id(obj_in.ws_ext_id)
+                WsInterestedValidator.validate_notification(obj_in.notification)
+                if (obj_in.user_id, obj_in.ws_ext_id) in seen:
+                    raise ValueError(f"User {obj_in.user_id} is interested in weather station '{obj_in.ws_ext_id}' more than once in the same batch")
+                seen.add((obj_in.user_id, obj_in.ws_ext_id))
+                errors.append(None)
+            except ValueError as e:
+                errors.append(str(e))
+
+        existing = existing_combinations(db, WsInterested.user_id, WsInterested.ws_ext_id, seen)
+        for i, obj_in in enumerate(objs_in):
+            if errors[i] is None and (obj_in.user_id, obj_in.ws_ext_id) in existing:
+                errors[i] = f"User {obj_in.user_id} is already interested in weather station '{obj_in.ws_ext_id}'"
+        return errors
@@ -2,6 +2,7 @@
 import sys
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
@@ -13,6 +14,30 @@ import pytest
 def engine():
     return create_engine("sqlite:///:memory:")
 
+@pytest.fixture
+def db_session():
+    """Session bound to a fresh in-memory SQLite database with all tables created"""
+    from aclimate_v3_orm_frontend.database.base import Base
+    import aclimate_v3_orm_frontend.models  # noqa: F401  (registers the models on Base)
+
+    test_engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=test_engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)()
+    yield session
+    session.close()
+    test_engine.dispose()
+
+@pytest.fixture
+def file_session_factory(tmp_path):
+    """Session factory on a SQLite file, so several threads and sessions see the same data"""
+    from aclimate_v3_orm_frontend.database.base import Base
+    import aclimate_v3_orm_frontend.models  # noqa: F401  (registers the models on Base)
+
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+    file_engine.dispose()
+
 @pytest.fixture
 def sample_app_data():
     """Sample app data for testing"""
@@ -3,6 +3,9 @@ from unittest.mock import Mock, MagicMock, patch
 from aclimate_v3_orm_frontend.services.app_service import AppService
 from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
 from aclimate_v3_orm_frontend.validations.app_validator import AppValidator
+from aclimate_v3_orm_frontend.cache.query_cache import QueryCache, table_versions
+from aclimate_v3_orm_frontend.database.search import create_search_index
+from sqlalchemy import event, text
 
 class TestAppService:
     
@@ -47,27 +50,15 @@ class TestAppService:
         mock_query.filter.assert_called_once()
         mock_validate.assert_called_once_with(mock_app)
         
-    @patch('aclimate_v3_orm_frontend.schemas.app_schema.AppRead.model_validate')
-    def test_search_by_name_uses_ilike(self, mock_validate):
-        """Test search_by_name uses partial matching"""
-        # Arrange
-        mock_validate.return_value = {"id": 1, "name": "Test App", "country_ext_id": "CO", "enable": True}
-        
-        mock_session = Mock()
-        mock_query = Mock()
-        mock_session.query.return_value = mock_query
-        mock_query.filter.return_value.all.return_value = []
-        
-        self.app_service._session_scope = MagicMock()
-        self.app_service._session_scope.return_value.__enter__.return_value = mock_session
-        
-        # Act
-        result = self.app_service.search_by_name("Test", db=self.mock_db)
-        
-        # Assert
-        mock_session.query.assert_called_once()
-        mock_query.filter.assert_called_once()
-        assert isinstance(result, list)
+    def test_search_by_name_uses_ilike(self, db_session):
+        """Test search_by_name falls back to partial ILIKE matching without a search index"""
+        for name in ("My Test App", "Test App", "Other"):
+            self.app_service.create(AppCreate(name=name, country_ext_id="CO"), db=db_session)
+
+        result = self.app_service.search_by_name("test", db=db_session)
+
+        assert [app.name for app in result] == ["Test App", "My Test App"]
+        assert [app.name for app in self.app_service.search_by_name("app", db=db_session, limit=1)] == ["My Test App"]
 
 class TestAppValidator:
     
@@ -105,4 +96,130 @@ class TestAppValidator:
         )
         
         # Should not raise any exception
-        AppValidator.create_validate(mock_db, app_create)
\ No newline at end of file
+        AppValidator.create_validate(mock_db, app_create)
+
+class TestQueryCache:
+
+    def test_entry_is_stale_after_table_write(self):
+        """Test that bumping a table version invalidates results read from it"""
+        cache = QueryCache()
+        versions = table_versions.snapshot(("apps",))
+        cache.put("key", ["row"], versions)
+
+        assert cache.lookup("key") == (True, ["row"])
+        table_versions.bump("apps")
+        assert cache.lookup("key") == (False, None)
+        assert cache.stats()["stale"] == 1
+
+    def test_put_with_outdated_versions_is_ignored(self):
+        """Test that a load racing with a write is not cached"""
+        cache = QueryCache()
+        versions = table_versions.snapshot(("apps",))
+        table_versions.bump("apps")
+
+        assert cache.put("key", ["row"], versions) is False
+
+    def test_size_limits(self):
+        """Test that maxsize and max_rows bound the cache"""
+        cache = QueryCache(maxsize=2, max_rows=3)
+        versions = table_versions.snapshot(("apps",))
+        cache.put("a", [1], versions)
+        cache.put("b", [1], versions)
+        cache.put("c", [1, 2], versions)
+
+        assert cache.lookup("a") == (False, None)
+        assert cache.lookup("b") == (True, [1])
+        assert cache.put("d", [1, 2, 3, 4], versions) is False
+        assert cache.stats()["rows"] == 3
+
+
+class TestAppServiceQueryCache:
+
+    def setup_method(self):
+        """Setup for each test method"""
+        self.app_service = AppService()
+        self.app_service.query_cache = QueryCache()
+
+    def test_repeated_call_is_served_from_cache(self, db_session):
+        """Test that the second call does not query the database"""
+        self.app_service.create(AppCreate(name="App", country_ext_id="CO"), db=db_session)
+
+        first = self.app_service.get_by_country_ext_id("CO", db=db_session)
+        with patch.object(self.app_service, "_session_scope") as mock_scope:
+            second = self.app_service.get_by_country_ext_id("CO", db=db_session)
+
+        assert [app.name for app in second] == [app.name for app in first]
+        mock_scope.assert_not_called()
+        assert self.app_service.query_cache.stats()["hit_rate"] == 0.5
+
+    @pytest.mark.parametrize("write", ["create", "bulk_create", "update", "bulk_update", "delete"])
+    def test_writes_invalidate_cached_lists(self, db_session, write):
+        """Test that every write path invalidates the cached results of the table"""
+        app = self.app_service.create(AppCreate(name="App", country_ext_id="CO"), db=db_session)
+        assert len(self.app_service.get_all(db=db_session)) == 1
+
+        if write == "create":
+            self.app_service.create(AppCreate(name="Other", country_ext_id="CO"), db=db_session)
+        elif write == "bulk_create":
+            self.app_service.bulk_create([AppCreate(name="Other", country_ext_id="CO")], db=db_session)
+        elif write == "update":
+            self.app_service.update(app.id, {"name": "Renamed"}, db=db_session)
+        elif write == "bulk_update":
+            self.app_service.bulk_update({app.id: {"name": "Renamed"}}, db=db_session)
+        else:
+            self.app_service.delete(app.id, db=db_session)
+
+        expected = {"create": 2, "bulk_create": 2, "update": 1, "bulk_update": 1, "delete": 0}[write]
+        apps = self.app_service.get_all(db=db_session)
+        assert len(apps) == expected
+        if write in ("update", "bulk_update"):
+            assert apps[0].name == "Renamed"
+
+    def test_results_with_uncommitted_writes_are_not_cached(self, db_session, file_session_factory):
+        """Test that reads inside a unit of work with pending writes are not shared"""
+        from aclimate_v3_orm_frontend.database.unit_of_work import unit_of_work
+
+        with unit_of_work(file_session_factory):
+            self.app_service.create(AppCreate(name="Pending", country_ext_id="CO"))
+            assert len(self.app_service.get_all()) == 1
+            assert len(self.app_service.query_cache) == 0
+
+
+class TestAppNameSearch:
+
+    @pytest.fixture
+    def indexed_session(self, db_session):
+        assert create_search_index(db_session.get_bind())
+        service = AppService()
+        for name in ("Aclimate Colombia", "Colombia Agro", "Peru", "Clima Col", "Colombiana"):
+            service.create(AppCreate(name=name, country_ext_id="CO"), db=db_session)
+        return db_session
+
+    def test_indexed_search_ranks_and_limits(self, indexed_session):
+        """Test that the FTS5 trigram index serves the search, prefix matches first"""
+        statements = []
+        event.listen(indexed_session.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        result = AppService().search_by_name("colomb", db=indexed_session, limit=3)
+
+        # Names starting with the term come first, each group ordered by bm25 rank
+        assert {app.name for app in result[:2]} == {"Colombia Agro", "Colombiana"}
+        assert result[2].name == "Aclimate Colombia"
+        assert any("MATCH" in statement for statement in statements)
+
+    def test_index_follows_updates_and_deletes(self, indexed_session):
+        """Test that the triggers keep the index in sync with apps"""
+        service = AppService()
+        peru = service.search_by_name("peru", db=indexed_session)[0]
+
+        service.update(peru.id, {"name": "Peru Colombia"}, db=indexed_session)
+        indexed_session.execute(text("DELETE FROM apps WHERE name = 'Clima Col'"))
+
+        assert [app.name for app in service.search_by_name("peru", db=indexed_session)] == ["Peru Colombia"]
+        assert "Peru Colombia" in [app.name for app in service.search_by_name("lombia", db=indexed_session)]
+        assert service.search_by_name("clima c", db=indexed_session) == []
+
+    def test_short_terms_fall_back_to_ilike(self, indexed_session):
+        """Test that terms shorter than a trigram still match"""
+        assert [app.name for app in AppService().search_by_name("pe", db=indexed_session)] == ["Peru"]
@@ -0,0 +1,173 @@
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.schemas.query_spec import QuerySpec
+from aclimate_v3_orm_frontend.schemas.ws_interested_schema import WsInterestedCreate
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+
+
+@pytest.fixture
+def users(db_session):
+    """Two apps with three users each"""
+    apps = [AppService().create(AppCreate(name=f"App {i}", country_ext_id="1"), db=db_session) for i in range(2)]
+    return [
+        UserService().create(
+            UserCreate(ext_key_clock_id=f"kc_{app.id}_{j}", app_id=app.id, profile=ProfileType.FARMER, enable=j != 2),
+            db=db_session
+        )
+        for app in apps for j in range(3)
+    ]
+
+
+@contextmanager
+def count_selects(db_session):
+    """Collect the SQL statements executed on the session's engine inside the block"""
+    statements = []
+    bind = db_session.get_bind()
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", record)
+
+
+class TestMultiKeyLookups:
+
+    def test_get_by_ids_reports_found_and_missing(self, db_session, users):
+        """Test that results are keyed by id and unknown ids are reported"""
+        ids = [users[0].id, 999, users[3].id, users[0].id]
+
+        result = UserService().get_by_ids(ids, db=db_session)
+
+        assert set(result.found) == {users[0].id, users[3].id}
+        assert result.found[users[3].id].ext_key_clock_id == users[3].ext_key_clock_id
+        assert result.missing == [999]
+
+    def test_get_by_ids_issues_one_query_per_chunk(self, db_session, users):
+        """Test chunked IN queries"""
+        with count_selects(db_session) as statements:
+            result = UserService().get_by_ids([u.id for u in users] + list(range(100, 110)), db=db_session, chunk_size=4)
+
+        assert len(result.found) == 6 and len(result.missing) == 10
+        assert len([s for s in statements if s.startswith("SELECT")]) == 4
+
+    def test_get_many_by_groups_rows_by_value(self, db_session, users):
+        """Test get_many_by with an additional equality filter"""
+        app_ids = sorted({u.app_id for u in users})
+
+        result = UserService().get_many_by("app_id", app_ids + [999], db=db_session, filters={"enable": True})
+
+        assert {key: len(value) for key, value in result.found.items()} == {app_ids[0]: 2, app_ids[1]: 2}
+        assert result.missing == [999]
+
+    def test_get_many_by_invalid_field_raises_error(self, db_session):
+        """Test that only model columns can be used"""
+        with pytest.raises(ValueError, match="Invalid field"):
+            UserService().get_many_by("password", ["x"], db=db_session)
+
+
+class TestChangeFeed:
+
+    def test_get_changed_since_pages_in_updated_id_order(self, db_session, users):
+        """Test keyset pagination over (updated, id), including disabled rows"""
+        service = UserService()
+        first = users[0]
+
+        changed = list(service.get_changed_since(first.updated_at, batch_size=2, db=db_session))
+
+        assert [u.id for u in changed] == [u.id for u in users]
+        assert any(not u.enable for u in changed)
+
+    def test_get_changed_since_resumes_after_cursor(self, db_session, users):
+        """Test that a consumer only receives rows changed after its last position"""
+        service = UserService()
+        changed = list(service.get_changed_since(users[0].updated_at, db=db_session))
+        last = changed[-1]
+
+        assert list(service.get_changed_since(last.updated_at, cursor=last.id, db=db_session)) == []
+
+        service.delete(users[1].id, db=db_session)
+        resumed = list(service.get_changed_since(last.updated_at, cursor=last.id, db=db_session))
+
+        assert [u.id for u in resumed] == [users[1].id]
+        assert resumed[0].enable is False
+
+    def test_hard_deletes_are_reported_by_get_deleted_since(self, db_session, users):
+        """Test tombstones of hard-deleted subscriptions, resumed with a cursor and purged"""
+        service = WsInterestedService()
+        subscriptions = [
+            service.create(WsInterestedCreate(user_id=users[0].id, ws_ext_id=f"ws_{i}", notification={"daily": True}), db=db_session)
+            for i in range(3)
+        ]
+        since = subscriptions[0].updated_at
+
+        service.delete(subscriptions[0].id, db=db_session)
+        service.delete(subscriptions[2].id, db=db_session)
+        deleted = list(service.get_deleted_since(since, batch_size=1, db=db_session))
+
+        assert [t.row_id for t in deleted] == [subscriptions[0].id, subscriptions[2].id]
+        assert {s.id for s in service.get_changed_since(since, db=db_session)} == {subscriptions[1].id}
+        assert list(service.get_deleted_since(deleted[-1].deleted_at, cursor=deleted[-1].row_id, db=db_session)) == []
+        # Soft deletes stay in get_changed_since and leave no tombstone
+        assert list(UserService().get_deleted_since(since, db=db_session)) == []
+
+        assert service.purge_deleted(deleted[-1].deleted_at, db=db_session) == 1
+        assert [t.row_id for t in service.get_deleted_since(since, db=db_session)] == [subscriptions[2].id]
+
+
+class TestQuerySpec:
+
+    def test_filters_order_and_limit_compile_to_sql(self, db_session, users):
+        """Test in, ilike, order_by and limit on get_all"""
+        spec = QuerySpec(
+            filters=[{"field": "app_id", "op": "in", "value": [users[0].app_id]},
+                     {"field": "ext_key_clock_id", "op": "ilike", "value": "KC_%"}],
+            order_by=["-id"],
+            limit=2,
+        )
+        with count_selects(db_session) as statements:
+            result = UserService().get_all(db=db_session, spec=spec)
+
+        assert [u.id for u in result] == [users[1].id, users[0].id]
+        assert " IN " in statements[-1] and "LIMIT" in statements[-1] and "ORDER BY users.id DESC" in statements[-1]
+
+    def test_ranges_null_checks_and_offset(self, db_session, users):
+        """Test between, is_null and offset, with ISO timestamps as values"""
+        service = UserService()
+        since = users[2].registered_at.isoformat()
+        spec = QuerySpec(filters=[{"field": "register", "op": "gte", "value": since},
+                                  {"field": "app_id", "op": "is_null", "value": False},
+                                  {"field": "id", "op": "between", "value": [users[0].id, users[4].id]}],
+                         order_by=["id"], offset=1)
+
+        # users[2] is disabled: get_all() only returns enabled users, count() has no implicit filter
+        assert [u.id for u in service.get_all(db=db_session, spec=spec)] == [users[4].id]
+        assert service.count(spec=spec, db=db_session) == 3
+        assert service.count(filters={"enable": False}, db=db_session) == 2
+
+    def test_stream_rows_accepts_a_spec(self, db_session, users):
+        """Test that stream_rows applies filters, order and limit"""
+        spec = QuerySpec(filters=[{"field": "profile", "op": "eq", "value": "FARMER"}], order_by=["-ext_key_clock_id"], limit=3)
+
+        batches = list(UserService().stream_rows(batch_size=2, db=db_session, spec=spec))
+
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert [row["ext_key_clock_id"] for batch in batches for row in batch] == ["kc_2_2", "kc_2_1", "kc_2_0"]
+
+    def test_unknown_fields_and_bad_values_are_rejected(self, db_session):
+        """Test field whitelist and value validation"""
+        with pytest.raises(ValueError, match="Invalid field: notification"):
+            UserService().get_all(db=db_session, spec=QuerySpec(order_by=["notification"]))
+        with pytest.raises(ValueError, match="in needs a list"):
+            QuerySpec(filters=[{"field": "app_id", "op": "in", "value": 1}])
+        with pytest.raises(ValueError, match="Invalid field: ext_key_clock_id"):
+            AppService().count(spec=QuerySpec(filters=[{"field": "ext_key_clock_id", "op": "is_null", "value": True}]), db=db_session)
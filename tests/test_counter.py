@@ -0,0 +1,133 @@
+import pytest
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.models.counter import Counter
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.schemas.ws_interested_schema import WsInterestedCreate
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.counter_service import CounterService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+
+
+class TestCounterService:
+
+    def setup_method(self):
+        """Setup for each test method"""
+        CounterService.enable()
+        self.counter_service = CounterService()
+        self.user_service = UserService()
+        self.ws_service = WsInterestedService()
+
+    def teardown_method(self):
+        CounterService.enable(False)
+
+    def _seed(self, db_session):
+        self.app = AppService().create(AppCreate(name="Test App", country_ext_id="CO"), db=db_session)
+        self.farmer = self.user_service.create(
+            UserCreate(ext_key_clock_id="farmer", app_id=self.app.id, profile=ProfileType.FARMER), db=db_session
+        )
+        self.technician = self.user_service.create(
+            UserCreate(ext_key_clock_id="technician", app_id=self.app.id, profile=ProfileType.TECHNICIAN), db=db_session
+        )
+        self.subscriptions = [
+            self.ws_service.create(WsInterestedCreate(user_id=user.id, ws_ext_id="ws_1", notification={"daily": True}), db=db_session)
+            for user in (self.farmer, self.technician)
+        ]
+
+    def _snapshot(self, db_session):
+        return {(c.name, c.key): c.value for c in db_session.query(Counter).all() if c.value}
+
+    def test_create_increments_counters(self, db_session):
+        """Test that creating users and subscriptions maintains the counters"""
+        self._seed(db_session)
+
+        assert self.counter_service.ws_subscribers("ws_1", db=db_session) == 2
+        assert self.counter_service.app_profile_users(self.app.id, "FARMER", db=db_session) == 1
+        assert self.counter_service.app_profile_users(self.app.id, db=db_session) == 2
+
+    def test_disabling_a_user_removes_its_subscriptions(self, db_session):
+        """Test soft delete and re-enable of a user"""
+        self._seed(db_session)
+
+        self.user_service.delete(self.farmer.id, db=db_session)
+        self.user_service.delete(self.farmer.id, db=db_session)
+        assert self.counter_service.ws_subscribers("ws_1", db=db_session) == 1
+        assert self.counter_service.app_profile_users(self.app.id, "FARMER", db=db_session) == 0
+
+        self.user_service.update(self.farmer.id, {"enable": True}, db=db_session)
+        assert self.counter_service.ws_subscribers("ws_1", db=db_session) == 2
+
+    def test_updates_move_counts(self, db_session):
+        """Test updates of profile, ws_ext_id and deletion of a subscription"""
+        self._seed(db_session)
+
+        self.user_service.update(self.farmer.id, {"profile": ProfileType.TECHNICIAN}, db=db_session)
+        self.ws_service.update(self.subscriptions[0].id, {"ws_ext_id": "ws_2"}, db=db_session)
+        self.ws_service.delete(self.subscriptions[1].id, db=db_session)
+
+        assert self.counter_service.app_profile_users(self.app.id, "TECHNICIAN", db=db_session) == 2
+        assert self.counter_service.get_values("ws_subscribers", ["ws_1", "ws_2"], db=db_session) == {"ws_1": 0, "ws_2": 1}
+
+    def test_bulk_paths_maintain_counters(self, db_session):
+        """Test bulk_create and bulk_update"""
+        self._seed(db_session)
+        self.user_service.bulk_create([
+            UserCreate(ext_key_clock_id=f"bulk_{i}", app_id=self.app.id, profile=ProfileType.FARMER) for i in range(3)
+        ], db=db_session)
+        self.ws_service.bulk_create([
+            WsInterestedCreate(user_id=self.farmer.id, ws_ext_id="ws_3", notification={"daily": True})
+        ], db=db_session)
+        self.user_service.bulk_update({self.farmer.id: {"enable": False}}, db=db_session)
+        self.ws_service.bulk_update({self.subscriptions[1].id: {"ws_ext_id": "ws_3"}}, db=db_session)
+
+        assert self.counter_service.app_profile_users(self.app.id, "FARMER", db=db_session) == 3
+        assert self.counter_service.get_values("ws_subscribers", ["ws_1", "ws_3"], db=db_session) == {"ws_1": 0, "ws_3": 1}
+
+    def test_rebuild_matches_maintained_counters(self, db_session):
+        """Test that rebuild recomputes the same values and fixes drift"""
+        self._seed(db_session)
+        self.user_service.delete(self.technician.id, db=db_session)
+        maintained = self._snapshot(db_session)
+        db_session.query(Counter).update({"value": 99})
+        db_session.commit()
+
+        written = self.counter_service.rebuild(db=db_session)
+
+        assert self._snapshot(db_session) == maintained
+        assert written == {"ws_subscribers": 1, "app_profile_users": 1}
+
+    def test_invalid_profile_raises_error(self, db_session):
+        """Test that an unknown profile is rejected"""
+        with pytest.raises(ValueError, match="Invalid profile type"):
+            self.counter_service.app_profile_users(1, "ADMIN", db=db_session)
+
+    def test_disabled_maintenance_does_not_write(self, db_session):
+        """Test that counters are only maintained when enabled"""
+        CounterService.enable(False)
+        self._seed(db_session)
+
+        assert db_session.query(Counter).count() == 0
+
+    def test_generic_id_based_api_is_rejected(self, db_session):
+        """Test that counters can only be written with apply() and rebuild() and emit no events"""
+        from aclimate_v3_orm_frontend.services.base_service import BaseService
+
+        calls = [
+            lambda: self.counter_service.get_by_id(1, db=db_session),
+            lambda: self.counter_service.get_by_ids([1], db=db_session),
+            lambda: self.counter_service.create(None, db=db_session),
+            lambda: self.counter_service.bulk_create([], db=db_session),
+            lambda: self.counter_service.update(1, {"value": 2}, db=db_session),
+            lambda: self.counter_service.bulk_update({1: {"value": 2}}, db=db_session),
+            lambda: self.counter_service.delete(1, db=db_session),
+        ]
+        for call in calls:
+            with pytest.raises(ValueError, match="CounterService does not support"):
+                call()
+
+        BaseService.emit_events = True
+        try:
+            assert CounterService.emit_events is False
+        finally:
+            BaseService.emit_events = False
@@ -0,0 +1,212 @@
+import asyncio
+import threading
+from functools import partial
+import pytest
+from sqlalchemy import event, text
+from aclimate_v3_orm_frontend.database import ScopedSession, get_scoped_db, remove_scoped_db
+from aclimate_v3_orm_frontend.database.concurrency import run_concurrent_reads
+from aclimate_v3_orm_frontend.database.unit_of_work import (
+    UnitOfWorkAbortedError, UnitOfWorkMiddleware, current_session, unit_of_work
+)
+from aclimate_v3_orm_frontend.database.timeouts import StatementTimeoutError, deadline
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.schemas.ws_interested_schema import WsInterestedCreate
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+
+
+class TestScopedSession:
+
+    def test_same_thread_gets_same_session_until_removed(self):
+        """Test the per-thread lifecycle of the scoped registry"""
+        with get_scoped_db() as first, get_scoped_db() as second:
+            assert first is second
+        remove_scoped_db()
+        with get_scoped_db() as third:
+            assert third is not first
+        remove_scoped_db()
+
+    def test_other_threads_get_their_own_session(self):
+        """Test that sessions are not shared across threads"""
+        sessions = []
+        thread = threading.Thread(target=lambda: (sessions.append(ScopedSession()), remove_scoped_db()))
+        thread.start()
+        thread.join()
+
+        assert sessions[0] is not ScopedSession()
+        remove_scoped_db()
+
+
+class TestRunConcurrentReads:
+
+    def test_results_are_gathered_in_order(self, file_session_factory):
+        """Test fan-out of independent service reads"""
+        with file_session_factory() as session:
+            apps = [AppService().create(AppCreate(name=f"App {i}", country_ext_id="1"), db=session) for i in range(4)]
+            for app in apps:
+                for j in range(app.id):
+                    UserService().create(
+                        UserCreate(ext_key_clock_id=f"kc_{j}", app_id=app.id, profile=ProfileType.FARMER), db=session
+                    )
+        user_service = UserService()
+
+        results = run_concurrent_reads(
+            [partial(user_service.get_by_app, app.id) for app in apps],
+            max_workers=2,
+            session_factory=file_session_factory,
+        )
+
+        assert [len(users) for users in results] == [app.id for app in apps]
+
+    def test_exceptions_are_returned_when_requested(self, file_session_factory):
+        """Test return_exceptions collects errors instead of raising"""
+        calls = [partial(UserService().get_by_profile, "FARMER"), partial(UserService().get_by_profile, "INVALID")]
+
+        results = run_concurrent_reads(calls, return_exceptions=True, session_factory=file_session_factory)
+
+        assert results[0] == []
+        assert isinstance(results[1], ValueError)
+        with pytest.raises(ValueError, match="Invalid profile type"):
+            run_concurrent_reads(calls, session_factory=file_session_factory)
+
+
+class TestUnitOfWork:
+
+    def test_services_share_one_session_and_commit_once(self, file_session_factory):
+        """Test that service calls without db join the unit of work"""
+        commits = []
+        with unit_of_work(file_session_factory) as session:
+            event.listen(session, "after_commit", lambda s: commits.append(s))
+            app = AppService().create(AppCreate(name="Test App", country_ext_id="1"))
+            user = UserService().create(UserCreate(ext_key_clock_id="kc_1", app_id=app.id, profile=ProfileType.FARMER))
+            assert UserService().get_by_app(app.id)[0].id == user.id
+            assert commits == []
+
+        assert len(commits) == 1
+        assert current_session() is None
+        with file_session_factory() as other:
+            assert len(UserService().get_by_app(app.id, db=other)) == 1
+
+    def test_error_rolls_back_every_call(self, file_session_factory):
+        """Test that one transaction spans the whole unit of work"""
+        with pytest.raises(ValueError, match="Invalid profile type"):
+            with unit_of_work(file_session_factory):
+                AppService().create(AppCreate(name="Test App", country_ext_id="1"))
+                UserService().get_by_profile("INVALID")
+
+        with file_session_factory() as other:
+            assert AppService().get_all(db=other) == []
+
+    def test_nested_unit_of_work_joins_outer(self, file_session_factory):
+        """Test that nested blocks reuse the outer session"""
+        with unit_of_work(file_session_factory) as outer:
+            with unit_of_work(file_session_factory) as inner:
+                assert inner is outer
+
+    def test_failed_call_aborts_the_unit_of_work(self, file_session_factory):
+        """Test that a caught error does not let later calls commit a partial result"""
+        with unit_of_work(file_session_factory):
+            app = AppService().create(AppCreate(name="Test App", country_ext_id="1"))
+            user = UserService().create(UserCreate(ext_key_clock_id="kc_1", app_id=app.id, profile=ProfileType.FARMER))
+            with pytest.raises(ValueError, match="Notification cannot be empty"):
+                WsInterestedService().create(WsInterestedCreate(user_id=user.id, ws_ext_id="ws_1", notification={}))
+            with pytest.raises(UnitOfWorkAbortedError):
+                AppService().create(AppCreate(name="Other App", country_ext_id="1"))
+
+        with file_session_factory() as other:
+            assert AppService().get_all(db=other) == []
+
+
+class TestUnitOfWorkMiddleware:
+
+    @staticmethod
+    def _request(middleware):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(middleware({"type": "http", "method": "POST", "path": "/"}, receive, send))
+        return messages
+
+    @staticmethod
+    def _endpoint(before_response=None):
+        async def app(scope, receive, send):
+            AppService().create(AppCreate(name="Test App", country_ext_id="1"))
+            if before_response:
+                before_response()
+            await send({"type": "http.response.start", "status": 201, "headers": []})
+            await send({"type": "http.response.body", "body": b"created"})
+        return app
+
+    def test_commits_before_the_response_starts(self, file_session_factory):
+        """Test that the writes are visible to other sessions when the status is sent"""
+        visible = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                with file_session_factory() as other:
+                    visible.append(len(AppService().get_all(db=other)))
+
+        middleware = UnitOfWorkMiddleware(self._endpoint(), file_session_factory)
+        asyncio.run(middleware({"type": "http"}, None, send))
+
+        assert visible == [1]
+
+    def test_failed_commit_becomes_a_server_error(self, file_session_factory):
+        """Test that the client gets a 500, not the endpoint's status, when the commit fails"""
+        def fail_commit():
+            def fail(session):
+                raise RuntimeError("commit failed")
+            event.listen(current_session(), "before_commit", fail)
+
+        messages = self._request(UnitOfWorkMiddleware(self._endpoint(fail_commit), file_session_factory))
+
+        assert [m["type"] for m in messages] == ["http.response.start", "http.response.body"]
+        assert messages[0]["status"] == 500
+        with file_session_factory() as other:
+            assert AppService().get_all(db=other) == []
+
+
+SLOW_QUERY = text(
+    "WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 100000000) "
+    "SELECT count(*) FROM counter"
+)
+
+
+class TestStatementTimeout:
+
+    def test_service_timeout_interrupts_slow_statement(self, file_session_factory):
+        """Test that a per-service timeout becomes a StatementTimeoutError"""
+        service = AppService()
+        service.statement_timeout = 0.05
+
+        with file_session_factory() as session:
+            with pytest.raises(StatementTimeoutError):
+                with service._session_scope(session) as scoped:
+                    scoped.execute(SLOW_QUERY)
+
+            # The connection is still usable and no longer limited
+            assert service.get_all(db=session) == []
+
+    def test_deadline_limits_calls_inside_block(self, file_session_factory):
+        """Test per-call deadlines"""
+        service = AppService()
+
+        with file_session_factory() as session:
+            with deadline(0.05):
+                with pytest.raises(StatementTimeoutError):
+                    with service._session_scope(session) as scoped:
+                        scoped.execute(SLOW_QUERY)
+
+    def test_expired_deadline_fails_before_running(self, file_session_factory):
+        """Test that no statement runs once the deadline has passed"""
+        with deadline(0):
+            with pytest.raises(StatementTimeoutError, match="Deadline exceeded"):
+                AppService().get_all(db=file_session_factory())
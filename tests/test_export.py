@@ -0,0 +1,77 @@
+import json
+import pytest
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.schemas.ws_interested_schema import WsInterestedCreate
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.transfer.exporter import export_table
+
+
+@pytest.fixture
+def seeded_db(db_session):
+    """Database with one app, three users and one subscription per user"""
+    app = AppService().create(AppCreate(name="Test App", country_ext_id="1"), db=db_session)
+    for i in range(3):
+        user = UserService().create(
+            UserCreate(ext_key_clock_id=f"keycloak_{i}", app_id=app.id, profile=ProfileType.FARMER, enable=i != 2),
+            db=db_session
+        )
+        WsInterestedService().create(
+            WsInterestedCreate(user_id=user.id, ws_ext_id="WS_123", notification={"email": True, "wp": i == 0}),
+            db=db_session
+        )
+    return db_session
+
+
+class TestExportTable:
+
+    def test_ndjson_export_streams_in_batches(self, seeded_db, tmp_path):
+        """Test that every row is written and batches follow batch_size"""
+        path = tmp_path / "users.ndjson"
+        progress = []
+
+        stats = export_table("users", str(path), batch_size=2, progress=lambda s: progress.append(s.rows), db=seeded_db)
+
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+        assert stats.rows == 3 and stats.batches == 2
+        assert progress == [2, 3]
+        assert rows[0]["profile"] == "FARMER"
+        assert stats.rows_per_second > 0
+
+    def test_ndjson_export_applies_filters(self, seeded_db, tmp_path):
+        """Test export of a filtered service query"""
+        path = tmp_path / "users.ndjson"
+
+        stats = export_table(UserService(), str(path), filters={"enable": True}, db=seeded_db)
+
+        assert stats.rows == 2
+
+    def test_ndjson_export_flattens_notification(self, seeded_db, tmp_path):
+        """Test flattening of the notification JSON column"""
+        path = tmp_path / "ws.ndjson"
+
+        export_table("ws_interested", str(path), flatten_notification=True, db=seeded_db)
+
+        row = json.loads(path.read_text().splitlines()[0])
+        assert "notification" not in row
+        assert row["notification.email"] is True and row["notification.wp"] is True
+
+    def test_parquet_export_discovers_notification_columns(self, seeded_db, tmp_path):
+        """Test parquet export with a typed schema for flattened keys"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "ws.parquet"
+
+        stats = export_table("ws_interested", str(path), format="parquet", batch_size=2,
+                             flatten_notification=True, db=seeded_db)
+
+        table = pq.read_table(str(path))
+        assert stats.rows == table.num_rows == 3
+        assert table.column("notification.wp").to_pylist() == [True, False, False]
+
+    def test_invalid_format_raises_error(self, seeded_db, tmp_path):
+        """Test that an unknown format raises ValueError"""
+        with pytest.raises(ValueError, match="Invalid format"):
+            export_table("users", str(tmp_path / "users.csv"), format="csv", db=seeded_db)
@@ -0,0 +1,81 @@
+import json
+import pytest
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.transfer.importer import import_file
+from aclimate_v3_orm_frontend.validations.user_validator import UserValidator
+
+
+@pytest.fixture
+def app(db_session):
+    return AppService().create(AppCreate(name="Test App", country_ext_id="1"), db=db_session)
+
+
+class TestImportFile:
+
+    def test_csv_import_loads_valid_rows_and_rejects_invalid(self, db_session, app, tmp_path):
+        """Test chunked CSV import with a rejects side file"""
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "ext_key_clock_id,app_id,profile,enable\n"
+            f"kc_1,{app.id},FARMER,true\n"
+            f"kc_2,{app.id},INVALID,true\n"
+            f"kc_3,{app.id},TECHNICIAN,\n"
+            f"kc_1,{app.id},FARMER,true\n"
+        )
+
+        stats = import_file("users", str(path), chunk_size=2, db=db_session)
+
+        assert (stats.read, stats.inserted, stats.rejected, stats.chunks) == (4, 2, 2, 2)
+        users = UserService().get_by_app(app.id, db=db_session)
+        assert sorted(u.ext_key_clock_id for u in users) == ["kc_1", "kc_3"]
+        rejects = [json.loads(line) for line in (tmp_path / "users.csv.rejects.ndjson").read_text().splitlines()]
+        assert [r["offset"] for r in rejects] == [1, 3]
+
+    def test_ndjson_import_resumes_from_checkpoint(self, db_session, app, tmp_path):
+        """Test that a second run skips the records already committed"""
+        path = tmp_path / "ws.ndjson"
+        user = UserService().create(
+            UserCreate(ext_key_clock_id="kc_1", app_id=app.id, profile=ProfileType.FARMER), db=db_session
+        )
+        lines = [json.dumps({"user_id": user.id, "ws_ext_id": f"WS_{i}", "notification": {"email": True}}) for i in range(3)]
+        path.write_text("\n".join(lines[:2]) + "\n")
+
+        first = import_file("ws_interested", str(path), db=db_session)
+        path.write_text("\n".join(lines) + "\n")
+        second = import_file("ws_interested", str(path), db=db_session)
+
+        assert first.inserted == 2
+        assert (second.resumed_from, second.inserted, second.rejected) == (2, 1, 0)
+        assert len(WsInterestedService().get_by_user(user.id, db=db_session)) == 3
+
+    def test_invalid_json_line_is_rejected(self, db_session, app, tmp_path):
+        """Test that malformed NDJSON lines go to the rejects file"""
+        path = tmp_path / "apps.ndjson"
+        path.write_text('{"name": "Other", "country_ext_id": "2"}\nnot json\n')
+
+        stats = import_file("apps", str(path), db=db_session)
+
+        assert (stats.inserted, stats.rejected) == (1, 1)
+
+
+class TestUserValidatorBatch:
+
+    def test_create_validate_batch_reports_existing_and_duplicated(self, db_session, app):
+        """Test batched uniqueness checks against the database and within the batch"""
+        UserService().create(UserCreate(ext_key_clock_id="kc_1", app_id=app.id, profile=ProfileType.FARMER), db=db_session)
+        objs = [
+            UserCreate(ext_key_clock_id="kc_1", app_id=app.id, profile=ProfileType.FARMER),
+            UserCreate(ext_key_clock_id="kc_2", app_id=app.id, profile=ProfileType.FARMER),
+            UserCreate(ext_key_clock_id="kc_2", app_id=app.id, profile=ProfileType.FARMER),
+        ]
+
+        errors = UserValidator.create_validate_batch(db_session, objs)
+
+        assert "already exists" in errors[0]
+        assert errors[1] is None
+        assert "same batch" in errors[2]
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def run_isolated(code: str) -> str:
+    """Run code in a fresh interpreter without DATABASE_URL_FRONT and return its stdout"""
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL_FRONT"}
+    env["PYTHONPATH"] = os.path.abspath(SRC)
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=os.path.dirname(__file__),
+        capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+class TestLazyImports:
+    def test_package_import_loads_no_submodules(self):
+        out = run_isolated(
+            "import sys, aclimate_v3_orm_frontend\n"
+            "print(sorted(m for m in sys.modules if m.startswith('aclimate_v3_orm_frontend.')))"
+        )
+        assert out == "['aclimate_v3_orm_frontend._lazy']"
+
+    def test_schemas_and_enums_do_not_need_the_database(self):
+        out = run_isolated(
+            "import sys\n"
+            "from aclimate_v3_orm_frontend.schemas import AppCreate\n"
+            "from aclimate_v3_orm_frontend.enums import ProfileType\n"
+            "print('sqlalchemy' in sys.modules, 'aclimate_v3_orm_frontend.database' in sys.modules)"
+        )
+        assert out == "False False"
+
+    def test_models_and_services_import_without_engine(self):
+        out = run_isolated(
+            "from aclimate_v3_orm_frontend import AppService, User\n"
+            "from aclimate_v3_orm_frontend import database\n"
+            "print(database._engine is None)"
+        )
+        assert out == "True"
+
+    def test_missing_url_fails_on_first_use(self):
+        out = run_isolated(
+            "from aclimate_v3_orm_frontend import AppService\n"
+            "try:\n"
+            "    AppService().get_all()\n"
+            "except ValueError as e:\n"
+            "    print(e)"
+        )
+        assert out == "DATABASE_URL_FRONT not found in environment variables"
+
+    def test_cli_runs_without_database(self):
+        env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL_FRONT"}
+        env["PYTHONPATH"] = os.path.abspath(SRC)
+        result = subprocess.run(
+            [sys.executable, "-m", "aclimate_v3_orm_frontend"], env=env,
+            cwd=os.path.dirname(__file__), capture_output=True, text=True, timeout=60
+        )
+        assert result.returncode == 0, result.stderr
+        assert "ORM Installed" in result.stdout
+
+    def test_unknown_attribute(self):
+        import aclimate_v3_orm_frontend
+        with pytest.raises(AttributeError):
+            aclimate_v3_orm_frontend.DoesNotExist
+
+
+class TestConfigure:
+    def test_configure_rebinds_session_factory(self):
+        from aclimate_v3_orm_frontend import database
+        previous = database._engine
+        try:
+            engine = database.configure("sqlite:///:memory:")
+            assert database.get_engine() is engine
+            assert database.SessionLocal.kw["bind"] is engine
+        finally:
+            if previous is not None:
+                database._engine = previous
+                database.SessionLocal.configure(bind=previous)
@@ -0,0 +1,124 @@
+import pytest
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.models.outbox_event import OutboxEvent
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.base_service import BaseService
+from aclimate_v3_orm_frontend.services.outbox_service import OutboxService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+
+
+class TestOutbox:
+
+    def setup_method(self):
+        """Setup for each test method"""
+        BaseService.emit_events = True
+        self.outbox = OutboxService()
+        self.app_service = AppService()
+        self.user_service = UserService()
+
+    def teardown_method(self):
+        BaseService.emit_events = False
+
+    def _seed(self, db_session):
+        self.app = self.app_service.create(AppCreate(name="Test App", country_ext_id="CO"), db=db_session)
+        self.user = self.user_service.create(
+            UserCreate(ext_key_clock_id="farmer", app_id=self.app.id, profile=ProfileType.FARMER), db=db_session
+        )
+
+    def test_writes_record_events(self, db_session):
+        """Test that create, update and delete write one event each"""
+        self._seed(db_session)
+        self.user_service.update(self.user.id, {"profile": ProfileType.TECHNICIAN}, db=db_session)
+        self.user_service.delete(self.user.id, db=db_session)
+
+        events = self.outbox.claim(db=db_session)
+
+        assert [(e.aggregate, e.aggregate_id, e.event_type) for e in events] == [
+            ("apps", self.app.id, "created"),
+            ("users", self.user.id, "created"),
+            ("users", self.user.id, "updated"),
+            ("users", self.user.id, "deleted"),
+        ]
+        assert events[1].payload["profile"] == "FARMER"
+        assert events[2].payload == {"changes": {"profile": "TECHNICIAN"}, "previous": {"profile": "FARMER"}}
+        assert events[3].payload["enable"] is False
+
+    def test_bulk_writes_record_events(self, db_session):
+        """Test that bulk_create and bulk_update write one event per row"""
+        self._seed(db_session)
+        self.user_service.bulk_create([
+            UserCreate(ext_key_clock_id=f"bulk_{i}", app_id=self.app.id, profile=ProfileType.FARMER) for i in range(3)
+        ], db=db_session)
+        self.user_service.bulk_update({self.user.id: {"enable": False}}, db=db_session)
+
+        events = self.outbox.claim(aggregates=["users"], db=db_session)
+
+        assert [e.event_type for e in events] == ["created"] * 4 + ["updated"]
+        assert [e.payload.get("ext_key_clock_id") for e in events[1:4]] == ["bulk_0", "bulk_1", "bulk_2"]
+        assert events[4].payload == {"changes": {"enable": False}}
+
+    def test_events_roll_back_with_the_change(self, db_session, monkeypatch):
+        """Test that a failed write leaves no event behind"""
+        self._seed(db_session)
+        monkeypatch.setattr(self.user_service, "read_schema", None)
+
+        with pytest.raises(AttributeError):
+            self.user_service.update(self.user.id, {"profile": ProfileType.TECHNICIAN}, db=db_session)
+
+        assert [e.event_type for e in self.outbox.claim(aggregates=["users"], db=db_session)] == ["created"]
+
+    def test_events_are_off_by_default(self, db_session):
+        """Test that services without emit_events write no events"""
+        BaseService.emit_events = False
+        self._seed(db_session)
+
+        assert self.outbox.pending_count(db=db_session) == 0
+
+    def test_claimed_events_are_not_claimed_twice(self, db_session):
+        """Test claim batches, leases, release and ack"""
+        self._seed(db_session)
+
+        first = self.outbox.claim(batch_size=1, db=db_session)
+        second = self.outbox.claim(batch_size=1, db=db_session)
+        assert [e.aggregate for e in first + second] == ["apps", "users"]
+        assert self.outbox.claim(db=db_session) == []
+
+        assert self.outbox.release(first, db=db_session) == 1
+        again = self.outbox.claim(db=db_session)
+        assert [e.id for e in again] == [first[0].id]
+        assert again[0].attempts == 2
+
+        assert self.outbox.ack(second + again, db=db_session) == 2
+        assert self.outbox.pending_count(db=db_session) == 0
+
+    def test_drain_acks_handled_batches(self, file_session_factory):
+        """Test that drain hands every event to the handler once and retries failed batches"""
+        BaseService.emit_events = False
+        with file_session_factory() as session:
+            app = self.app_service.create(AppCreate(name="Test App", country_ext_id="CO"), db=session)
+        UserService.emit_events = True
+        try:
+            with file_session_factory() as session:
+                self.user_service.bulk_create([
+                    UserCreate(ext_key_clock_id=f"kc_{i}", app_id=app.id, profile=ProfileType.FARMER) for i in range(5)
+                ], db=session)
+        finally:
+            del UserService.emit_events
+
+        seen, failures = [], []
+
+        def handler(events):
+            if not failures:
+                failures.append(events)
+                raise RuntimeError("consumer down")
+            seen.extend(e.payload["ext_key_clock_id"] for e in events)
+
+        handled = self.outbox.drain(handler, batch_size=2, retry_delay=0, until_empty=True,
+                                    session_factory=file_session_factory)
+
+        assert handled == 5
+        assert sorted(seen) == [f"kc_{i}" for i in range(5)]
+        with file_session_factory() as session:
+            assert self.outbox.pending_count(db=session) == 0
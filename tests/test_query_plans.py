@@ -0,0 +1,185 @@
+"""
+EXPLAIN-plan regression tests for the service queries.
+
+Each case runs a service method against a seeded SQLite database, captures the SELECT
+statements it sends and runs EXPLAIN QUERY PLAN on them. The tests assert that the
+expected index is used (no scan of the table or of a whole index) and compare the plans with the
+snapshots in tests/query_plans/sqlite.json, so a plan change shows up as a test diff.
+
+After an intended change, refresh the snapshots with:
+    UPDATE_PLAN_SNAPSHOTS=1 python -m pytest tests/test_query_plans.py
+"""
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from aclimate_v3_orm_frontend.database.base import Base
+from aclimate_v3_orm_frontend.database.search import create_search_index
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.models import App, User, WsInterested
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.outbox_service import OutboxService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "query_plans", "sqlite.json")
+UPDATE_SNAPSHOTS = os.environ.get("UPDATE_PLAN_SNAPSHOTS") == "1"
+
+# Case -> (call, table, expected index). The index must show up in the plan of the first
+# SELECT on the table; None marks queries that scan the table by design
+CASES = {
+    "AppService.get_by_id": (lambda db: AppService().get_by_id(1, db=db), "apps", "PRIMARY KEY"),
+    "AppService.get_by_country_ext_id": (
+        lambda db: AppService().get_by_country_ext_id("C1", db=db), "apps", "ix_apps_country_ext_id_enable"),
+    "AppService.get_by_name": (lambda db: AppService().get_by_name("App 1", db=db), "apps", "ix_apps_name"),
+    "AppService.search_by_name": (lambda db: AppService().search_by_name("App", db=db), "apps", None),
+    "AppService.get_all": (lambda db: AppService().get_all(db=db), "apps", None),
+    "UserService.get_by_app": (lambda db: UserService().get_by_app(1, db=db), "users", "ix_users_app_id_profile"),
+    "UserService.get_by_profile_and_app": (
+        lambda db: UserService().get_by_profile_and_app("FARMER", 1, db=db), "users", "ix_users_app_id_profile"),
+    "UserService.get_by_ext_key_clock_id": (
+        lambda db: UserService().get_by_ext_key_clock_id("kc-00000001", db=db), "users", "ix_users_ext_key_clock_id_app_id"),
+    "UserService.resolve_identity": (
+        lambda db: UserService().resolve_identity("kc-00000002", 2, db=db), "users", "ix_users_ext_key_clock_id_app_id"),
+    "UserService.get_many_by_ext_key_clock_id": (
+        lambda db: UserService().get_many_by("ext_key_clock_id", ["kc-00000001", "kc-00000002"], db=db),
+        "users", "ix_users_ext_key_clock_id_app_id"),
+    "UserService.get_changed_since": (
+        lambda db: list(UserService().get_changed_since(datetime(2000, 1, 1), cursor=1, db=db)), "users", "ix_users_updated_id"),
+    "UserService.get_by_profile": (lambda db: UserService().get_by_profile("FARMER", db=db), "users", None),
+    "WsInterestedService.get_by_user": (
+        lambda db: WsInterestedService().get_by_user(1, db=db), "ws_interested", "ix_ws_interested_user_id"),
+    "WsInterestedService.get_by_ws_ext_id": (
+        lambda db: WsInterestedService().get_by_ws_ext_id("ws-1", db=db), "ws_interested", "ix_ws_interested_ws_ext_id"),
+    "WsInterestedService.get_changed_since": (
+        lambda db: list(WsInterestedService().get_changed_since(datetime(2000, 1, 1), db=db)),
+        "ws_interested", "ix_ws_interested_updated_id"),
+    "WsInterestedService.get_deleted_since": (
+        lambda db: list(WsInterestedService().get_deleted_since(datetime(2000, 1, 1), cursor=1, db=db)),
+        "tombstones", "ix_tombstones_table_name_deleted_row_id"),
+    "OutboxService.claim": (lambda db: OutboxService().claim(db=db), "outbox_events", "ix_outbox_events_available_at_id"),
+}
+
+
+def seeded_engine():
+    """SQLite database with a few hundred rows per table"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(App.__table__), [
+            {"id": i, "name": f"App {i}", "country_ext_id": f"C{i % 5}", "enable": True, "register": now, "updated": now}
+            for i in range(1, 21)
+        ])
+        conn.execute(insert(User.__table__), [
+            {"id": i, "ext_key_clock_id": f"kc-{i:08d}", "app_id": i % 20 + 1,
+             "profile": ProfileType.FARMER if i % 2 else ProfileType.TECHNICIAN,
+             "enable": True, "register": now, "updated": now}
+            for i in range(1, 501)
+        ])
+        conn.execute(insert(WsInterested.__table__), [
+            {"id": i, "user_id": i, "ws_ext_id": f"ws-{i % 50}", "notification": {"daily": True}, "updated": now}
+            for i in range(1, 501)
+        ])
+    return engine
+
+
+@pytest.fixture(scope="module")
+def plan_engine():
+    engine = seeded_engine()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def search_engine():
+    """Seeded database with the indexed name search"""
+    engine = seeded_engine()
+    assert create_search_index(engine)
+    yield engine
+    engine.dispose()
+
+
+@contextmanager
+def captured_selects(engine):
+    """Collect the SELECT statements (and their parameters) sent to the engine"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def explain(engine, statement, parameters):
+    """EXPLAIN QUERY PLAN lines of a statement, normalized across SQLite versions"""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    # Older SQLite versions print "SCAN TABLE x" / "SEARCH TABLE x"
+    return [re.sub(r"^(SCAN|SEARCH) TABLE ", r"\1 ", row[-1]) for row in rows]
+
+
+def plans_of(engine, call):
+    session = sessionmaker(bind=engine)()
+    try:
+        with captured_selects(engine) as statements:
+            call(session)
+    finally:
+        session.close()
+    return [explain(engine, statement, parameters) for statement, parameters in statements]
+
+
+def load_snapshots():
+    if not os.path.exists(SNAPSHOT_PATH):
+        return {}
+    with open(SNAPSHOT_PATH, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+@pytest.fixture(scope="module")
+def snapshots():
+    stored = load_snapshots()
+    current = {}
+    yield stored, current
+    if UPDATE_SNAPSHOTS:
+        with open(SNAPSHOT_PATH, "w", encoding="utf-8") as fh:
+            json.dump({**stored, **current}, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+
+
+# Cases run against search_engine, with the same (call, table, expected index) layout
+SEARCH_CASES = {
+    "AppService.search_by_name[fts5]": (
+        lambda db: AppService().search_by_name("App 1", db=db, limit=10), "apps_name_fts", "VIRTUAL TABLE INDEX"),
+}
+
+
+@pytest.mark.parametrize("case", list(CASES) + list(SEARCH_CASES))
+def test_query_plan(case, request, snapshots):
+    """Test that the service query uses its index and matches the stored plan"""
+    engine = request.getfixturevalue("search_engine" if case in SEARCH_CASES else "plan_engine")
+    call, table, index = {**CASES, **SEARCH_CASES}[case]
+    plans = plans_of(engine, call)
+    stored, current = snapshots
+    current[case] = plans
+
+    main = next((plan for plan in plans if any(re.search(rf"\b{table}\b", line) for line in plan)), None)
+    assert main is not None, f"{case} sent no query on {table}"
+    if index is not None:
+        # FTS5 tables report their index lookups as "SCAN <table> VIRTUAL TABLE INDEX"
+        assert not any(line.startswith(f"SCAN {table}") and "VIRTUAL TABLE INDEX" not in line for line in main), \
+            f"{case} scans {table}: {main}"
+        assert any(index in line for line in main), f"{case} does not use {index}: {main}"
+
+    if not UPDATE_SNAPSHOTS:
+        assert case in stored, f"No stored plan for {case}, run with UPDATE_PLAN_SNAPSHOTS=1"
+        assert plans == stored[case]
@@ -0,0 +1,209 @@
+import sqlite3
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateSequence
+from aclimate_v3_orm_frontend.database.base import create_tables
+from aclimate_v3_orm_frontend.database.sharding import ShardMap, configure_sharding, disable_sharding
+from aclimate_v3_orm_frontend.database import SessionLocal
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.models.user import User
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.schemas.ws_interested_schema import WsInterestedCreate
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+
+
+@pytest.fixture
+def shards(tmp_path):
+    """Two SQLite shards: Colombia alone, Peru and Bolivia together"""
+    paths = {"co": tmp_path / "co.db", "andes": tmp_path / "andes.db"}
+    shard_map = configure_sharding({
+        "CO": f"sqlite:///{paths['co']}",
+        "PE": f"sqlite:///{paths['andes']}",
+        "BO": f"sqlite:///{paths['andes']}",
+    })
+    create_tables()
+    yield paths
+    disable_sharding()
+
+
+def rows(path, sql):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(sql).fetchall()
+
+
+class TestShardMap:
+
+    def test_ids_are_unique_across_shards(self):
+        """Test that each shard allocates ids from its own residue class"""
+        shard_map = ShardMap({"CO": "sqlite://", "PE": "sqlite:///other.db"}, id_stride=4)
+
+        assert shard_map.next_id("shard_0", None) == 1
+        assert shard_map.next_id("shard_1", None) == 2
+        assert shard_map.next_id("shard_1", 2) == 6
+        assert shard_map.shard_for_id(6) == "shard_1"
+        assert shard_map.shard_for_id(3) is None
+
+    def test_postgresql_id_sequence_keeps_the_residue_class(self):
+        """Test the DDL of the per-shard id sequence"""
+        shard_map = ShardMap({"CO": "sqlite://", "PE": "sqlite:///other.db"}, id_stride=4)
+
+        sequence = shard_map._id_sequence("shard_1", User.__table__, shard_map.next_id("shard_1", 7))
+        ddl = str(CreateSequence(sequence, if_not_exists=True).compile(dialect=postgresql.dialect()))
+
+        assert ddl == "CREATE SEQUENCE IF NOT EXISTS users_shard_1_id_seq INCREMENT BY 4 START WITH 10"
+
+    def test_unknown_country_without_default_raises_error(self):
+        """Test that countries without a shard are rejected"""
+        shard_map = ShardMap({"CO": "sqlite://"})
+
+        with pytest.raises(ValueError, match="No shard configured for country_ext_id: MX"):
+            shard_map.shard_for_country("MX")
+        assert ShardMap({"CO": "sqlite://"}, default="sqlite:///other.db").shard_for_country("MX") == "shard_1"
+
+
+class TestShardedServices:
+
+    def setup_method(self):
+        """Setup for each test method"""
+        self.app_service = AppService()
+        self.user_service = UserService()
+        self.ws_service = WsInterestedService()
+
+    def _seed(self):
+        co = self.app_service.create(AppCreate(name="AClimate CO", country_ext_id="CO"))
+        pe = self.app_service.create(AppCreate(name="AClimate PE", country_ext_id="PE"))
+        users = [
+            self.user_service.create(UserCreate(ext_key_clock_id=f"kc_{app.id}", app_id=app.id, profile=ProfileType.FARMER))
+            for app in (co, pe)
+        ]
+        return co, pe, users
+
+    def test_rows_are_stored_in_their_country_shard(self, shards):
+        """Test that apps route by country and users and subscriptions follow their parent"""
+        co, pe, (co_user, pe_user) = self._seed()
+        self.ws_service.create(WsInterestedCreate(user_id=pe_user.id, ws_ext_id="ws_1", notification={"daily": True}))
+
+        assert rows(shards["co"], "SELECT name FROM apps") == [("AClimate CO",)]
+        assert rows(shards["andes"], "SELECT name FROM apps") == [("AClimate PE",)]
+        assert rows(shards["co"], "SELECT ext_key_clock_id FROM users") == [(f"kc_{co.id}",)]
+        assert rows(shards["andes"], "SELECT user_id FROM ws_interested") == [(pe_user.id,)]
+        assert co.id != pe.id and co_user.id != pe_user.id
+
+    def test_global_queries_scatter_gather(self, shards):
+        """Test that get_all and lookups by id see every shard"""
+        co, pe, (co_user, pe_user) = self._seed()
+
+        assert sorted(app.name for app in self.app_service.get_all()) == ["AClimate CO", "AClimate PE"]
+        assert self.user_service.get_by_id(pe_user.id).app_id == pe.id
+        assert [user.id for user in self.user_service.get_by_app(co.id)] == [co_user.id]
+
+    def test_queries_on_routing_columns_target_one_shard(self, shards):
+        """Test that filters on id, country or parent id narrow the shards queried"""
+        session = SessionLocal()
+        try:
+            by_app = SimpleNamespace(statement=select(User).where(User.app_id == 2, User.enable == True))
+            by_profile = SimpleNamespace(statement=select(User).where(User.profile == ProfileType.FARMER))
+
+            assert session.execute_chooser(by_app) == ["shard_1"]
+            assert session.execute_chooser(by_profile) == ["shard_0", "shard_1"]
+        finally:
+            session.close()
+
+    def test_bulk_paths_are_split_by_shard(self, shards):
+        """Test bulk_create and bulk_update across shards"""
+        co, pe, _ = self._seed()
+        inserted = self.user_service.bulk_create([
+            UserCreate(ext_key_clock_id=f"bulk_{i}", app_id=app.id, profile=ProfileType.FARMER)
+            for i, app in enumerate([co, pe, co])
+        ])
+        bulk_users = [user for user in self.user_service.get_all() if user.ext_key_clock_id.startswith("bulk_")]
+        self.user_service.bulk_update({user.id: {"enable": False} for user in bulk_users})
+
+        assert inserted == 3
+        assert len({user.id for user in bulk_users}) == 3
+        assert rows(shards["co"], "SELECT COUNT(*) FROM users WHERE enable = 0") == [(2,)]
+        assert rows(shards["andes"], "SELECT COUNT(*) FROM users WHERE enable = 0") == [(1,)]
+
+    def test_change_feed_is_ordered_across_shards(self, shards):
+        """Test that get_changed_since merges the shards in (updated, id) order"""
+        self._seed()
+        self.app_service.create(AppCreate(name="AClimate BO", country_ext_id="BO"))
+
+        changes = list(self.app_service.get_changed_since(datetime(2000, 1, 1), batch_size=2))
+
+        assert [app.name for app in changes] == ["AClimate CO", "AClimate PE", "AClimate BO"]
+
+    def test_shard_key_updates_cannot_move_rows(self, shards):
+        """Test that routing columns only change to values of the same shard"""
+        co, pe, (co_user, pe_user) = self._seed()
+        bo = self.app_service.create(AppCreate(name="AClimate BO", country_ext_id="BO"))
+
+        with pytest.raises(ValueError, match="rows cannot move between shards"):
+            self.app_service.update(co.id, {"country_ext_id": "PE"})
+        with pytest.raises(ValueError, match="rows cannot move between shards"):
+            self.user_service.bulk_update({pe_user.id: {"app_id": co.id}})
+
+        # Peru and Bolivia share a shard
+        assert self.app_service.update(pe.id, {"country_ext_id": "BO"}).country_ext_id == "BO"
+        self.user_service.bulk_update({pe_user.id: {"app_id": bo.id}})
+        assert self.user_service.get_by_id(pe_user.id).app_id == bo.id
+        assert self.user_service.get_by_id(co_user.id).app_id == co.id
+
+    def test_unmapped_country_is_rejected(self, shards):
+        """Test that an app of a country without shard cannot be created"""
+        with pytest.raises(ValueError, match="No shard configured"):
+            self.app_service.create(AppCreate(name="AClimate MX", country_ext_id="MX"))
+
+    def test_counters_are_summed_across_shards(self, shards):
+        """Test that each shard maintains its own counters and reads add them up"""
+        from aclimate_v3_orm_frontend.services.counter_service import CounterService
+
+        CounterService.enable()
+        try:
+            co, pe, users = self._seed()
+            for user in users:
+                self.ws_service.create(WsInterestedCreate(user_id=user.id, ws_ext_id="ws_1", notification={"daily": True}))
+
+            assert rows(shards["co"], "SELECT value FROM counters WHERE key = 'ws_1'") == [(1,)]
+            assert CounterService().ws_subscribers("ws_1") == 2
+            assert CounterService().rebuild() == {"ws_subscribers": 2, "app_profile_users": 2}
+            assert CounterService().ws_subscribers("ws_1") == 2
+        finally:
+            CounterService.enable(False)
+
+    def test_outbox_events_are_written_to_the_row_shard(self, shards):
+        """Test that events live in the shard of their row and are claimed from every shard"""
+        from aclimate_v3_orm_frontend.services.base_service import BaseService
+        from aclimate_v3_orm_frontend.services.outbox_service import OutboxService
+
+        BaseService.emit_events = True
+        try:
+            self._seed()
+            outbox = OutboxService()
+
+            assert rows(shards["co"], "SELECT aggregate FROM outbox_events ORDER BY id") == [("apps",), ("users",)]
+            events = outbox.claim()
+            assert sorted(e.shard for e in events) == ["shard_0", "shard_0", "shard_1", "shard_1"]
+            assert outbox.ack(events) == 4
+            assert outbox.pending_count() == 0
+        finally:
+            BaseService.emit_events = False
+
+    def test_query_spec_order_and_limit_are_merged_across_shards(self, shards):
+        """Test that a sorted, limited get_all returns the global top rows"""
+        from aclimate_v3_orm_frontend.schemas.query_spec import QuerySpec
+
+        self._seed()
+        self.app_service.create(AppCreate(name="AClimate BO", country_ext_id="BO"))
+        spec = QuerySpec(order_by=["-name"], limit=2, offset=1)
+
+        assert [app.name for app in self.app_service.get_all(spec=spec)] == ["AClimate CO", "AClimate BO"]
+        assert self.app_service.count(spec=QuerySpec(filters=[{"field": "country_ext_id", "op": "ne", "value": "CO"}])) == 2
+        streamed = [row["name"] for batch in self.app_service.stream_rows(spec=QuerySpec(limit=2)) for row in batch]
+        assert len(streamed) == 2
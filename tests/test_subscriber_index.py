@@ -0,0 +1,226 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import sessionmaker
+from aclimate_v3_orm_frontend.cache.subscriber_index import SubscriberIndex
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.models.user import User
+from aclimate_v3_orm_frontend.models.ws_interested import WsInterested
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.schemas.ws_interested_schema import WsInterestedCreate
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
+
+
+class TestSubscriberIndex:
+
+    def test_load_and_queries(self):
+        """Test bulk load, single and multi-station queries and disabled users"""
+        index = SubscriberIndex()
+        index.load([
+            (1, 10, "ws_1", True),
+            (2, 5, "ws_1", True),
+            (3, 5, "ws_2", True),
+            (4, 7, "ws_2", False),
+            (5, 8, "ws_3", True),
+        ])
+
+        assert list(index.subscribers("ws_1")) == [5, 10]
+        assert list(index.subscribers("ws_2")) == [5]
+        assert list(index.subscribers("unknown")) == []
+        assert list(index.subscribers_of_any(["ws_1", "ws_2", "ws_3", "unknown"])) == [5, 8, 10]
+        assert {ws: list(users) for ws, users in index.subscribers_many(["ws_1", "ws_3"]).items()} == {
+            "ws_1": [5, 10], "ws_3": [8]
+        }
+        assert index.count("ws_2") == 1
+
+        usage = index.memory_usage()
+        assert usage["stations"] == 3
+        assert usage["subscriptions"] == 5
+        assert usage["disabled_users"] == 1
+        assert usage["bytes"] > 0
+
+    def test_incremental_changes(self):
+        """Test subscriptions added, moved and removed and users disabled and re-enabled"""
+        index = SubscriberIndex()
+        index.load([(1, 10, "ws_1", True), (2, 11, "ws_1", True), (3, 10, "ws_2", True)])
+
+        index.put_subscription(100, 12, "ws_3")
+        index.put_subscription(2, ws_ext_id="ws_3")
+        assert list(index.subscribers("ws_1")) == [10]
+        assert list(index.subscribers("ws_3")) == [11, 12]
+
+        index.set_users_enabled({10: False})
+        assert list(index.subscribers("ws_1")) == []
+        assert list(index.subscribers("ws_2")) == []
+        # Subscriptions of disabled users are remembered for when they are enabled again
+        index.put_subscription(4, 10, "ws_3")
+        assert list(index.subscribers("ws_3")) == [11, 12]
+        index.set_users_enabled({10: True})
+        assert list(index.subscribers("ws_3")) == [10, 11, 12]
+        assert list(index.subscribers("ws_2")) == [10]
+
+        index.remove_subscription(100)
+        index.remove_subscription(999)
+        assert list(index.subscribers("ws_3")) == [10, 11]
+
+    def test_changes_during_load_are_replayed(self):
+        """Test that changes applied while the rows are read survive the load"""
+        index = SubscriberIndex()
+
+        def rows():
+            yield (1, 10, "ws_1", True)
+            index.put_subscription(2, 11, "ws_1")
+            yield (3, 12, "ws_2", True)
+
+        index.load(rows())
+
+        assert list(index.subscribers("ws_1")) == [10, 11]
+        assert list(index.subscribers("ws_2")) == [12]
+
+
+class TestSubscriberIndexServices:
+
+    def setup_method(self):
+        """Setup for each test method"""
+        self.user_service = UserService()
+        self.ws_service = WsInterestedService()
+
+    def teardown_method(self):
+        WsInterestedService.subscriber_index = None
+
+    def _seed(self, db_session):
+        app = AppService().create(AppCreate(name="Test App", country_ext_id="CO"), db=db_session)
+        self.users = [
+            self.user_service.create(UserCreate(ext_key_clock_id=f"kc_{i}", app_id=app.id, profile=ProfileType.FARMER), db=db_session)
+            for i in range(3)
+        ]
+        self.subscriptions = [
+            self.ws_service.create(WsInterestedCreate(user_id=user.id, ws_ext_id=ws, notification={"daily": True}), db=db_session)
+            for user, ws in ((self.users[0], "ws_1"), (self.users[1], "ws_1"), (self.users[2], "ws_2"))
+        ]
+
+    def test_load_from_database(self, db_session):
+        """Test that the index only lists enabled users"""
+        self._seed(db_session)
+        self.user_service.delete(self.users[1].id, db=db_session)
+
+        index = self.ws_service.load_subscriber_index(db=db_session)
+
+        assert WsInterestedService.subscriber_index is index
+        assert list(index.subscribers("ws_1")) == [self.users[0].id]
+        assert list(index.subscribers_of_any(["ws_1", "ws_2"])) == [self.users[0].id, self.users[2].id]
+
+    def test_write_paths_keep_the_index_current(self, db_session):
+        """Test create, update, delete, bulk writes and user enable changes"""
+        self._seed(db_session)
+        index = self.ws_service.load_subscriber_index(db=db_session)
+        first, second, third = (user.id for user in self.users)
+
+        self.ws_service.update(self.subscriptions[0].id, {"ws_ext_id": "ws_2"}, db=db_session)
+        assert list(index.subscribers("ws_1")) == [second]
+        assert list(index.subscribers("ws_2")) == [first, third]
+
+        self.ws_service.delete(self.subscriptions[2].id, db=db_session)
+        assert list(index.subscribers("ws_2")) == [first]
+
+        self.ws_service.bulk_create([WsInterestedCreate(user_id=third, ws_ext_id="ws_3", notification={"daily": True})], db=db_session)
+        assert list(index.subscribers("ws_3")) == [third]
+
+        self.ws_service.bulk_update({self.subscriptions[1].id: {"ws_ext_id": "ws_3"}}, db=db_session)
+        assert list(index.subscribers("ws_3")) == [second, third]
+
+        self.user_service.delete(third, db=db_session)
+        assert list(index.subscribers("ws_3")) == [second]
+        self.user_service.bulk_update({third: {"enable": True}}, db=db_session)
+        assert list(index.subscribers("ws_3")) == [second, third]
+
+        # Matches a fresh load
+        fresh = SubscriberIndex()
+        fresh.load(db_session.query(WsInterested.id, WsInterested.user_id, WsInterested.ws_ext_id, User.enable).join(User))
+        for ws in ("ws_1", "ws_2", "ws_3"):
+            assert index.subscribers(ws) == fresh.subscribers(ws)
+
+    def test_rolled_back_writes_are_not_applied(self, db_session):
+        """Test that staged changes wait for the commit"""
+        self._seed(db_session)
+        index = self.ws_service.load_subscriber_index(db=db_session)
+        before = list(index.subscribers("ws_1"))
+
+        assert db_session.query(WsInterested).count() == 3
+        index.stage(db_session, SubscriberIndex.remove_subscription, self.subscriptions[0].id)
+        assert list(index.subscribers("ws_1")) == before
+        db_session.rollback()
+        db_session.commit()
+        assert list(index.subscribers("ws_1")) == before
+
+    def test_poll_applies_external_changes(self, file_session_factory: sessionmaker):
+        """Test the updated-timestamp poll for writes made outside the services"""
+        db = file_session_factory()
+        self._seed(db)
+        index = self.ws_service.load_subscriber_index(db=db)
+        since = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+        # Index not installed: writes are not tracked, as if made by another process
+        WsInterestedService.subscriber_index = None
+        self.ws_service.create(WsInterestedCreate(user_id=self.users[2].id, ws_ext_id="ws_1", notification={"daily": True}), db=db)
+        self.user_service.update(self.users[0].id, {"enable": False}, db=db)
+        WsInterestedService.subscriber_index = index
+
+        latest = self.ws_service.poll_subscriber_index(since, db=db)
+
+        assert list(index.subscribers("ws_1")) == [self.users[1].id, self.users[2].id]
+        assert latest >= since.replace(tzinfo=latest.tzinfo)
+        db.close()
+
+    def test_poll_drops_deleted_subscriptions(self, file_session_factory: sessionmaker):
+        """Test that subscriptions deleted by another process are removed from their tombstones"""
+        db = file_session_factory()
+        self._seed(db)
+        index = self.ws_service.load_subscriber_index(db=db)
+        since = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+        WsInterestedService.subscriber_index = None
+        self.ws_service.delete(self.subscriptions[0].id, db=db)
+        WsInterestedService.subscriber_index = index
+        assert list(index.subscribers("ws_1")) == [self.users[0].id, self.users[1].id]
+
+        latest = self.ws_service.poll_subscriber_index(since, db=db)
+
+        assert list(index.subscribers("ws_1")) == [self.users[1].id]
+        assert latest > since.replace(tzinfo=latest.tzinfo)
+        db.close()
+
+    def test_disabled_user_without_subscriptions_is_not_indexed(self, db_session):
+        """Test that a user disabled at load time stays out when subscribing later"""
+        self._seed(db_session)
+        self.user_service.delete(self.users[2].id, db=db_session)
+        self.ws_service.delete(self.subscriptions[2].id, db=db_session)
+        index = self.ws_service.load_subscriber_index(db=db_session)
+
+        self.ws_service.create(WsInterestedCreate(user_id=self.users[2].id, ws_ext_id="S1", notification={"daily": True}), db=db_session)
+        assert list(index.subscribers("S1")) == []
+        self.user_service.update(self.users[2].id, {"enable": True}, db=db_session)
+        assert list(index.subscribers("S1")) == [self.users[2].id]
+
+    def test_disabled_users_of_bulk_create_are_not_indexed(self, db_session):
+        """Test that subscriptions of users imported disabled stay out of the index"""
+        self._seed(db_session)
+        index = self.ws_service.load_subscriber_index(db=db_session)
+
+        self.user_service.bulk_create([
+            UserCreate(ext_key_clock_id=f"imported_{i}", app_id=self.users[0].app_id, profile=ProfileType.FARMER, enable=i != 0)
+            for i in range(2)
+        ], db=db_session)
+        disabled, enabled = (
+            db_session.query(User.id).filter(User.ext_key_clock_id == f"imported_{i}").scalar() for i in range(2)
+        )
+        for user_id in (disabled, enabled):
+            self.ws_service.create(WsInterestedCreate(user_id=user_id, ws_ext_id="W1", notification={"daily": True}), db=db_session)
+
+        assert list(index.subscribers("W1")) == [enabled]
+
+    def test_poll_requires_a_loaded_index(self, db_session):
+        with pytest.raises(ValueError):
+            self.ws_service.poll_subscriber_index(datetime.now(timezone.utc), db=db_session)
@@ -4,6 +4,11 @@ from aclimate_v3_orm_frontend.services.user_service import UserService
 from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
 from aclimate_v3_orm_frontend.validations.user_validator import UserValidator
 from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.cache.identity_cache import IdentityCache
+from aclimate_v3_orm_frontend.database.unit_of_work import unit_of_work
+from aclimate_v3_orm_frontend.models.user import User
 
 class TestUserService:
     
@@ -128,4 +133,154 @@ class TestUserValidator:
         )
         
         # Should not raise any exception
-        UserValidator.create_validate(mock_db, user_create)
\ No newline at end of file
+        UserValidator.create_validate(mock_db, user_create)
+
+class TestIdentityCache:
+
+    def test_lru_evicts_oldest_entry(self):
+        """Test that the cache never grows beyond maxsize"""
+        cache = IdentityCache(maxsize=2)
+        cache.put(("a", 1), None)
+        cache.put(("b", 1), None)
+        cache.lookup(("a", 1))
+        cache.put(("c", 1), None)
+
+        assert len(cache) == 2
+        assert cache.lookup(("b", 1)) == (False, None)
+        assert cache.lookup(("a", 1)) == (True, None)
+
+    def test_expired_negative_entry_is_a_miss(self):
+        """Test that negative entries expire after negative_ttl"""
+        cache = IdentityCache(negative_ttl=0)
+        cache.put(("unknown", 1), None)
+
+        assert cache.lookup(("unknown", 1)) == (False, None)
+
+    def test_put_with_stale_generation_is_ignored(self):
+        """Test that a load racing with an invalidation is not cached"""
+        cache = IdentityCache()
+        generation = cache.generation()
+        cache.invalidate(("a", 1))
+
+        assert cache.put(("a", 1), None, generation=generation) is False
+        assert len(cache) == 0
+
+
+class TestResolveIdentity:
+
+    def setup_method(self):
+        """Setup for each test method"""
+        self.user_service = UserService()
+        self.user_service.identity_cache.clear()
+
+    def teardown_method(self):
+        self.user_service.identity_cache.clear()
+
+    def _create_user(self, db_session, ext_key_clock_id="keycloak_123"):
+        app = AppService().create(AppCreate(name="Test App", country_ext_id="1"), db=db_session)
+        return self.user_service.create(
+            UserCreate(ext_key_clock_id=ext_key_clock_id, app_id=app.id, profile=ProfileType.FARMER),
+            db=db_session
+        )
+
+    def test_resolve_identity_is_served_from_cache(self, db_session):
+        """Test that the second resolution does not query the database"""
+        user = self._create_user(db_session)
+
+        first = self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session)
+        with patch.object(self.user_service, "_session_scope") as mock_scope:
+            second = self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session)
+
+        assert first.id == user.id
+        assert second is first
+        mock_scope.assert_not_called()
+
+    def test_unknown_subject_is_negatively_cached_until_created(self, db_session):
+        """Test negative caching and invalidation on create"""
+        app = AppService().create(AppCreate(name="Test App", country_ext_id="1"), db=db_session)
+
+        assert self.user_service.resolve_identity("new_subject", app.id, db=db_session) is None
+        assert self.user_service.identity_cache.stats()["size"] == 1
+
+        user = self.user_service.create(
+            UserCreate(ext_key_clock_id="new_subject", app_id=app.id, profile=ProfileType.FARMER),
+            db=db_session
+        )
+
+        assert self.user_service.resolve_identity("new_subject", app.id, db=db_session).id == user.id
+
+    def test_disabled_user_is_no_longer_resolved(self, db_session):
+        """Test invalidation on soft delete"""
+        user = self._create_user(db_session)
+        self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session)
+
+        self.user_service.delete(user.id, db=db_session)
+
+        assert self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session) is None
+
+    def test_update_invalidates_old_identity(self, db_session):
+        """Test invalidation on update of ext_key_clock_id"""
+        user = self._create_user(db_session)
+        self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session)
+
+        self.user_service.update(user.id, {"ext_key_clock_id": "keycloak_456"}, db=db_session)
+
+        assert self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session) is None
+        assert self.user_service.resolve_identity("keycloak_456", user.app_id, db=db_session).id == user.id
+
+    def test_bulk_update_invalidates_identities(self, db_session):
+        """Test invalidation on bulk disable and bulk change of ext_key_clock_id"""
+        user = self._create_user(db_session)
+        other = self.user_service.create(
+            UserCreate(ext_key_clock_id="keycloak_other", app_id=user.app_id, profile=ProfileType.FARMER), db=db_session
+        )
+        self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session)
+        self.user_service.resolve_identity("keycloak_other", user.app_id, db=db_session)
+        assert self.user_service.resolve_identity("keycloak_new", user.app_id, db=db_session) is None
+
+        self.user_service.bulk_update(
+            {user.id: {"enable": False}, other.id: {"ext_key_clock_id": "keycloak_new"}}, db=db_session
+        )
+
+        assert self.user_service.resolve_identity("keycloak_123", user.app_id, db=db_session) is None
+        assert self.user_service.resolve_identity("keycloak_other", user.app_id, db=db_session) is None
+        assert self.user_service.resolve_identity("keycloak_new", user.app_id, db=db_session).id == other.id
+
+    def test_entries_read_before_commit_are_dropped_at_commit(self, file_session_factory):
+        """Test that a concurrent read of the old row during the write transaction is not kept"""
+        db = file_session_factory()
+        user = self._create_user(db)
+        reader = file_session_factory()
+
+        with unit_of_work(file_session_factory):
+            self.user_service.delete(user.id)
+            # Another session still sees the committed, enabled row and caches it
+            assert self.user_service.resolve_identity("keycloak_123", user.app_id, db=reader).id == user.id
+
+        assert self.user_service.resolve_identity("keycloak_123", user.app_id, db=reader) is None
+        reader.close()
+        db.close()
+
+    def test_rolled_back_rows_are_not_cached(self, file_session_factory):
+        """Test that identities read through a session with uncommitted user writes are not cached"""
+        db = file_session_factory()
+        user = self._create_user(db)
+
+        with pytest.raises(RuntimeError):
+            with unit_of_work(file_session_factory) as session:
+                session.add(User(ext_key_clock_id="phantom", app_id=user.app_id, profile=ProfileType.FARMER))
+                session.flush()
+                assert self.user_service.resolve_identity("phantom", user.app_id) is not None
+                raise RuntimeError("request failed")
+
+        assert self.user_service.identity_cache.lookup(("phantom", user.app_id)) == (False, None)
+        assert self.user_service.resolve_identity("phantom", user.app_id, db=db) is None
+        db.close()
+
+    def test_warm_identity_cache_loads_enabled_users(self, db_session):
+        """Test bulk warm-up from the users table"""
+        user = self._create_user(db_session)
+        self.user_service.identity_cache.clear()
+
+        assert self.user_service.warm_identity_cache(db=db_session) == 1
+        assert self.user_service.identity_cache.lookup(("keycloak_123", user.app_id))[0] is True
@@ -1,8 +1,16 @@
 import pytest
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
 from unittest.mock import Mock, MagicMock, patch
 from aclimate_v3_orm_frontend.services.ws_interested_service import WsInterestedService
 from aclimate_v3_orm_frontend.schemas.ws_interested_schema import WsInterestedCreate
 from aclimate_v3_orm_frontend.validations.ws_interested_validator import WsInterestedValidator
+from aclimate_v3_orm_frontend.services.app_service import AppService
+from aclimate_v3_orm_frontend.services.user_service import UserService
+from aclimate_v3_orm_frontend.schemas.app_schema import AppCreate
+from aclimate_v3_orm_frontend.schemas.user_schema import UserCreate
+from aclimate_v3_orm_frontend.enums.profile_type import ProfileType
 
 class TestWsInterestedService:
     
@@ -110,4 +118,107 @@ class TestWsInterestedValidator:
         )
         
         # Should not raise any exception
-        WsInterestedValidator.create_validate(mock_db, ws_create)
\ No newline at end of file
+        WsInterestedValidator.create_validate(mock_db, ws_create)
+
+def file_session_factory_db(session_factory):
+    """Replacement for get_db() bound to a test session factory"""
+    @contextmanager
+    def get_db():
+        with session_factory() as session:
+            yield session
+            session.commit()
+    return get_db
+
+
+class TestWriteBehind:
+
+    @pytest.fixture
+    def subscription(self, file_session_factory):
+        with file_session_factory() as session:
+            app = AppService().create(AppCreate(name="Test App", country_ext_id="1"), db=session)
+            user = UserService().create(
+                UserCreate(ext_key_clock_id="kc_1", app_id=app.id, profile=ProfileType.FARMER), db=session
+            )
+            return WsInterestedService().create(
+                WsInterestedCreate(user_id=user.id, ws_ext_id="WS_123", notification={"email": True}), db=session
+            )
+
+    def _stored_notification(self, file_session_factory, id):
+        with file_session_factory() as session:
+            return WsInterestedService().get_by_id(id, db=session).notification
+
+    def test_updates_are_coalesced_until_flush(self, file_session_factory, subscription):
+        """Test that repeated toggles become one UPDATE on flush"""
+        service = WsInterestedService()
+        service.enable_write_behind(flush_interval=None, session_factory=file_session_factory)
+        statements = []
+        event.listen(file_session_factory.kw["bind"], "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        with patch("aclimate_v3_orm_frontend.services.base_service.get_db", file_session_factory_db(file_session_factory)):
+            for value in (False, True, False):
+                result = service.update(subscription.id, {"notification": {"email": value}})
+
+            assert result.notification == {"email": False}
+            assert service.get_by_id(subscription.id).notification == {"email": False}
+        assert self._stored_notification(file_session_factory, subscription.id) == {"email": True}
+
+        assert service.flush() == 1
+        assert self._stored_notification(file_session_factory, subscription.id) == {"email": False}
+        assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+
+    def test_max_pending_triggers_flush(self, file_session_factory, subscription):
+        """Test the size trigger"""
+        service = WsInterestedService()
+        service.enable_write_behind(max_pending=1, flush_interval=None, session_factory=file_session_factory)
+
+        with patch("aclimate_v3_orm_frontend.services.base_service.get_db", file_session_factory_db(file_session_factory)):
+            service.update(subscription.id, {"notification": {"email": False}})
+
+        assert len(service.write_behind) == 0
+        assert self._stored_notification(file_session_factory, subscription.id) == {"email": False}
+
+    def test_updates_with_explicit_session_are_written_through(self, file_session_factory, subscription):
+        """Test that callers managing their own transaction bypass the buffer"""
+        service = WsInterestedService()
+        service.enable_write_behind(flush_interval=None, session_factory=file_session_factory)
+
+        with file_session_factory() as session:
+            service.update(subscription.id, {"notification": {"email": False}}, db=session)
+
+        assert len(service.write_behind) == 0
+        assert self._stored_notification(file_session_factory, subscription.id) == {"email": False}
+
+    def test_discard_drops_changes_of_a_flush_in_progress(self, file_session_factory, subscription):
+        """Test that a row discarded while its flush fails is neither overlaid nor retried"""
+        service = WsInterestedService()
+        service.enable_write_behind(flush_interval=None, session_factory=file_session_factory)
+
+        def failing_bulk_update(changes, db=None):
+            service.write_behind.discard(subscription.id)
+            raise RuntimeError("connection lost")
+
+        with patch("aclimate_v3_orm_frontend.services.base_service.get_db", file_session_factory_db(file_session_factory)):
+            service.update(subscription.id, {"notification": {"email": False}})
+            with patch.object(service, "bulk_update", side_effect=failing_bulk_update):
+                with pytest.raises(RuntimeError):
+                    service.flush()
+
+        assert len(service.write_behind) == 0
+        assert service.write_behind.overlay(subscription).notification == {"email": True}
+
+    def test_updates_after_close_restart_the_timer(self, file_session_factory, subscription):
+        """Test that changes buffered after close() are still flushed in the background"""
+        service = WsInterestedService()
+        service.enable_write_behind(flush_interval=0.01, session_factory=file_session_factory)
+        service.write_behind.close()
+
+        with patch("aclimate_v3_orm_frontend.services.base_service.get_db", file_session_factory_db(file_session_factory)):
+            service.update(subscription.id, {"notification": {"email": False}})
+
+        for _ in range(200):
+            if not len(service.write_behind):
+                break
+            time.sleep(0.01)
+        assert self._stored_notification(file_session_factory, subscription.id) == {"email": False}
+        service.write_behind.close()